@@ -1,32 +1,94 @@
 """
 LLM service for AI responses and intent understanding
 """
-import os
-from typing import Dict, List, Optional, Any
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Sequence
 from openai import OpenAI
-from dotenv import load_dotenv
+from app.ai.micro_batcher import MicroBatcher
+from app.ai.model_router import ROUTE_FAST, ROUTE_STRONG, ModelRouter
+from app.services.call_tracer import payload_hash, span
+from app.services.provider_router import ProviderRouter
 
-load_dotenv()
+DEFAULT_PROMPTS_DIR = Path(__file__).resolve().parents[2] / "prompts"
 
 
 class LLMService:
     """Service for interacting with LLM (OpenAI GPT)"""
     
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        self.client = OpenAI(api_key=api_key)
-        self.model = os.getenv("OPENAI_MODEL", "gpt-4o")
+    def __init__(
+        self,
+        client: Optional[OpenAI] = None,
+        prompts_dir: Optional[Path] = None,
+        model_router: Optional[ModelRouter] = None,
+        model: str = "gpt-4o",
+        fallback_models: Sequence[str] = ("gpt-4o-mini",),
+        latency_budget_ms: float = 1500,
+        fast_latency_budget_ms: float = 800,
+        embedding_model: str = "text-embedding-3-small",
+        intent_batch_max: int = 16,
+        intent_batch_wait_ms: float = 10,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        request_timeout: float = 4,
+        deadline_ms: float = 10000
+    ):
+        # Without a client, the OpenAI SDK reads OPENAI_API_KEY itself
+        self.client = client or OpenAI()
+        self.prompts_dir = Path(prompts_dir or DEFAULT_PROMPTS_DIR)
+        self.model = model
+        # Per request, so an abandoned (hedged or past-deadline) attempt frees its thread
+        self.request_timeout = request_timeout
+        breaker = {
+            "failure_threshold": failure_threshold,
+            "reset_timeout": reset_timeout,
+            "deadline": deadline_ms / 1000
+        }
+        # Each model is routed as its own provider so a slow or failing one is hedged around
+        self.router = ProviderRouter(
+            "llm",
+            [self.model] + list(fallback_models),
+            latency_budget=latency_budget_ms / 1000,
+            ordered=model_router is not None,
+            **breaker
+        )
+        # Simple turns go to the fast model, which falls back to the strong chain
+        self.model_router = model_router
+        self.fast_router = ProviderRouter(
+            "llm_fast",
+            [model_router.fast_model, self.model] if model_router else [self.model],
+            latency_budget=fast_latency_budget_ms / 1000,
+            ordered=True,
+            **breaker
+        )
+        self.embedding_model = embedding_model
         self.system_prompt = self._load_system_prompt()
+        self.intent_prompt = self._load_prompt(
+            "intent_classification.txt",
+            "You are an intent classification system. Respond only with valid JSON."
+        )
+        # Classification requests from concurrent calls are coalesced into one completion
+        self.intent_batcher = MicroBatcher(
+            self.detect_intent_batch,
+            max_batch=intent_batch_max,
+            max_wait=intent_batch_wait_ms / 1000,
+            name="intent"
+        )
+    
+    def _load_prompt(self, filename: str, default: str) -> str:
+        try:
+            with open(self.prompts_dir / filename, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return default
     
     def _load_system_prompt(self) -> str:
         """
         Load the system prompt for the AI agent
         """
         try:
-            with open("prompts/system_prompt.txt", "r", encoding="utf-8") as f:
+            with open(self.prompts_dir / "system_prompt.txt", "r", encoding="utf-8") as f:
                 return f.read()
         except FileNotFoundError:
             # Default prompt if file doesn't exist
@@ -46,7 +108,11 @@ Keep responses brief and natural for voice conversation."""
         user_message: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
         context: Optional[Dict[str, Any]] = None,
-        tools: Optional[List[Dict]] = None
+        tools: Optional[List[Dict]] = None,
+        system_prompt: Optional[str] = None,
+        intent: Optional[str] = None,
+        intent_confidence: Optional[float] = None,
+        tool_messages: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         Generate AI response using LLM
@@ -56,12 +122,16 @@ Keep responses brief and natural for voice conversation."""
             conversation_history: Previous messages in format [{"role": "user/assistant", "content": "..."}]
             context: Additional context (call_id, caller_info, etc.)
             tools: Available tools/functions for the LLM to call
+            system_prompt: Tenant-specific prompt replacing the global one
+            intent, intent_confidence: Already-detected intent for model routing
+                (detected locally from the message when omitted)
+            tool_messages: Tool calls made for this message and their results
         
         Returns:
             Dict with response text, intent, and other metadata
         """
         messages = [
-            {"role": "system", "content": self.system_prompt}
+            {"role": "system", "content": system_prompt or self.system_prompt}
         ]
         
         # Add context if provided
@@ -75,28 +145,48 @@ Keep responses brief and natural for voice conversation."""
         
         # Add current user message
         messages.append({"role": "user", "content": user_message})
+        if tool_messages:
+            messages.extend(tool_messages)
+        
+        route = ROUTE_STRONG
+        if self.model_router is not None:
+            route = self.model_router.route(
+                user_message,
+                intent=intent,
+                confidence=intent_confidence,
+                history_turns=len(conversation_history or []),
+                tools_offered=bool(tools)
+            ).route
         
         try:
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=200,  # Keep responses brief for voice
-                tools=tools if tools else None
-            )
-            
+            # Call OpenAI API through the provider router for the chosen route
+            response, latency_ms = self._complete(route, messages, tools)
             assistant_message = response.choices[0].message
+            escalated = route == ROUTE_FAST and ModelRouter.needs_escalation(
+                assistant_message.content, response.choices[0].finish_reason, bool(assistant_message.tool_calls)
+            )
+            if escalated:
+                # Empty or truncated: the fast model was not up to this turn
+                self._record(route, response, latency_ms, escalated=True)
+                route = ROUTE_STRONG
+                response, latency_ms = self._complete(route, messages, tools)
+                assistant_message = response.choices[0].message
+            usage = self._record(route, response, latency_ms)
             
             return {
                 "text": assistant_message.content,
                 "intent": None,  # Would be extracted from response
                 "requires_tool": assistant_message.tool_calls is not None,
-                "tool_calls": assistant_message.tool_calls if assistant_message.tool_calls else []
+                "tool_calls": assistant_message.tool_calls if assistant_message.tool_calls else [],
+                "usage": usage,
+                "route": route,
+                "escalated": escalated
             }
         
         except Exception as e:
-            # Fallback response on error
+            if self.model_router is not None:
+                self.model_router.record(route, 0.0, error=True)
+            # Fallback response once every model has failed
             return {
                 "text": "I apologize, but I'm having trouble processing that. Let me transfer you to a human agent.",
                 "intent": "transfer",
@@ -104,6 +194,49 @@ Keep responses brief and natural for voice conversation."""
                 "requires_tool": False
             }
     
+    def _complete(self, route: str, messages: List[Dict[str, str]], tools: Optional[List[Dict]]):
+        router = self.fast_router if route == ROUTE_FAST else self.router
+        start = time.perf_counter()
+        with span("llm", route=route, prompt_hash=payload_hash(messages[-1]["content"])) as trace:
+            response = router.call(lambda model: self.client.chat.completions.create(
+                model=model,
+                timeout=self.request_timeout,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=200,  # Keep responses brief for voice
+                tools=tools if tools else None
+            ))
+            message = response.choices[0].message
+            usage = getattr(response, "usage", None)
+            trace.update(
+                model=getattr(response, "model", None),
+                response_hash=payload_hash(message.content),
+                tool_calls=len(message.tool_calls or []),
+                completion_tokens=usage.completion_tokens if usage else None
+            )
+        return response, (time.perf_counter() - start) * 1000
+    
+    def _record(self, route: str, response, latency_ms: float, escalated: bool = False) -> Optional[Dict[str, int]]:
+        usage = getattr(response, "usage", None)
+        usage = {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens
+        } if usage else None
+        if self.model_router is not None:
+            self.model_router.record(
+                route, latency_ms, usage, escalated=escalated, model=getattr(response, "model", None)
+            )
+        return usage
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many texts in one request; vectors come back in input order
+        """
+        response = self.client.embeddings.create(
+            model=self.embedding_model, input=texts, timeout=self.request_timeout
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
     def detect_intent_advanced(self, text: str) -> Dict[str, Any]:
         """
         Use LLM to detect intent with better accuracy
@@ -121,17 +254,17 @@ Respond with JSON:
 }}"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self.router.call(lambda model: self.client.chat.completions.create(
+                model=model,
+                timeout=self.request_timeout,
                 messages=[
                     {"role": "system", "content": "You are an intent classification system. Respond only with valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
                 response_format={"type": "json_object"}
-            )
+            ))
             
-            import json
             result = json.loads(response.choices[0].message.content)
             return result
         
@@ -143,4 +276,84 @@ Respond with JSON:
                 "sentiment": "neutral",
                 "error": str(e)
             }
+    
+    def detect_intent_batch(self, texts: List[str]) -> List[Any]:
+        """
+        Classify many messages in one request.
+        Returns one result dict per text, or a ValueError for items the model got wrong.
+        """
+        numbered = "\n".join(f"{i}: {json.dumps(t)}" for i, t in enumerate(texts))
+        prompt = f"""Classify each numbered message independently.
 
+{numbered}
+
+Respond with JSON: {{"results": [one object per message, in order, each with "intent", "confidence", "entities", "sentiment"]}}"""
+        
+        response = self.router.call(lambda model: self.client.chat.completions.create(
+            model=model,
+            timeout=self.request_timeout,
+            messages=[
+                {"role": "system", "content": self.intent_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        ))
+        items = json.loads(response.choices[0].message.content).get("results", [])
+        
+        results: List[Any] = []
+        for i in range(len(texts)):
+            item = items[i] if i < len(items) else None
+            if not isinstance(item, dict) or "intent" not in item:
+                results.append(ValueError(f"No valid classification for message {i}"))
+                continue
+            item.setdefault("confidence", 0.0)
+            item.setdefault("entities", {})
+            item.setdefault("sentiment", "neutral")
+            results.append(item)
+        return results
+    
+    async def detect_intent_batched(self, text: str) -> Dict[str, Any]:
+        """
+        Async detect_intent_advanced that shares a request with concurrent callers
+        """
+        try:
+            return await self.intent_batcher.submit(text)
+        except Exception as e:
+            return {
+                "intent": "unknown",
+                "confidence": 0.0,
+                "entities": {},
+                "sentiment": "neutral",
+                "error": str(e)
+            }
+    
+    def score_sentiment_batch(self, texts: List[str]) -> List[Optional[float]]:
+        """
+        Score many utterances in one request; returns a score in [-1, 1] per text
+        """
+        numbered = "\n".join(f"{i}: {json.dumps(t)}" for i, t in enumerate(texts))
+        prompt = f"""Rate the caller sentiment of each numbered utterance from -1.0 (angry) to 1.0 (very positive).
+
+{numbered}
+
+Respond with JSON: {{"scores": [one number per utterance, in order]}}"""
+        
+        response = self.router.call(lambda model: self.client.chat.completions.create(
+            model=model,
+            timeout=self.request_timeout,
+            messages=[
+                {"role": "system", "content": "You are a sentiment scoring system. Respond only with valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0,
+            response_format={"type": "json_object"}
+        ))
+        scores = json.loads(response.choices[0].message.content).get("scores", [])
+        result: List[Optional[float]] = []
+        for i in range(len(texts)):
+            try:
+                result.append(max(-1.0, min(1.0, float(scores[i]))))
+            except (IndexError, TypeError, ValueError):
+                result.append(None)
+        return result
@@ -0,0 +1,120 @@
+"""
+Async micro-batching of requests from concurrent calls
+"""
+import asyncio
+import inspect
+from typing import Any, Callable, Generic, List, Optional, Sequence, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects items submitted by concurrent callers for up to max_wait seconds
+    (or until max_batch items are queued) and resolves them with one call to
+    batch_fn.
+
+    batch_fn receives a list of items and returns one result per item, in
+    order. A result that is an Exception fails only its own caller. If the
+    whole batch raises one of split_on (a bad item or an unparseable reply),
+    it is split in half and retried so a single poison item cannot fail its
+    neighbours; any other error (transport, rate limit, open circuit) fails
+    the batch once, since retrying the halves would only multiply requests.
+    Synchronous batch functions run in a worker thread so they never block
+    the event loop.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Sequence[Any]],
+        max_batch: int = 16,
+        max_wait: float = 0.01,
+        name: str = "batch",
+        isolate_failures: bool = True,
+        split_on: Tuple[type, ...] = (ValueError, TypeError, KeyError, AttributeError)
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self.isolate_failures = isolate_failures
+        self.split_on = split_on
+        self._is_async = inspect.iscoroutinefunction(batch_fn) or inspect.iscoroutinefunction(
+            getattr(batch_fn, "__call__", None)
+        )
+        self._queue: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.splits = 0
+
+    async def submit(self, item: T) -> R:
+        """
+        Queue an item and wait for its result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _call(self, items: List[T]) -> Sequence[Any]:
+        if self._is_async:
+            return await self.batch_fn(items)
+        return await asyncio.to_thread(self.batch_fn, items)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]], split: bool = False):
+        # Retried halves are not new batches
+        if not split:
+            self.batches += 1
+            self.items += len(batch)
+        try:
+            # A malformed reply fails inside the try, so callers are never left waiting
+            results = list(await self._call([item for item, _ in batch]))
+        except Exception as e:
+            if self.isolate_failures and len(batch) > 1 and isinstance(e, self.split_on):
+                self.splits += 1
+                mid = len(batch) // 2
+                await asyncio.gather(self._run(batch[:mid], True), self._run(batch[mid:], True))
+                return
+            self.failures += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue  # caller was cancelled
+            result = results[i] if i < len(results) else ValueError(f"{self.name}: no result for item {i}")
+            if isinstance(result, Exception):
+                self.failures += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def get_stats(self) -> dict:
+        return {
+            "name": self.name,
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "splits": self.splits,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
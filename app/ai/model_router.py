@@ -0,0 +1,189 @@
+"""
+Per-turn model selection between a fast and a strong LLM
+"""
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from app.services.intent_service import IntentType
+
+ROUTE_FAST = "fast"
+ROUTE_STRONG = "strong"
+
+# Complexity added by the turn's intent; greetings and closings add nothing
+INTENT_WEIGHTS: Dict[str, float] = {
+    IntentType.GREETING.value: 0.0,
+    IntentType.GOODBYE.value: 0.0,
+    IntentType.BUSINESS_HOURS.value: 0.05,
+    IntentType.FAQ.value: 0.2,
+    IntentType.JOB_INQUIRY.value: 0.25,
+    IntentType.APPOINTMENT_BOOKING.value: 0.3,
+    IntentType.TRANSFER.value: 0.3,
+    IntentType.UNKNOWN.value: 0.35,
+    IntentType.COMPLAINT.value: 0.6
+}
+# Intents whose replies usually need a tool call
+TOOL_INTENTS = frozenset({
+    IntentType.APPOINTMENT_BOOKING.value,
+    IntentType.JOB_INQUIRY.value,
+    IntentType.TRANSFER.value
+})
+
+
+class RouteDecision(NamedTuple):
+    route: str
+    score: float
+    reasons: Tuple[str, ...]
+
+
+class RouteCounters:
+    """Latency, token and cost totals for one route"""
+    __slots__ = ("requests", "escalated", "errors", "latency_ms", "prompt_tokens", "completion_tokens", "cost")
+
+    def __init__(self):
+        self.requests = 0
+        self.escalated = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        n = max(self.requests, 1)
+        return {
+            "requests": self.requests,
+            "escalated": self.escalated,
+            "errors": self.errors,
+            "avg_latency_ms": round(self.latency_ms / n, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6),
+            "avg_cost_usd": round(self.cost / n, 6)
+        }
+
+
+class ModelRouter:
+    """
+    Scores each turn's complexity from local signals and picks a model.
+
+    The score adds up the intent's weight, utterance length, whether tools
+    are likely and conversation depth. Turns scoring below the threshold go
+    to the fast model. Turns whose intent is uncertain always go to the
+    strong model, and a fast reply that comes back empty or truncated is
+    redone there (counted as escalated). Per-route counters show how the
+    split performs in production.
+    """
+
+    def __init__(
+        self,
+        intent_service=None,
+        enabled: bool = True,
+        fast_model: str = "gpt-4o-mini",
+        strong_model: str = "gpt-4o",
+        threshold: float = 0.5,
+        min_confidence: float = 0.3,
+        fast_costs: Tuple[float, float] = (0.00015, 0.0006),
+        strong_costs: Tuple[float, float] = (0.0025, 0.01)
+    ):
+        self.intent_service = intent_service
+        self.enabled = enabled
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.threshold = threshold
+        self.min_confidence = min_confidence
+        # USD per 1K (prompt, completion) tokens
+        self.prices: Dict[str, Tuple[float, float]] = {ROUTE_FAST: fast_costs, ROUTE_STRONG: strong_costs}
+        self.counters: Dict[str, RouteCounters] = {ROUTE_FAST: RouteCounters(), ROUTE_STRONG: RouteCounters()}
+        self.low_confidence = 0
+        self._lock = threading.Lock()
+
+    def route(
+        self,
+        text: str,
+        intent: Optional[str] = None,
+        confidence: Optional[float] = None,
+        history_turns: int = 0,
+        tools_offered: bool = False
+    ) -> RouteDecision:
+        """
+        Pick the route for one turn; intent is detected locally when not given
+        """
+        if not self.enabled:
+            return RouteDecision(ROUTE_STRONG, 1.0, ("routing_disabled",))
+        if intent is None and self.intent_service is not None:
+            detected = self.intent_service.detect_intent(text)
+            intent = detected["intent"]
+            intent = intent.value if hasattr(intent, "value") else intent
+            confidence = detected["confidence"]
+
+        reasons = []
+        score = INTENT_WEIGHTS.get(intent or "", INTENT_WEIGHTS[IntentType.UNKNOWN.value])
+        reasons.append(f"intent:{intent or 'none'}")
+        words = len(text.split())
+        if words > 25:
+            score += 0.3
+            reasons.append("long_utterance")
+        elif words > 12:
+            score += 0.15
+            reasons.append("medium_utterance")
+        if tools_offered and intent in TOOL_INTENTS:
+            score += 0.2
+            reasons.append("tools_likely")
+        if history_turns > 8:
+            score += 0.15
+            reasons.append("deep_conversation")
+        score = round(min(score, 1.0), 3)
+
+        if confidence is not None and confidence < self.min_confidence and intent not in (
+            IntentType.GREETING.value, IntentType.GOODBYE.value
+        ):
+            # Local signals are unreliable for this turn: don't bet on the small model
+            self.low_confidence += 1
+            return RouteDecision(ROUTE_STRONG, score, tuple(reasons) + ("low_confidence",))
+        return RouteDecision(ROUTE_STRONG if score >= self.threshold else ROUTE_FAST, score, tuple(reasons))
+
+    @staticmethod
+    def needs_escalation(text: Optional[str], finish_reason: Optional[str], tool_calls: bool) -> bool:
+        """
+        Whether a fast-model reply should be redone by the strong model
+        """
+        return not tool_calls and (not (text or "").strip() or finish_reason == "length")
+
+    def record(
+        self,
+        route: str,
+        latency_ms: float,
+        usage: Optional[Dict[str, int]] = None,
+        error: bool = False,
+        escalated: bool = False,
+        model: Optional[str] = None
+    ):
+        prompt_tokens = (usage or {}).get("prompt_tokens", 0)
+        completion_tokens = (usage or {}).get("completion_tokens", 0)
+        # Price by the model that answered; a route's provider fallback may have used the other one
+        priced = route if model is None else (ROUTE_FAST if model.startswith(self.fast_model) else ROUTE_STRONG)
+        prompt_price, completion_price = self.prices[priced]
+        with self._lock:
+            counters = self.counters[route]
+            counters.requests += 1
+            counters.latency_ms += latency_ms
+            counters.prompt_tokens += prompt_tokens
+            counters.completion_tokens += completion_tokens
+            counters.cost += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+            if error:
+                counters.errors += 1
+            if escalated:
+                counters.escalated += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = sum(c.requests for c in self.counters.values())
+        return {
+            "enabled": self.enabled,
+            "fast_model": self.fast_model,
+            "strong_model": self.strong_model,
+            "threshold": self.threshold,
+            "min_confidence": self.min_confidence,
+            "fast_share": round(self.counters[ROUTE_FAST].requests / total, 4) if total else None,
+            "low_confidence_overrides": self.low_confidence,
+            "routes": {route: c.get_stats() for route, c in self.counters.items()}
+        }
@@ -0,0 +1,176 @@
+"""
+Speculative LLM generation on stable partial transcripts
+"""
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+_NON_WORD = re.compile(r"[^\w\s']")
+_DISFLUENCIES = frozenset({"um", "uh", "er", "ah", "hmm", "mm", "uhm"})
+
+# Generation kwargs that choose the model route; a speculation only serves a
+# final turn that would be routed the same way
+ROUTING_ARGS = ("intent", "intent_confidence")
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    Comparison form of a transcript: lowercase, no punctuation or filler words
+    """
+    words = _NON_WORD.sub(" ", text.lower()).split()
+    return " ".join(w for w in words if w not in _DISFLUENCIES)
+
+
+def speculation_key(text: str, kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (normalize_utterance(text),) + tuple(kwargs.get(name) for name in ROUTING_ARGS)
+
+
+class _Speculation:
+    __slots__ = ("key", "task", "started", "finished")
+
+    def __init__(self, key: Tuple[Any, ...], task: "asyncio.Future[Dict[str, Any]]"):
+        self.key = key
+        self.task = task
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+
+class SpeculativeGenerator:
+    """
+    Starts response generation before the caller has finished speaking.
+
+    Once a call's partial transcript has stopped changing for `stable_ms`,
+    generation starts on it. If the final transcript normalizes to the same
+    text, the in-flight result is used and its head start comes off the
+    turn gap. Otherwise the speculation is discarded and generation restarts
+    on the final text. A discarded request cannot be recalled from the
+    provider, so its tokens are counted as wasted when it completes.
+    """
+
+    def __init__(self, llm_service, enabled: bool = True, stable_ms: float = 300, min_words: int = 3):
+        self.llm_service = llm_service
+        self.enabled = enabled
+        self.stable = stable_ms / 1000
+        self.min_words = min_words
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.superseded = 0
+        self.unused = 0
+        self.wasted_tokens = 0
+        self.saved_s = 0.0
+
+    def turn(self) -> "SpeculativeTurn":
+        return SpeculativeTurn(self)
+
+    async def generate(self, text: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.llm_service.generate_response, text, **kwargs)
+
+    def _launch(self, key: Tuple[Any, ...], text: str, kwargs: Dict[str, Any]) -> _Speculation:
+        spec = _Speculation(key, asyncio.ensure_future(self.generate(text, kwargs)))
+
+        def finished(_):
+            spec.finished = time.perf_counter()
+        spec.task.add_done_callback(finished)
+        self.started += 1
+        return spec
+
+    def _discard(self, spec: _Speculation, reason: str):
+        setattr(self, reason, getattr(self, reason) + 1)
+
+        def count_waste(task):
+            if task.cancelled() or task.exception() is not None:
+                return
+            usage = task.result().get("usage") or {}
+            self.wasted_tokens += usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        spec.task.add_done_callback(count_waste)
+
+    def get_stats(self) -> Dict[str, Any]:
+        resolved = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "superseded": self.superseded,
+            "unused": self.unused,
+            "hit_rate": round(self.hits / resolved, 4) if resolved else None,
+            "wasted_tokens": self.wasted_tokens,
+            "avg_saved_ms": round(self.saved_s / self.hits * 1000, 1) if self.hits else None
+        }
+
+
+class SpeculativeTurn:
+    """
+    One call's speculation state: feed partial transcripts, then resolve the
+    turn with the final one. Generation kwargs (history, system prompt) are
+    captured when the speculation starts and must not change within a turn;
+    the routing kwargs are part of the key, so a final turn routed to a
+    different model never reuses the speculation.
+    """
+
+    def __init__(self, generator: SpeculativeGenerator):
+        self.generator = generator
+        self._key: Optional[Tuple[Any, ...]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._spec: Optional[_Speculation] = None
+
+    def partial(self, text: str, **kwargs):
+        """
+        Observe a partial hypothesis; generation starts once it holds still
+        """
+        generator = self.generator
+        if not generator.enabled:
+            return
+        key = speculation_key(text, kwargs)
+        if key == self._key:
+            return
+        self._key = key
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._spec is not None and self._spec.key != key:
+            generator._discard(self._spec, "superseded")
+            self._spec = None
+        if self._spec is None and len(key[0].split()) >= generator.min_words:
+            self._timer = asyncio.get_running_loop().call_later(
+                generator.stable, self._start, key, text, kwargs
+            )
+
+    def _start(self, key: Tuple[Any, ...], text: str, kwargs: Dict[str, Any]):
+        self._timer = None
+        self._spec = self.generator._launch(key, text, kwargs)
+
+    async def final(self, text: str, **kwargs) -> Dict[str, Any]:
+        """
+        The response for the final transcript, reusing a matching speculation
+        """
+        spec = self._reset()
+        generator = self.generator
+        if spec is not None:
+            if spec.key == speculation_key(text, kwargs):
+                generator.hits += 1
+                # The head start is however long generation ran before the final arrived
+                now = time.perf_counter()
+                generator.saved_s += (spec.finished or now) - spec.started
+                return await spec.task
+            generator._discard(spec, "misses")
+        return await generator.generate(text, kwargs)
+
+    def cancel(self):
+        """
+        Drop any speculation, e.g. the turn was answered without the LLM or the call ended
+        """
+        spec = self._reset()
+        if spec is not None:
+            self.generator._discard(spec, "unused")
+
+    def _reset(self) -> Optional[_Speculation]:
+        if self._timer is not None:
+            self._timer.cancel()
+        spec = self._spec
+        self._key = None
+        self._timer = None
+        self._spec = None
+        return spec
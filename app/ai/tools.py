@@ -1,165 +1,304 @@
 """
 Tool definitions for LLM function calling
 """
-from typing import Dict, Any, List
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Type, Union
 
+from pydantic import BaseModel, Field, ValidationError
 
-def get_tool_definitions() -> List[Dict[str, Any]]:
+from app.container import container
+from app.services.booking_service import SlotUnavailableError
+from app.services.call_tracer import payload_hash, span
+
+
+class RegisteredTool:
+    """A tool with its argument model compiled and its schema prebuilt"""
+    __slots__ = ("name", "description", "args_model", "handler", "is_async", "cache_ttl", "cache", "schema")
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        args_model: Type[BaseModel],
+        handler: Callable[..., Union[Dict[str, Any], Awaitable[Dict[str, Any]]]],
+        cache_ttl: Optional[float] = None
+    ):
+        self.name = name
+        self.description = description
+        self.args_model = args_model
+        self.handler = handler
+        self.is_async = asyncio.iscoroutinefunction(handler)
+        self.cache_ttl = cache_ttl
+        # Validated-arguments key -> (expires_at, result)
+        self.cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        parameters = args_model.model_json_schema()
+        parameters.pop("title", None)
+        for prop in parameters.get("properties", {}).values():
+            prop.pop("title", None)
+        parameters.setdefault("required", [])
+        self.schema = {
+            "type": "function",
+            "function": {"name": name, "description": description, "parameters": parameters}
+        }
+
+
+class ToolRegistry:
     """
-    Define available tools for LLM function calling
+    Tools registered by decorator and dispatched by dict lookup.
+
+    Argument models and the function-calling schema are built once at
+    registration; the schema payload handed to the LLM is cached until the
+    next registration. Read-only tools can opt into a per-tool TTL cache,
+    keyed by the calling tenant as well as the arguments.
     """
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "get_business_hours",
-                "description": "Get the business operating hours",
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "get_job_openings",
-                "description": "Fetch current job openings and positions available",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "department": {
-                            "type": "string",
-                            "description": "Filter by department (optional)"
-                        }
-                    },
-                    "required": []
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "book_appointment",
-                "description": "Schedule an appointment for the caller",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "date": {
-                            "type": "string",
-                            "description": "Preferred date (YYYY-MM-DD)"
-                        },
-                        "time": {
-                            "type": "string",
-                            "description": "Preferred time (HH:MM)"
-                        },
-                        "service": {
-                            "type": "string",
-                            "description": "Type of service needed"
-                        }
-                    },
-                    "required": ["date", "time"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "search_faqs",
-                "description": "Search frequently asked questions",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "Search query"
-                        }
-                    },
-                    "required": ["query"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "transfer_to_human",
-                "description": "Transfer the call to a human agent",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "reason": {
-                            "type": "string",
-                            "description": "Reason for transfer"
-                        },
-                        "priority": {
-                            "type": "string",
-                            "enum": ["low", "normal", "high", "urgent"],
-                            "description": "Transfer priority"
-                        }
-                    },
-                    "required": []
-                }
+
+    def __init__(self):
+        self.tools: Dict[str, RegisteredTool] = {}
+        self._definitions: Optional[List[Dict[str, Any]]] = None
+        self._definitions_json: Optional[str] = None
+
+    def tool(
+        self,
+        name: str,
+        description: str,
+        args_model: Type[BaseModel],
+        cache_ttl: Optional[float] = None
+    ):
+        """
+        Register the decorated function as a tool
+        """
+        def decorator(handler):
+            self.tools[name] = RegisteredTool(name, description, args_model, handler, cache_ttl)
+            self._definitions = None
+            self._definitions_json = None
+            return handler
+        return decorator
+
+    def definitions(self) -> List[Dict[str, Any]]:
+        """
+        Schema for every tool; shared, do not mutate
+        """
+        if self._definitions is None:
+            self._definitions = [t.schema for t in self.tools.values()]
+        return self._definitions
+
+    def definitions_json(self) -> str:
+        if self._definitions_json is None:
+            self._definitions_json = json.dumps(self.definitions())
+        return self._definitions_json
+
+    async def execute(self, tool_name: str, arguments: Union[Dict[str, Any], str, None]) -> Dict[str, Any]:
+        """
+        Validate arguments and run a tool. Sync handlers run in a worker thread
+        so tool I/O never blocks the event loop; a handler that raises returns
+        an error result for the LLM rather than failing the call.
+        """
+        tool = self.tools.get(tool_name)
+        if tool is None:
+            return {"error": f"Unknown tool: {tool_name}"}
+
+        try:
+            if isinstance(arguments, str):
+                # LLM tool calls carry arguments as a JSON string
+                args = tool.args_model.model_validate_json(arguments or "{}")
+            else:
+                args = tool.args_model.model_validate(arguments or {})
+        except ValidationError as e:
+            return {"error": f"Invalid arguments for {tool_name}", "details": e.errors(include_url=False)}
+
+        key = None
+        if tool.cache_ttl:
+            # Tenant-scoped tools answer differently per tenant for the same arguments
+            key = f"{current_tenant.get() or ''}\x1f{args.model_dump_json()}"
+            cached = tool.cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+        with span("tool", tool=tool_name, args_hash=payload_hash(key or args.model_dump_json())) as trace:
+            try:
+                if tool.is_async:
+                    result = await tool.handler(args)
+                else:
+                    # The thread inherits this context: call trace and current_tenant
+                    result = await asyncio.to_thread(tool.handler, args)
+            except Exception as e:
+                result = {"error": f"{tool_name} failed: {e}"}
+            trace["failed"] = "error" in result
+
+        if key is not None and "error" not in result:
+            tool.cache[key] = (time.monotonic() + tool.cache_ttl, result)
+        return result
+
+    def invalidate(self, tool_name: Optional[str] = None):
+        """
+        Drop cached results for one tool, or for all tools
+        """
+        for tool in ([self.tools[tool_name]] if tool_name else self.tools.values()):
+            tool.cache.clear()
+
+
+registry = ToolRegistry()
+
+# Tenant of the call whose tool calls are running; tenant-scoped tools read it
+current_tenant: ContextVar[Optional[str]] = ContextVar("tool_tenant", default=None)
+
+
+# Argument models
+
+class NoArgs(BaseModel):
+    pass
+
+
+class JobOpeningsArgs(BaseModel):
+    department: Optional[str] = Field(None, description="Filter by department (optional)")
+
+
+class BookAppointmentArgs(BaseModel):
+    date: str = Field(..., description="Preferred date (YYYY-MM-DD)")
+    time: str = Field(..., description="Preferred time (HH:MM)")
+    service: Optional[str] = Field(None, description="Type of service needed")
+
+
+class AvailableSlotsArgs(BaseModel):
+    date: Optional[str] = Field(None, description="Earliest date to consider (YYYY-MM-DD, optional)")
+    count: int = Field(3, ge=1, le=10, description="How many slots to offer")
+
+
+class SearchFaqsArgs(BaseModel):
+    query: str = Field(..., description="Search query")
+
+
+class TransferArgs(BaseModel):
+    reason: Optional[str] = Field(None, description="Reason for transfer")
+    priority: Literal["low", "normal", "high", "urgent"] = Field("normal", description="Transfer priority")
+
+
+# Tools
+
+DEFAULT_BUSINESS_HOURS = "Monday to Friday: 9 AM - 5 PM EST"
+
+
+@registry.tool("get_business_hours", "Get the business operating hours", NoArgs, cache_ttl=300)
+def get_business_hours(args: NoArgs) -> Dict[str, Any]:
+    tenant = container.tenant_registry.get(current_tenant.get())
+    return {
+        "business": tenant.name,
+        "hours": tenant.business_hours or DEFAULT_BUSINESS_HOURS
+    }
+
+
+@registry.tool(
+    "get_job_openings", "Fetch current job openings and positions available", JobOpeningsArgs, cache_ttl=300
+)
+def get_job_openings(args: JobOpeningsArgs) -> Dict[str, Any]:
+    # In production, query database
+    return {
+        "openings": [
+            {
+                "title": "Software Engineer",
+                "department": "Engineering",
+                "location": "Remote"
             }
+        ],
+        "department": args.department
+    }
+
+
+def _slot(slot: Dict[str, Any]) -> Dict[str, str]:
+    return {"date": slot["start"].strftime("%Y-%m-%d"), "time": slot["start"].strftime("%H:%M")}
+
+
+@registry.tool("book_appointment", "Schedule an appointment for the caller", BookAppointmentArgs)
+def book_appointment(args: BookAppointmentArgs) -> Dict[str, Any]:
+    try:
+        start = datetime.strptime(f"{args.date} {args.time}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return {"error": "Date must be YYYY-MM-DD and time HH:MM"}
+
+    booking_service = container.booking_service
+    try:
+        booking = booking_service.book(start, service=args.service)
+    except SlotUnavailableError as e:
+        return {
+            "status": "unavailable",
+            "message": str(e),
+            "alternatives": [_slot(s) for s in booking_service.next_available(start)]
         }
-    ]
+    return {
+        "status": "success",
+        "appointment_id": booking["booking_id"],
+        "date": args.date,
+        "time": args.time,
+        "message": "Appointment scheduled successfully"
+    }
+
+
+@registry.tool(
+    "get_available_slots", "Find the next open appointment times", AvailableSlotsArgs
+)
+def get_available_slots(args: AvailableSlotsArgs) -> Dict[str, Any]:
+    try:
+        after = datetime.strptime(args.date, "%Y-%m-%d") if args.date else None
+    except ValueError:
+        return {"error": "Date must be YYYY-MM-DD"}
+    return {"slots": [_slot(s) for s in container.booking_service.next_available(after, args.count)]}
+
+
+@registry.tool("search_faqs", "Search frequently asked questions", SearchFaqsArgs)
+def search_faqs(args: SearchFaqsArgs) -> Dict[str, Any]:
+    faq_index = container.tenant_registry.get(current_tenant.get()).faq_index
+    return {
+        "results": [
+            {"question": faq["question"], "answer": faq["answer"]}
+            for faq in faq_index.search(args.query, limit=3)
+        ]
+    }
+
+
+@registry.tool("transfer_to_human", "Transfer the call to a human agent", TransferArgs)
+def transfer_to_human(args: TransferArgs) -> Dict[str, Any]:
+    return {
+        "status": "transferring",
+        "reason": args.reason or "User request",
+        "priority": args.priority,
+        "estimated_wait": 30
+    }
+
+
+def get_tool_definitions() -> List[Dict[str, Any]]:
+    """
+    Define available tools for LLM function calling
+    """
+    return registry.definitions()
 
 
-async def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+async def execute_tool(tool_name: str, arguments: Union[Dict[str, Any], str, None]) -> Dict[str, Any]:
     """
     Execute a tool/function call
     """
-    if tool_name == "get_business_hours":
-        return {
-            "hours": "Monday to Friday: 9 AM - 5 PM EST",
-            "timezone": "EST"
-        }
-    
-    elif tool_name == "get_job_openings":
-        department = arguments.get("department")
-        # In production, query database
-        return {
-            "openings": [
-                {
-                    "title": "Software Engineer",
-                    "department": "Engineering",
-                    "location": "Remote"
-                }
-            ],
-            "department": department
-        }
-    
-    elif tool_name == "book_appointment":
-        # In production, call scheduling API
-        return {
-            "status": "success",
-            "appointment_id": "apt_123",
-            "date": arguments.get("date"),
-            "time": arguments.get("time"),
-            "message": "Appointment scheduled successfully"
-        }
-    
-    elif tool_name == "search_faqs":
-        query = arguments.get("query", "")
-        # In production, use vector search
-        return {
-            "results": [
-                {
-                    "question": "Sample FAQ",
-                    "answer": "Sample answer"
-                }
-            ]
-        }
-    
-    elif tool_name == "transfer_to_human":
-        return {
-            "status": "transferring",
-            "reason": arguments.get("reason", "User request"),
-            "estimated_wait": 30
-        }
-    
-    else:
-        return {
-            "error": f"Unknown tool: {tool_name}"
-        }
+    return await registry.execute(tool_name, arguments)
 
+
+async def tool_call_messages(tool_calls: List[Any], tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Run an LLM reply's tool calls for a tenant's call. Returns the assistant
+    turn that made them and one result message per call, to be appended to
+    the conversation for the follow-up completion.
+    """
+    token = current_tenant.set(tenant_id)
+    try:
+        results = [await execute_tool(call.function.name, call.function.arguments) for call in tool_calls]
+    finally:
+        current_tenant.reset(token)
+    calls = [
+        {"id": call.id, "type": "function", "function": {"name": call.function.name, "arguments": call.function.arguments}}
+        for call in tool_calls
+    ]
+    return [{"role": "assistant", "content": None, "tool_calls": calls}] + [
+        {"role": "tool", "tool_call_id": call.id, "content": json.dumps(result, default=str)}
+        for call, result in zip(tool_calls, results)
+    ]
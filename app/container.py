@@ -0,0 +1,682 @@
+"""
+Dependency container: configuration read once, services built lazily and shared
+"""
+import os
+import threading
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Loaded on import, before any service is built; real environment variables win over .env
+load_dotenv(PROJECT_ROOT / ".env")
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _list(name: str, default: str) -> List[str]:
+    return [v.strip() for v in os.getenv(name, default).split(",") if v.strip()]
+
+
+def _path(name: str, default: str) -> Path:
+    # Relative paths are taken from the project root, not the working directory
+    return PROJECT_ROOT / os.getenv(name, default)
+
+
+class Settings:
+    """
+    Process-wide configuration, read from the environment (and .env) once.
+
+    Services take their settings as constructor arguments from the container
+    and never read the environment themselves.
+    """
+
+    def __init__(self):
+        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.database_type = os.getenv("DATABASE_TYPE", "memory")
+        self.prewarm = _flag("PREWARM", "true")
+        self.prompts_dir = _path("PROMPTS_DIR", "prompts")
+
+        # LLM providers and per-turn model routing
+        self.openai_model = os.getenv("OPENAI_MODEL", "gpt-4o")
+        self.openai_fallback_models = _list("OPENAI_FALLBACK_MODELS", "gpt-4o-mini")
+        self.llm_latency_budget_ms = float(os.getenv("LLM_LATENCY_BUDGET_MS", "1500"))
+        self.llm_fast_latency_budget_ms = float(os.getenv("LLM_FAST_LATENCY_BUDGET_MS", "800"))
+        self.llm_deadline_ms = float(os.getenv("LLM_DEADLINE_MS", "10000"))
+        self.llm_routing_enabled = _flag("LLM_ROUTING_ENABLED", "true")
+        self.llm_fast_model = os.getenv("LLM_FAST_MODEL", "gpt-4o-mini")
+        self.llm_route_threshold = float(os.getenv("LLM_ROUTE_THRESHOLD", "0.5"))
+        self.llm_route_min_confidence = float(os.getenv("LLM_ROUTE_MIN_CONFIDENCE", "0.3"))
+        self.llm_fast_costs = (
+            float(os.getenv("LLM_FAST_PROMPT_COST_PER_1K", "0.00015")),
+            float(os.getenv("LLM_FAST_COMPLETION_COST_PER_1K", "0.0006"))
+        )
+        self.llm_strong_costs = (
+            float(os.getenv("LLM_STRONG_PROMPT_COST_PER_1K", "0.0025")),
+            float(os.getenv("LLM_STRONG_COMPLETION_COST_PER_1K", "0.01"))
+        )
+        self.intent_batch_max = int(os.getenv("INTENT_BATCH_MAX", "16"))
+        self.intent_batch_wait_ms = float(os.getenv("INTENT_BATCH_WAIT_MS", "10"))
+        self.faq_embedding_model = os.getenv("FAQ_EMBEDDING_MODEL", "text-embedding-3-small")
+
+        # TTS providers
+        self.tts_provider = os.getenv("TTS_PROVIDER", "elevenlabs")
+        self.tts_fallback_providers = _list("TTS_FALLBACK_PROVIDERS", "openai")
+        self.tts_latency_budget_ms = float(os.getenv("TTS_LATENCY_BUDGET_MS", "800"))
+        self.tts_deadline_ms = float(os.getenv("TTS_DEADLINE_MS", "8000"))
+        self.elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
+        self.elevenlabs_voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+
+        # Provider circuit breakers
+        self.provider_failure_threshold = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "5"))
+        self.provider_reset_timeout = float(os.getenv("PROVIDER_RESET_TIMEOUT", "30"))
+        self.provider_request_timeout = float(os.getenv("PROVIDER_REQUEST_TIMEOUT", "4"))
+
+        # Admission control and tenant quotas
+        self.admission_min_limit = int(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+        self.admission_max_limit = int(os.getenv("ADMISSION_MAX_LIMIT", "500"))
+        self.admission_initial_limit = float(os.getenv("ADMISSION_INITIAL_LIMIT", "50"))
+        self.admission_target_latency_ms = float(os.getenv("ADMISSION_TARGET_LATENCY_MS", "2000"))
+        self.admission_backoff = float(os.getenv("ADMISSION_BACKOFF", "0.9"))
+        self.admission_decrease_cooldown = float(os.getenv("ADMISSION_DECREASE_COOLDOWN", "1.0"))
+        self.admission_shed_action = os.getenv("ADMISSION_SHED_ACTION", "transfer")
+        self.admission_retry_after_s = int(os.getenv("ADMISSION_RETRY_AFTER_S", "5"))
+        self.tenant_default_quota = int(os.getenv("TENANT_DEFAULT_QUOTA", "0"))
+        self.tenant_call_quotas = os.getenv("TENANT_CALL_QUOTAS", "")
+
+        # Call lifecycle timers
+        self.call_idle_timeout_s = float(os.getenv("CALL_IDLE_TIMEOUT_S", "60"))
+        self.call_max_duration_s = float(os.getenv("CALL_MAX_DURATION_S", "3600"))
+        self.call_silence_prompt_s = float(os.getenv("CALL_SILENCE_PROMPT_S", "10"))
+        self.call_silence_max_prompts = int(os.getenv("CALL_SILENCE_MAX_PROMPTS", "2"))
+        self.call_timer_tick_ms = float(os.getenv("CALL_TIMER_TICK_MS", "100"))
+
+        # Returning callers
+        self.caller_history_recent_calls = int(os.getenv("CALLER_HISTORY_RECENT_CALLS", "5"))
+        self.caller_history_hot_callers = int(os.getenv("CALLER_HISTORY_HOT_CALLERS", "10000"))
+        self.caller_prefetch_wait_ms = float(os.getenv("CALLER_PREFETCH_WAIT_MS", "300"))
+
+        # Inbound audio jitter buffer
+        self.jitter_frame_ms = float(os.getenv("JITTER_FRAME_MS", "20"))
+        self.jitter_min_depth = int(os.getenv("JITTER_MIN_DEPTH", "2"))
+        self.jitter_max_depth = int(os.getenv("JITTER_MAX_DEPTH", "12"))
+        self.jitter_max_ptime_ms = float(os.getenv("JITTER_MAX_PTIME_MS", "60"))
+
+        # Call workflow
+        self.workflow_path = _path("WORKFLOW_PATH", "workflows/call_flow.json")
+        self.workflow_low_confidence = float(os.getenv("WORKFLOW_LOW_CONFIDENCE", "0.3"))
+        self.workflow_max_clarifications = int(os.getenv("WORKFLOW_MAX_CLARIFICATIONS", "3"))
+
+        # Live sentiment
+        self.sentiment_llm = _flag("SENTIMENT_LLM", "false")
+        self.sentiment_ewma_alpha = float(os.getenv("SENTIMENT_EWMA_ALPHA", "0.5"))
+        self.sentiment_escalation_threshold = float(os.getenv("SENTIMENT_ESCALATION_THRESHOLD", "-0.45"))
+        self.sentiment_negative_streak = int(os.getenv("SENTIMENT_NEGATIVE_STREAK", "3"))
+        self.sentiment_window = int(os.getenv("SENTIMENT_WINDOW", "10"))
+        self.sentiment_batch_max = int(os.getenv("SENTIMENT_BATCH_MAX", "32"))
+        self.sentiment_batch_wait_ms = float(os.getenv("SENTIMENT_BATCH_WAIT_MS", "50"))
+
+        # Speculative replies and filler audio
+        self.speculation_enabled = _flag("SPECULATION_ENABLED", "true")
+        self.speculation_stable_ms = float(os.getenv("SPECULATION_STABLE_MS", "300"))
+        self.speculation_min_words = int(os.getenv("SPECULATION_MIN_WORDS", "3"))
+        self.filler_enabled = _flag("FILLER_ENABLED", "true")
+        self.filler_budget_ms = float(os.getenv("FILLER_BUDGET_MS", "700"))
+
+        # Recording, traces and analytics output
+        self.recording_enabled = _flag("RECORDING_ENABLED", "false")
+        self.recording_dir = _path("RECORDING_DIR", "recordings")
+        self.recording_chunk_bytes = int(os.getenv("RECORDING_CHUNK_BYTES", str(4 * 1024 * 1024)))
+        self.recording_queue_frames = int(os.getenv("RECORDING_QUEUE_FRAMES", "20000"))
+        self.trace_enabled = _flag("TRACE_ENABLED", "false")
+        self.trace_dir = _path("TRACE_DIR", "traces")
+        self.trace_max_events = int(os.getenv("TRACE_MAX_EVENTS", "50000"))
+        self.analytics_output_dir = _path("ANALYTICS_OUTPUT_DIR", "analytics")
+
+        # Transcript search
+        self.transcript_flush_docs = int(os.getenv("TRANSCRIPT_FLUSH_DOCS", "20000"))
+        self.transcript_merge_factor = int(os.getenv("TRANSCRIPT_MERGE_FACTOR", "8"))
+
+        # Appointment booking
+        self.booking_resources = _list("BOOKING_RESOURCES", "default")
+        self.booking_slot_minutes = int(os.getenv("BOOKING_SLOT_MINUTES", "30"))
+        self.booking_open_hour = int(os.getenv("BOOKING_OPEN_HOUR", "9"))
+        self.booking_close_hour = int(os.getenv("BOOKING_CLOSE_HOUR", "17"))
+        self.booking_horizon_days = int(os.getenv("BOOKING_HORIZON_DAYS", "60"))
+        self.booking_max_retries = int(os.getenv("BOOKING_MAX_RETRIES", "8"))
+
+        # Tenants and FAQ import
+        self.tenants_dir = _path("TENANTS_DIR", "tenants")
+        self.tenant_cache_mb = float(os.getenv("TENANT_CACHE_MB", "256"))
+        self.faq_pool_min_faqs = int(os.getenv("FAQ_POOL_MIN_FAQS", "2000"))
+        self.faq_embed_batch = int(os.getenv("FAQ_EMBED_BATCH", "256"))
+        self.faq_embed_concurrency = int(os.getenv("FAQ_EMBED_CONCURRENCY", "4"))
+        self.faq_import_max_rows = int(os.getenv("FAQ_IMPORT_MAX_ROWS", "200000"))
+
+        # CPU pool
+        self.cpu_pool_enabled = _flag("CPU_POOL_ENABLED", "false")
+        self.cpu_pool_workers = int(os.getenv("CPU_POOL_WORKERS", "0"))
+        self.cpu_pool_live_reserve = int(os.getenv("CPU_POOL_LIVE_RESERVE", "1"))
+        self.cpu_pool_shm_slot_kb = float(os.getenv("CPU_POOL_SHM_SLOT_KB", "4096"))
+        self.cpu_pool_start_method = os.getenv("CPU_POOL_START_METHOD", "spawn")
+
+
+class service(cached_property):
+    """
+    cached_property without the per-property lock Python 3.11 adds.
+
+    Container._build already serializes construction; a second lock per
+    property can be taken in the opposite order by another thread and deadlock.
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self.attrname, _MISSING)
+        if value is _MISSING:
+            value = instance.__dict__[self.attrname] = self.func(instance)
+        return value
+
+
+_MISSING = object()
+
+
+class Container:
+    """
+    Owns every shared service for one worker process.
+
+    Nothing is constructed up front: each service is built on first access
+    (thread-safe) so importing the app stays cheap, and prewarm() fills the
+    caches from a background thread after startup.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        if settings is not None:
+            self.__dict__["settings"] = settings
+        self._lock = threading.RLock()
+        self.warm = threading.Event()
+        self.startup_timings: Dict[str, float] = {}
+
+    def _build(self, name: str, factory):
+        # Construction is guarded here rather than per property (see service)
+        with self._lock:
+            if name not in self.__dict__:
+                start = time.perf_counter()
+                self.__dict__[name] = factory()
+                self.startup_timings[name] = round((time.perf_counter() - start) * 1000, 2)
+            return self.__dict__[name]
+
+    @service
+    def settings(self) -> Settings:
+        return self._build("settings", Settings)
+
+    @service
+    def openai_client(self):
+        def factory():
+            from openai import OpenAI
+            if not self.settings.openai_api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            return OpenAI(api_key=self.settings.openai_api_key)
+        return self._build("openai_client", factory)
+
+    @service
+    def database(self):
+        from app.db.database import Database
+        return self._build("database", lambda: Database(db_type=self.settings.database_type))
+
+    @service
+    def call_service(self):
+        def factory():
+            from app.services.call_service import CallService
+            return CallService(database=self.database, transcript_index=self.transcript_index)
+        return self._build("call_service", factory)
+
+    @service
+    def transcript_index(self):
+        def factory():
+            from app.services.transcript_search import TranscriptIndex
+            index = TranscriptIndex(
+                flush_docs=self.settings.transcript_flush_docs,
+                merge_factor=self.settings.transcript_merge_factor
+            )
+            index.add_many(self.database.conversations)
+            return index
+        return self._build("transcript_index", factory)
+
+    @service
+    def worker_pool(self):
+        def factory():
+            if not self.settings.cpu_pool_enabled:
+                return None
+            from app.services.cpu_tasks import TASKS
+            from app.services.worker_pool import WorkerPool
+            s = self.settings
+            pool = WorkerPool(
+                workers=s.cpu_pool_workers,
+                live_reserve=s.cpu_pool_live_reserve,
+                shm_slot_bytes=int(s.cpu_pool_shm_slot_kb * 1024),
+                start_method=s.cpu_pool_start_method
+            )
+            for name, (fn, priority, max_queue) in TASKS.items():
+                pool.register(name, fn, priority, max_queue)
+            return pool
+        return self._build("worker_pool", factory)
+
+    @service
+    def intent_service(self):
+        def factory():
+            from app.services.intent_service import IntentService
+            return IntentService()
+        return self._build("intent_service", factory)
+
+    @service
+    def sentiment_service(self):
+        def factory():
+            from app.services.sentiment_service import SentimentService
+            # The LLM pass is optional; the lexicon model always runs inline
+            s = self.settings
+            llm_service = self.llm_service if s.openai_api_key else None
+            return SentimentService(
+                llm_service=llm_service,
+                use_llm=s.sentiment_llm,
+                alpha=s.sentiment_ewma_alpha,
+                escalation_threshold=s.sentiment_escalation_threshold,
+                negative_streak_limit=s.sentiment_negative_streak,
+                window=s.sentiment_window,
+                batch_max=s.sentiment_batch_max,
+                batch_wait_ms=s.sentiment_batch_wait_ms
+            )
+        return self._build("sentiment_service", factory)
+
+    @service
+    def caller_history(self):
+        def factory():
+            from app.services.caller_history import CallerHistory
+            s = self.settings
+            history = CallerHistory(
+                self.database,
+                recent_calls=s.caller_history_recent_calls,
+                max_hot=s.caller_history_hot_callers,
+                wait_ms=s.caller_prefetch_wait_ms
+            )
+            history.add_many(self.database.calls.values())
+            return history
+        return self._build("caller_history", factory)
+
+    @service
+    def call_lifecycle(self):
+        def factory():
+            from app.services.call_lifecycle import CallLifecycle
+            s = self.settings
+            return CallLifecycle(
+                self.call_service,
+                admission_controller=self.admission_controller,
+                sentiment_service=self.sentiment_service,
+                caller_history=self.caller_history,
+                idle_timeout=s.call_idle_timeout_s,
+                max_duration=s.call_max_duration_s,
+                silence_timeout=s.call_silence_prompt_s,
+                max_silence_prompts=s.call_silence_max_prompts,
+                tick=s.call_timer_tick_ms / 1000
+            )
+        return self._build("call_lifecycle", factory)
+
+    @service
+    def booking_service(self):
+        def factory():
+            from app.services.booking_service import BookingService
+            s = self.settings
+            return BookingService(
+                self.database,
+                resources=s.booking_resources,
+                slot_minutes=s.booking_slot_minutes,
+                open_hour=s.booking_open_hour,
+                close_hour=s.booking_close_hour,
+                horizon_days=s.booking_horizon_days,
+                max_retries=s.booking_max_retries
+            )
+        return self._build("booking_service", factory)
+
+    @service
+    def admission_controller(self):
+        def factory():
+            from app.services.admission_service import AdmissionController
+            from app.services.provider_router import add_listener
+            s = self.settings
+            controller = AdmissionController(
+                tts_service=self.tts_service,
+                min_limit=s.admission_min_limit,
+                max_limit=s.admission_max_limit,
+                initial_limit=s.admission_initial_limit,
+                target_latency_ms=s.admission_target_latency_ms,
+                backoff=s.admission_backoff,
+                decrease_cooldown=s.admission_decrease_cooldown,
+                shed_action=s.admission_shed_action,
+                retry_after_s=s.admission_retry_after_s,
+                default_quota=s.tenant_default_quota,
+                tenant_quotas=s.tenant_call_quotas
+            )
+            add_listener(controller.observe_provider)
+            return controller
+        return self._build("admission_controller", factory)
+
+    @service
+    def llm_service(self):
+        def factory():
+            from app.ai.llm_service import LLMService
+            from app.ai.model_router import ModelRouter
+            s = self.settings
+            model_router = ModelRouter(
+                intent_service=self.intent_service,
+                enabled=s.llm_routing_enabled,
+                fast_model=s.llm_fast_model,
+                strong_model=s.openai_model,
+                threshold=s.llm_route_threshold,
+                min_confidence=s.llm_route_min_confidence,
+                fast_costs=s.llm_fast_costs,
+                strong_costs=s.llm_strong_costs
+            )
+            return LLMService(
+                client=self.openai_client,
+                prompts_dir=s.prompts_dir,
+                model_router=model_router,
+                model=s.openai_model,
+                fallback_models=s.openai_fallback_models,
+                latency_budget_ms=s.llm_latency_budget_ms,
+                fast_latency_budget_ms=s.llm_fast_latency_budget_ms,
+                embedding_model=s.faq_embedding_model,
+                intent_batch_max=s.intent_batch_max,
+                intent_batch_wait_ms=s.intent_batch_wait_ms,
+                failure_threshold=s.provider_failure_threshold,
+                reset_timeout=s.provider_reset_timeout,
+                request_timeout=s.provider_request_timeout,
+                deadline_ms=s.llm_deadline_ms
+            )
+        return self._build("llm_service", factory)
+
+    @service
+    def speculative_generator(self):
+        def factory():
+            if not self.settings.openai_api_key:
+                return None
+            from app.ai.speculation import SpeculativeGenerator
+            s = self.settings
+            return SpeculativeGenerator(
+                self.llm_service,
+                enabled=s.speculation_enabled,
+                stable_ms=s.speculation_stable_ms,
+                min_words=s.speculation_min_words
+            )
+        return self._build("speculative_generator", factory)
+
+    @service
+    def stt_service(self):
+        def factory():
+            from app.voice.stt_service import STTService
+            return STTService(client=self.openai_client, worker_pool=self.worker_pool)
+        return self._build("stt_service", factory)
+
+    @service
+    def tts_service(self):
+        def factory():
+            from app.voice.tts_service import TTSService
+            s = self.settings
+            # The OpenAI client is only needed if OpenAI TTS is actually used
+            return TTSService(
+                client_factory=lambda: self.openai_client,
+                provider=s.tts_provider,
+                fallback_providers=s.tts_fallback_providers,
+                latency_budget_ms=s.tts_latency_budget_ms,
+                elevenlabs_api_key=s.elevenlabs_api_key,
+                elevenlabs_voice_id=s.elevenlabs_voice_id,
+                failure_threshold=s.provider_failure_threshold,
+                reset_timeout=s.provider_reset_timeout,
+                request_timeout=s.provider_request_timeout,
+                deadline_ms=s.tts_deadline_ms
+            )
+        return self._build("tts_service", factory)
+
+    @service
+    def call_recorder(self):
+        def factory():
+            if not self.settings.recording_enabled:
+                return None
+            from app.voice.call_recorder import CallRecorder
+            s = self.settings
+            return CallRecorder(
+                str(s.recording_dir),
+                chunk_bytes=s.recording_chunk_bytes,
+                max_queue=s.recording_queue_frames
+            )
+        return self._build("call_recorder", factory)
+
+    @service
+    def call_tracer(self):
+        def factory():
+            if not self.settings.trace_enabled:
+                return None
+            from app.services.call_tracer import CallTracer
+            return CallTracer(str(self.settings.trace_dir), max_events=self.settings.trace_max_events)
+        return self._build("call_tracer", factory)
+
+    @service
+    def tenant_registry(self):
+        def factory():
+            from app.services.tenant_service import TenantRegistry
+            s = self.settings
+            registry = TenantRegistry(
+                tenants_dir=str(s.tenants_dir),
+                prompts_dir=str(s.prompts_dir),
+                database=self.database,
+                worker_pool=self.worker_pool,
+                pool_min_faqs=s.faq_pool_min_faqs,
+                cache_mb=s.tenant_cache_mb
+            )
+            registry.load_all()
+            return registry
+        return self._build("tenant_registry", factory)
+
+    @service
+    def faq_importer(self):
+        def factory():
+            from app.services.faq_import import FAQImporter
+            # Questions are embedded only when an embedding provider is configured
+            embedder = self.llm_service.embed if self.settings.openai_api_key else None
+            s = self.settings
+            return FAQImporter(
+                self.database,
+                self.tenant_registry,
+                embedder=embedder,
+                batch_size=s.faq_embed_batch,
+                concurrency=s.faq_embed_concurrency,
+                max_rows=s.faq_import_max_rows
+            )
+        return self._build("faq_importer", factory)
+
+    @service
+    def latency_masker(self):
+        def factory():
+            from app.voice.latency_masking import LatencyMasker
+            s = self.settings
+            return LatencyMasker(tts_service=self.tts_service, enabled=s.filler_enabled, budget_ms=s.filler_budget_ms)
+        return self._build("latency_masker", factory)
+
+    @service
+    def workflow_engine(self):
+        def factory():
+            from app.services.workflow_engine import WorkflowEngine
+            s = self.settings
+            return WorkflowEngine(
+                str(s.workflow_path),
+                tts_service=self.tts_service,
+                low_confidence_threshold=s.workflow_low_confidence,
+                max_clarifications=s.workflow_max_clarifications
+            )
+        return self._build("workflow_engine", factory)
+
+    @service
+    def analytics_job(self):
+        def factory():
+            from app.services.analytics_service import CallAnalyticsJob
+            return CallAnalyticsJob(self.database, output_dir=str(self.settings.analytics_output_dir))
+        return self._build("analytics_job", factory)
+
+    def prewarm(self):
+        """
+        Build hot-path services and fill caches; run off the event loop after startup
+        """
+        start = time.perf_counter()
+        names = [
+            "worker_pool", "database", "call_service", "intent_service", "sentiment_service",
+            "admission_controller", "caller_history", "call_lifecycle", "workflow_engine", "call_recorder", "call_tracer",
+            "tenant_registry", "latency_masker"
+        ]
+        if self.settings.openai_api_key:
+            # Importing openai and loading prompts is the slowest part of a cold start
+            names += ["llm_service", "stt_service"]
+        try:
+            for name in names:
+                getattr(self, name)
+            if self.worker_pool is not None:
+                # Spawn workers now so the first live task doesn't pay for it
+                self.worker_pool.warm()
+            self.workflow_engine.presynthesize()
+            voices = {self.tenant_registry.get(t).voice_id for t in self.tenant_registry.tenants()}
+            self.latency_masker.presynthesize(voices | {None})
+            self.admission_controller.presynthesize(voices | {None})
+        except Exception as e:
+            print(f"Prewarm incomplete: {e}")
+        finally:
+            self.startup_timings["prewarm_total"] = round((time.perf_counter() - start) * 1000, 2)
+            self.warm.set()
+
+    def shutdown(self):
+        """
+        Flush anything that must outlive the process's last request
+        """
+        recorder = self.__dict__.get("call_recorder")
+        if recorder is not None:
+            recorder.close()
+        tracer = self.__dict__.get("call_tracer")
+        if tracer is not None:
+            tracer.close()
+        pool = self.__dict__.get("worker_pool")
+        if pool is not None:
+            pool.shutdown()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"warm": self.warm.is_set(), "timings_ms": dict(self.startup_timings)}
+
+
+container = Container()
+
+
+# FastAPI dependencies
+
+def get_container() -> Container:
+    return container
+
+
+def get_settings() -> Settings:
+    return container.settings
+
+
+def get_database():
+    return container.database
+
+
+def get_call_service():
+    return container.call_service
+
+
+def get_caller_history():
+    return container.caller_history
+
+
+def get_call_lifecycle():
+    return container.call_lifecycle
+
+
+def get_transcript_index():
+    return container.transcript_index
+
+
+def get_worker_pool():
+    return container.worker_pool
+
+
+def get_intent_service():
+    return container.intent_service
+
+
+def get_sentiment_service():
+    return container.sentiment_service
+
+
+def get_booking_service():
+    return container.booking_service
+
+
+def get_admission_controller():
+    return container.admission_controller
+
+
+def get_workflow_engine():
+    return container.workflow_engine
+
+
+def get_analytics_job():
+    return container.analytics_job
+
+
+def get_call_recorder():
+    return container.call_recorder
+
+
+def get_call_tracer():
+    return container.call_tracer
+
+
+def get_llm_service():
+    return container.llm_service
+
+
+def get_optional_llm_service():
+    """LLM service, or None when no API key is configured"""
+    return container.llm_service if container.settings.openai_api_key else None
+
+
+def get_speculative_generator():
+    """Speculative generator, or None when no API key is configured"""
+    return container.speculative_generator
+
+
+def get_tenant_registry():
+    return container.tenant_registry
+
+
+def get_faq_importer():
+    return container.faq_importer
+
+
+def get_latency_masker():
+    return container.latency_masker
+
+
+def get_tts_service():
+    return container.tts_service
+
+
+def get_stt_service():
+    return container.stt_service
+
+
+def get_optional_stt_service():
+    """STT service, or None when no API key is configured"""
+    return container.stt_service if container.settings.openai_api_key else None
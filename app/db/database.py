@@ -1,11 +1,9 @@
 """
 Database connection and operations
 """
-import os
-from typing import Optional, List, Dict, Any
-from dotenv import load_dotenv
-
-load_dotenv()
+import threading
+from datetime import datetime
+from typing import Optional, Iterator, List, Dict, Any, Tuple
 
 # In production, use actual database connections
 # For now, using in-memory storage as placeholder
@@ -14,13 +12,17 @@ load_dotenv()
 class Database:
     """Database service (placeholder - implement with PostgreSQL/MongoDB)"""
     
-    def __init__(self):
-        self.db_type = os.getenv("DATABASE_TYPE", "memory")  # memory, postgresql, mongodb
+    def __init__(self, db_type: str = "memory"):
+        self.db_type = db_type  # memory, postgresql, mongodb
         # In-memory storage for development
         self.calls: Dict[str, Dict] = {}
         self.conversations: List[Dict] = []
         self.faqs: List[Dict] = []
         self.agents: Dict[str, Dict] = {}
+        self.bookings: Dict[str, Dict] = {}
+        # resource -> (version, schedule); schedules are replaced, never mutated
+        self.schedules: Dict[str, Tuple[int, Any]] = {}
+        self._schedule_lock = threading.Lock()
     
     def save_call(self, call_data: Dict[str, Any]) -> str:
         """Save call to database"""
@@ -38,6 +40,29 @@ class Database:
         if call_id in self.calls:
             self.calls[call_id].update(updates)
     
+    def iter_ended_calls(
+        self,
+        chunk_size: int = 10000,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Stream ended calls in chunks, optionally limited to an end_time window"""
+        chunk: List[Dict[str, Any]] = []
+        for call in list(self.calls.values()):
+            if call.get("status") != "ended":
+                continue
+            end_time = call.get("end_time")
+            if since and (end_time is None or end_time < since):
+                continue
+            if until and (end_time is None or end_time >= until):
+                continue
+            chunk.append(call)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
     def save_conversation(self, conversation_data: Dict[str, Any]) -> str:
         """Save conversation message"""
         self.conversations.append(conversation_data)
@@ -52,6 +77,15 @@ class Database:
         self.faqs.append(faq_data)
         return faq_data.get("id", "faq_1")
     
+    def get_faqs(self, tenant_id: str = "default") -> List[Dict[str, Any]]:
+        """Get one tenant's FAQs (records without a tenant_id belong to the default tenant)"""
+        return [f for f in self.faqs if f.get("tenant_id", "default") == tenant_id]
+    
+    def replace_faqs(self, tenant_id: str, faqs: List[Dict[str, Any]]):
+        """Replace one tenant's FAQs in a single step"""
+        others = [f for f in self.faqs if f.get("tenant_id", "default") != tenant_id]
+        self.faqs = others + [{**f, "tenant_id": tenant_id} for f in faqs]
+    
     def search_faqs(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search FAQs (simple keyword search - use vector search in production)"""
         results = []
@@ -65,6 +99,30 @@ class Database:
         
         return results
     
+    def get_schedule(self, resource: str) -> Tuple[int, Any]:
+        """Get a resource's schedule and its version (0, None if never booked)"""
+        return self.schedules.get(resource, (0, None))
+    
+    def commit_schedule(
+        self,
+        resource: str,
+        expected_version: int,
+        schedule: Any,
+        booking: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Replace a schedule only if it is still at expected_version, saving the booking with it"""
+        with self._schedule_lock:
+            if self.schedules.get(resource, (0, None))[0] != expected_version:
+                return False
+            self.schedules[resource] = (expected_version + 1, schedule)
+            if booking is not None:
+                self.bookings[booking["booking_id"]] = booking
+            return True
+    
+    def get_booking(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        """Get booking by ID"""
+        return self.bookings.get(booking_id)
+    
     def get_available_agents(self) -> List[Dict[str, Any]]:
         """Get available agents"""
         return [
@@ -73,6 +131,10 @@ class Database:
         ]
 
 
-# Global database instance
-db = Database()
+def __getattr__(name: str):
+    # The shared instance now lives in the dependency container and is built on first use
+    if name == "db":
+        from app.container import container
+        return container.database
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
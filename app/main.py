@@ -2,14 +2,50 @@
 VoxAssist AI - Real-Time Call Support Agent
 Main FastAPI application
 """
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import calls, faqs, transfers
+from app.container import container
+from app.routes import analytics, calls, faqs, tenants, transcripts, transfers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start serving immediately; build services and warm caches in the background
+    """
+    app.state.container = container
+    background = []
+    if container.settings.prewarm:
+        background.append(asyncio.get_running_loop().run_in_executor(None, container.prewarm))
+    watcher = asyncio.create_task(_watch_workflow())
+    reaper = asyncio.create_task(_run_call_lifecycle())
+    yield
+    watcher.cancel()
+    reaper.cancel()
+    for task in background:
+        task.cancel()
+    await asyncio.to_thread(container.shutdown)
+
+
+async def _watch_workflow():
+    """Hot-reload the call workflow (built off the event loop if prewarm hasn't yet)"""
+    engine = await asyncio.to_thread(lambda: container.workflow_engine)
+    await engine.watch()
+
+
+async def _run_call_lifecycle():
+    """Expire idle, silent and over-long calls"""
+    lifecycle = await asyncio.to_thread(lambda: container.call_lifecycle)
+    await lifecycle.run()
+
 
 app = FastAPI(
     title="VoxAssist AI - Real-Time Call Support Agent",
     description="AI-powered voice assistant for handling customer calls in real-time",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -25,6 +61,9 @@ app.add_middleware(
 app.include_router(calls.router)
 app.include_router(faqs.router)
 app.include_router(transfers.router)
+app.include_router(analytics.router)
+app.include_router(transcripts.router)
+app.include_router(tenants.router)
 
 
 @app.get("/")
@@ -41,9 +80,14 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    pool = container.__dict__.get("worker_pool")
+    tracer = container.__dict__.get("call_tracer")
     return {
         "status": "ok",
-        "service": "VoxAssist AI"
+        "service": "VoxAssist AI",
+        "warm": container.warm.is_set(),
+        "cpu_pool": pool.get_stats() if pool else None,
+        "tracing": tracer.get_stats() if tracer else None
     }
 
 
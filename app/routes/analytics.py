@@ -0,0 +1,54 @@
+"""
+Post-call analytics routes
+"""
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+from app.container import get_analytics_job, get_optional_llm_service
+from app.services.analytics_service import CallAnalyticsJob
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+class AnalyticsRunRequest(BaseModel):
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+@router.post("/run")
+async def run_analytics(
+    request: AnalyticsRunRequest,
+    background_tasks: BackgroundTasks,
+    job: CallAnalyticsJob = Depends(get_analytics_job)
+):
+    """
+    Start a batch analytics run over ended calls in the background
+    """
+    background_tasks.add_task(job.run, request.since, request.until)
+    return {
+        "status": "started",
+        "since": request.since,
+        "until": request.until
+    }
+
+
+@router.get("/latest")
+async def get_latest_analytics(job: CallAnalyticsJob = Depends(get_analytics_job)):
+    """
+    Summary from the most recent analytics run
+    """
+    if job.last_summary is None:
+        raise HTTPException(status_code=404, detail="No analytics run has completed yet")
+    return job.last_summary
+
+
+@router.get("/models")
+async def get_model_routing(llm_service=Depends(get_optional_llm_service)):
+    """
+    Fast/strong model split with per-route latency, tokens and cost
+    """
+    if llm_service is None or llm_service.model_router is None:
+        return {"enabled": False}
+    return llm_service.model_router.get_stats()
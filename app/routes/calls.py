@@ -1,18 +1,50 @@
 """
 Call handling routes for VoxAssist AI
 """
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Response, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+import asyncio
 import json
+import time
+
+from app.ai.tools import get_tool_definitions, tool_call_messages
+from app.container import (
+    Settings, get_admission_controller, get_call_lifecycle, get_call_recorder, get_call_service, get_call_tracer,
+    get_caller_history, get_intent_service,
+    get_latency_masker, get_optional_llm_service, get_optional_stt_service, get_sentiment_service,
+    get_settings, get_speculative_generator, get_tenant_registry, get_workflow_engine
+)
+from app.routes.transfers import TransferRequest as HumanTransferRequest, transfer_to_human
+from app.services.admission_service import AdmissionController
+from app.services.call_lifecycle import CallLifecycle
+from app.services.call_service import CallService, is_valid_call_id
+from app.services.call_tracer import CallTracer, payload_hash
+from app.services.caller_history import CallerHistory
+from app.services.intent_service import IntentService
+from app.services.sentiment_service import SentimentService
+from app.services.tenant_service import TenantRegistry
+from app.services.workflow_engine import WorkflowEngine
+from app.voice.framing import (
+    CODEC_MP3, FRAME_AUDIO_END, FRAME_AUDIO_IN, FRAME_AUDIO_OUT, INBOUND_CODECS,
+    AudioRingBuffer, FrameError, FrameWriter, parse_frame
+)
+from app.voice.call_recorder import DIRECTION_IN, DIRECTION_OUT, CallRecorder
+from app.voice.dsp import STT_SAMPLE_RATE, InboundDecoder
+from app.voice.jitter_buffer import JitterBuffer
+from app.voice.latency_masking import LatencyMasker
 
 router = APIRouter(prefix="/call", tags=["calls"])
 
+# Tool-call round trips allowed per turn before the reply is taken as is
+MAX_TOOL_ROUNDS = 3
+
 
 class CallStartRequest(BaseModel):
     caller_number: str
     call_id: Optional[str] = None
+    tenant_id: Optional[str] = "default"
 
 
 class CallEndRequest(BaseModel):
@@ -27,88 +59,515 @@ class TransferRequest(BaseModel):
 
 
 @router.post("/start")
-async def start_call(request: CallStartRequest):
+async def start_call(
+    request: CallStartRequest,
+    response: Response,
+    call_service: CallService = Depends(get_call_service),
+    admission_controller: AdmissionController = Depends(get_admission_controller),
+    workflow_engine: WorkflowEngine = Depends(get_workflow_engine),
+    call_lifecycle: CallLifecycle = Depends(get_call_lifecycle),
+    caller_history: CallerHistory = Depends(get_caller_history),
+    tenant_registry: TenantRegistry = Depends(get_tenant_registry)
+):
     """
     Initialize a new call session
     """
+    if request.call_id is not None and not is_valid_call_id(request.call_id):
+        raise HTTPException(status_code=400, detail="call_id must be 1-64 of A-Z a-z 0-9 _ . -")
+    if request.call_id is not None and (
+        call_service.get_call(request.call_id) or admission_controller.is_admitted(request.call_id)
+    ):
+        # Re-admitting would overwrite the live session and its admission slot
+        raise HTTPException(status_code=409, detail=f"Call {request.call_id} is already active")
     try:
-        # In production, this would create a call record in the database
         call_id = request.call_id or f"call_{datetime.now().timestamp()}"
         
+        decision = admission_controller.try_acquire(call_id, request.tenant_id or "default")
+        if not decision["admitted"]:
+            shed = await _shed_call(call_id, decision)
+            if decision["action"] == "hold":
+                response.headers["Retry-After"] = str(decision["retry_after"])
+                tenant = tenant_registry.get(request.tenant_id or "default")
+                if admission_controller.hold_audio.get(tenant.voice_id):
+                    shed["hold_audio_url"] = f"/call/hold_audio?tenant_id={tenant.tenant_id}"
+            return shed
+        
+        call_data = call_service.start_call(request.caller_number, call_id)
+        call_data["tenant_id"] = request.tenant_id or "default"
+        call_data["flow"] = workflow_engine.new_state()
+        # Reaped if the caller never streams, hangs up without /call/end or overstays
+        call_lifecycle.track(call_id)
+        # Returning callers: past calls load while the greeting plays
+        caller_history.start(call_data)
+        
         return {
             "status": "success",
             "call_id": call_id,
             "caller_number": request.caller_number,
-            "start_time": datetime.now().isoformat(),
+            "start_time": call_data["start_time"].isoformat(),
+            "greeting": workflow_engine.greeting(call_data["flow"]),
             "message": "Call session initialized"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/stream")
-async def stream_call(websocket: WebSocket):
+async def _shed_call(call_id: str, decision: dict) -> dict:
+    """
+    Respond to a call rejected by admission control: hand it to the human
+    queue or play the hold prompt, rather than letting it time out
+    """
+    response = {
+        "status": "shed",
+        "call_id": call_id,
+        "reason": decision["reason"],
+        "action": decision["action"],
+        "prompt": decision["prompt"],
+        "retry_after": decision.get("retry_after"),
+        "start_time": datetime.now().isoformat(),
+        "message": "Call not admitted: capacity exceeded"
+    }
+    if decision["action"] == "transfer":
+        transfer = await transfer_to_human(HumanTransferRequest(
+            call_id=call_id,
+            reason=f"AI capacity exceeded ({decision['reason']})",
+            priority="high"
+        ))
+        response["transfer"] = transfer.model_dump()
+    return response
+
+
+@router.websocket("/stream")
+async def stream_call(
+    websocket: WebSocket,
+    call_id: Optional[str] = None,
+    tenant_id: str = "default",
+    call_service: CallService = Depends(get_call_service),
+    admission_controller: AdmissionController = Depends(get_admission_controller),
+    call_lifecycle: CallLifecycle = Depends(get_call_lifecycle),
+    caller_history: CallerHistory = Depends(get_caller_history),
+    intent_service: IntentService = Depends(get_intent_service),
+    sentiment_service: SentimentService = Depends(get_sentiment_service),
+    workflow_engine: WorkflowEngine = Depends(get_workflow_engine),
+    call_recorder: Optional[CallRecorder] = Depends(get_call_recorder),
+    call_tracer: Optional[CallTracer] = Depends(get_call_tracer),
+    latency_masker: LatencyMasker = Depends(get_latency_masker),
+    tenant_registry: TenantRegistry = Depends(get_tenant_registry),
+    settings: Settings = Depends(get_settings),
+    # Untyped so the route module does not import openai at startup
+    llm_service=Depends(get_optional_llm_service),
+    stt_service=Depends(get_optional_stt_service),
+    speculative_generator=Depends(get_speculative_generator)
+):
     """
     WebSocket endpoint for real-time call streaming
     """
     await websocket.accept()
+    if call_id is not None and not is_valid_call_id(call_id):
+        await websocket.send_json({"type": "error", "error": "Invalid call_id"})
+        await websocket.close(code=1008, reason="Invalid call_id")
+        return
     
-    try:
-        while True:
-            # Receive audio data or text from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
+    # Streams for calls not admitted through /call/start must pass admission too
+    owns_slot = False
+    if call_id and not admission_controller.is_admitted(call_id):
+        decision = admission_controller.try_acquire(call_id, tenant_id)
+        if not decision["admitted"]:
+            await websocket.send_json({"type": "shed", **await _shed_call(call_id, decision)})
+            hold_audio = admission_controller.hold_audio.get(tenant_registry.get(tenant_id).voice_id)
+            if decision["action"] == "hold" and hold_audio:
+                await _send_audio(websocket, FrameWriter(), hold_audio, CODEC_MP3)
+            await websocket.close(code=1013, reason="Try again later")
+            return
+        owns_slot = True
+    
+    call_data = call_service.get_call(call_id) if call_id else None
+    flow = call_data["flow"] if call_data and "flow" in call_data else workflow_engine.new_state()
+    tenant = tenant_registry.get(call_data.get("tenant_id", tenant_id) if call_data else tenant_id)
+    frame_writer = FrameWriter()
+    audio_buffer = AudioRingBuffer()
+    jitter_buffer: Optional[JitterBuffer] = None
+    decoder: Optional[InboundDecoder] = None
+    playout_frame: Optional[bytearray] = None
+    utterance: Optional[bytearray] = None
+    frames_received = 0
+    recording_id = call_id or f"stream_{id(websocket)}"
+    last_filler: Optional[str] = None
+    speculation = speculative_generator.turn() if speculative_generator else None
+    # Provider calls made on this call's behalf (including in threads) land in its trace
+    trace = call_tracer.begin(recording_id, tenant_id=tenant.tenant_id) if call_tracer else None
+    
+    async def send_audio(audio: bytes, end: bool):
+        if trace:
+            trace.event("audio_out", bytes=len(audio), end=end)
+        await _send_audio(websocket, frame_writer, audio, CODEC_MP3, call_recorder, recording_id, end)
+    
+    # Set when the call is ended from outside this handler (expiry or /call/end)
+    ended_by: Optional[str] = None
+    handler = asyncio.current_task()
+    
+    async def close_stream(reason: str):
+        nonlocal ended_by
+        ended_by = reason
+        try:
+            await websocket.send_json({"type": "call_ended", "reason": reason})
+            await websocket.close(code=1000, reason=reason)
+        finally:
+            # The handler may be waiting on a caller who is gone; don't wait for their close frame
+            handler.cancel()
+    
+    async def prompt_silence(prompt: str):
+        await websocket.send_json({
+            "type": "prompt", "reason": "silence", "text": prompt, "timestamp": datetime.now().isoformat()
+        })
+        await latency_masker.speak(prompt, send_audio, voice_id=tenant.voice_id, cache=tenant.cache)
+    
+    timers = call_lifecycle.attach(call_id, close_stream, prompt_silence) if call_data else None
+    
+    async def respond(text: str):
+        """
+        Answer one final caller transcript
+        """
+        nonlocal last_filler
+        turn_us = time.time_ns() // 1000
+        if trace:
+            trace.event("final", text=text)
+        # Each turn is a table lookup in the compiled workflow
+        detected = intent_service.detect_intent(text)
+        intent = detected["intent"]
+        intent = intent.value if hasattr(intent, "value") else intent
+        
+        async def reply_audio() -> Optional[bytes]:
+            detected_intent, confidence = intent, detected["confidence"]
+            if llm_service and confidence < workflow_engine.low_confidence_threshold:
+                # Keywords were not enough; ask the LLM, batched with other calls' turns
+                refined = await llm_service.detect_intent_batched(text)
+                if refined.get("intent", "unknown") != "unknown":
+                    detected_intent, confidence = refined["intent"], refined["confidence"]
+            sentiment = sentiment_service.observe(recording_id, text)
+            plan = workflow_engine.next_turn(flow, detected_intent, confidence, sentiment["label"])
             
-            # Process the message (STT -> LLM -> TTS)
-            # This is a placeholder - actual implementation would:
-            # 1. Convert audio to text (STT)
-            # 2. Send to LLM for processing
-            # 3. Convert response to audio (TTS)
-            # 4. Send back to client
+            # Turns without a workflow prompt are answered by the LLM (STT -> LLM -> TTS)
+            reply = plan.prompt
+            if not reply and llm_service:
+                await caller_history.ready(call_data)
+                args = {
+                    **_generation_args(call_data, tenant),
+                    "intent": detected_intent,
+                    "intent_confidence": confidence
+                }
+                if speculation:
+                    generated = await speculation.final(text, **args)
+                else:
+                    generated = await asyncio.to_thread(llm_service.generate_response, text, **args)
+                tool_messages = []
+                for _ in range(MAX_TOOL_ROUNDS):
+                    if not generated.get("tool_calls"):
+                        break
+                    # Answer the model's tool calls and let it phrase the result
+                    tool_messages += await tool_call_messages(generated["tool_calls"], tenant.tenant_id)
+                    generated = await asyncio.to_thread(
+                        llm_service.generate_response, text, tool_messages=tool_messages, **args
+                    )
+                reply = generated.get("text")
+            elif speculation:
+                speculation.cancel()
             
             response = {
                 "type": "response",
-                "text": f"AI response to: {message.get('text', '')}",
-                "audio": None,  # Base64 encoded audio in production
+                "text": reply or f"AI response to: {text}",
+                "intent": detected_intent,
+                "sentiment": sentiment,
+                "action": plan.action,
+                "tool": plan.tool,
+                "escalate": plan.escalate,
+                "end_call": plan.end_call,
+                "follow_up": plan.follow_up,
+                "frames_received": frames_received,
+                "buffered_bytes": audio_buffer.readable,
+                "jitter": jitter_buffer.get_stats() if jitter_buffer else None,
+                "tenant_id": tenant.tenant_id,
                 "timestamp": datetime.now().isoformat()
             }
             
             await websocket.send_json(response)
+            if trace:
+                trace.event("response", intent=detected_intent, text_hash=payload_hash(response["text"]))
+            if call_recorder:
+                call_recorder.mark_turn(recording_id, turn_us, detected_intent)
+            
+            if call_data and call_service.get_call(call_id):
+                call_service.add_message(call_id, "user", text, detected_intent)
+                call_service.add_message(call_id, "assistant", response["text"])
+                call_service.update_sentiment(call_id, sentiment["label"])
+                if plan.escalate:
+                    call_service.mark_escalated(call_id)
+            
+            # Pre-synthesized prompts use the default voice; tenants with their own voice
+            # synthesize them once into their cache partition instead. A prompt whose
+            # presynthesis has not finished (or failed) is synthesized now
+            if plan.prompt and not tenant.voice_id:
+                audio = workflow_engine.prompt_audio(flow, plan.prompt)
+                if audio:
+                    return audio
+            return await latency_masker.render(
+                plan.prompt or response["text"], voice_id=tenant.voice_id, cache=tenant.cache
+            )
+        
+        # The filler budget starts at the final transcript, so a filler covers intent
+        # refinement, generation and tool calls as well as synthesis
+        last_filler = await latency_masker.play(reply_audio(), send_audio, intent, last_filler, tenant.voice_id)
+        if timers:
+            # Silence is measured from the end of the reply
+            timers.speech()
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
             
+            # Binary messages carry audio frames; text messages are JSON control
+            if timers:
+                timers.activity()
+            if message.get("bytes") is not None:
+                try:
+                    frame = parse_frame(message["bytes"])
+                except FrameError as e:
+                    await websocket.send_json({"type": "error", "error": str(e)})
+                    continue
+                if frame.frame_type == FRAME_AUDIO_IN:
+                    if frame.codec not in INBOUND_CODECS:
+                        # Only PCM16 and G.711 can be decoded for STT
+                        await websocket.send_json({
+                            "type": "error", "error": f"Unsupported inbound codec: {frame.codec}"
+                        })
+                        await websocket.close(code=1003, reason="Unsupported codec")
+                        return
+                    if decoder is not None and frame.codec != decoder.codec:
+                        await websocket.send_json({
+                            "type": "error",
+                            "error": f"Codec changed mid-stream ({decoder.codec} -> {frame.codec}); frame dropped"
+                        })
+                        continue
+                    if trace:
+                        trace.event(
+                            "frame_in", seq=frame.seq, codec=frame.codec, bytes=len(frame.payload),
+                            ts_us=frame.timestamp_us, hash=payload_hash(frame.payload)
+                        )
+                    if call_recorder:
+                        # Recordings use server time so both directions share one clock
+                        call_recorder.record(recording_id, DIRECTION_IN, frame.codec, time.time_ns() // 1000, frame.payload)
+                    if jitter_buffer is None:
+                        jitter_buffer = JitterBuffer.for_codec(
+                            frame.codec,
+                            max_ptime_ms=settings.jitter_max_ptime_ms,
+                            frame_ms=settings.jitter_frame_ms,
+                            min_depth=settings.jitter_min_depth,
+                            max_depth=settings.jitter_max_depth
+                        )
+                        playout_frame = bytearray(jitter_buffer.max_frame_bytes)
+                        decoder = InboundDecoder(frame.codec, max_frame=jitter_buffer.max_frame_bytes)
+                    # Reorder and conceal losses before audio reaches STT
+                    jitter_buffer.push(frame.seq, frame.timestamp_us, frame.payload)
+                    while jitter_buffer.ready():
+                        n, _ = jitter_buffer.pop_into(playout_frame)
+                        # STT consumes 16 kHz PCM16 whatever the caller's codec
+                        audio_buffer.write(decoder.process(memoryview(playout_frame)[:n]))
+                    frames_received += 1
+                elif frame.frame_type == FRAME_AUDIO_END and jitter_buffer is not None:
+                    # End of a caller utterance: play out what the jitter buffer still holds
+                    while jitter_buffer.has_pending():
+                        n, _ = jitter_buffer.pop_into(playout_frame)
+                        audio_buffer.write(decoder.process(memoryview(playout_frame)[:n]))
+                    if not stt_service:
+                        audio_buffer.clear()
+                        continue
+                    if utterance is None:
+                        utterance = bytearray(audio_buffer.capacity)
+                    n = audio_buffer.read_into(utterance)
+                    if not n:
+                        continue
+                    # The handler waits for the transcript, so the buffer is not reused meanwhile
+                    transcript = await stt_service.transcribe_pcm(memoryview(utterance)[:n], STT_SAMPLE_RATE)
+                    text = transcript.get("text", "").strip()
+                    if text:
+                        # Noise that transcribes to nothing is not speech: the silence timer keeps running
+                        if timers:
+                            timers.speech()
+                        await respond(text)
+                continue
+            
+            control = json.loads(message["text"])
+            text = control.get("text", "")
+            if timers and text.strip():
+                timers.speech()
+            if control.get("type") == "partial":
+                # Interim STT hypothesis: may start the reply before the caller finishes
+                if trace:
+                    trace.event("partial", text=text)
+                # Generation args must not change mid-turn, so wait for the caller's history
+                if speculation and not caller_history.pending(call_data):
+                    predicted = intent_service.detect_intent(text)
+                    predicted_intent = predicted["intent"]
+                    predicted_intent = predicted_intent.value if hasattr(predicted_intent, "value") else predicted_intent
+                    if workflow_engine.predict(flow, predicted_intent, predicted["confidence"]).prompt:
+                        # The workflow would answer with a prompt; a generated reply would go unused
+                        speculation.cancel()
+                    else:
+                        speculation.partial(
+                            text, **_generation_args(call_data, tenant),
+                            intent=predicted_intent, intent_confidence=predicted["confidence"]
+                        )
+                continue
+            await respond(text)
     except WebSocketDisconnect:
         print("Client disconnected")
+    except asyncio.CancelledError:
+        if ended_by is None:
+            raise
     except Exception as e:
         await websocket.close(code=1011, reason=str(e))
+    finally:
+        if speculation:
+            speculation.cancel()
+        if timers is None:
+            # No lifecycle-tracked session will end this call, so its trajectory is ours to drop
+            sentiment_service.forget(recording_id)
+        if owns_slot:
+            admission_controller.release(call_id)
+        if timers and ended_by is None:
+            call_lifecycle.detach(call_id)
+        if call_recorder:
+            call_recorder.finish(recording_id)
+        if trace:
+            call_tracer.finish(trace)
+
+
+def _generation_args(call_data: Optional[dict], tenant, history_turns: int = 10) -> dict:
+    """
+    LLM inputs for the next reply: the tenant's prompt, recent conversation,
+    the tools it may call and, for returning callers, their earlier calls
+    """
+    messages = call_data["messages"][-history_turns:] if call_data else []
+    args = {
+        "system_prompt": tenant.system_prompt,
+        "conversation_history": [{"role": m["speaker"], "content": m["message"]} for m in messages],
+        "tools": get_tool_definitions()
+    }
+    if call_data and call_data.get("caller_context"):
+        args["context"] = call_data["caller_context"]
+    return args
+
+
+async def _send_audio(
+    websocket: WebSocket,
+    writer: FrameWriter,
+    audio: bytes,
+    codec: int,
+    recorder: Optional[CallRecorder] = None,
+    recording_id: Optional[str] = None,
+    end: bool = True,
+    chunk_size: int = 8192
+):
+    """
+    Send outbound audio as FRAME_AUDIO_OUT frames, followed by FRAME_AUDIO_END if end is set
+    """
+    view = memoryview(audio)
+    timestamp_us = time.time_ns() // 1000
+    for offset in range(0, len(view), chunk_size):
+        chunk = view[offset:offset + chunk_size]
+        if recorder:
+            recorder.record(recording_id, DIRECTION_OUT, codec, timestamp_us, chunk)
+        await websocket.send_bytes(writer.build(FRAME_AUDIO_OUT, codec, timestamp_us, chunk))
+    if end:
+        await websocket.send_bytes(writer.build(FRAME_AUDIO_END, codec, timestamp_us))
 
 
 @router.post("/end")
-async def end_call(request: CallEndRequest):
+async def end_call(
+    request: CallEndRequest,
+    call_lifecycle: CallLifecycle = Depends(get_call_lifecycle)
+):
     """
     End a call session and store analytics
     """
     try:
-        # In production, this would update the call record in the database
-        return {
-            "status": "success",
-            "call_id": request.call_id,
-            "end_time": datetime.now().isoformat(),
-            "duration": request.duration,
-            "sentiment": request.sentiment,
-            "message": "Call session ended"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        call_data = await call_lifecycle.end(request.call_id, duration=request.duration, sentiment=request.sentiment)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return {
+        "status": "success",
+        "call_id": request.call_id,
+        "end_time": call_data["end_time"].isoformat(),
+        "duration": call_data["duration"],
+        "sentiment": call_data["sentiment"],
+        "message": "Call session ended"
+    }
 
 
 @router.get("/status/{call_id}")
-async def get_call_status(call_id: str):
+async def get_call_status(call_id: str, call_service: CallService = Depends(get_call_service)):
     """
     Get the current status of a call
     """
+    call_data = call_service.get_call(call_id)
+    if not call_data:
+        raise HTTPException(status_code=404, detail=f"Call {call_id} not found")
+    
     return {
         "call_id": call_id,
-        "status": "active",  # active, ended, transferred
-        "duration": 0,
+        "status": call_data["status"],  # active, ended, transferred
+        "duration": (datetime.now() - call_data["start_time"]).total_seconds(),
         "timestamp": datetime.now().isoformat()
     }
 
+
+@router.get("/hold_audio")
+async def get_hold_audio(
+    tenant_id: str = "default",
+    admission_controller: AdmissionController = Depends(get_admission_controller),
+    tenant_registry: TenantRegistry = Depends(get_tenant_registry)
+):
+    """
+    Pre-rendered hold prompt (MP3) in the tenant's voice, for held callers
+    """
+    audio = admission_controller.hold_audio.get(tenant_registry.get(tenant_id).voice_id)
+    if not audio:
+        raise HTTPException(status_code=404, detail="Hold prompt not rendered")
+    return Response(content=audio, media_type="audio/mpeg")
+
+
+@router.get("/admission")
+async def get_admission_stats(admission_controller: AdmissionController = Depends(get_admission_controller)):
+    """
+    Current concurrency limit and load-shedding counters
+    """
+    return admission_controller.get_stats()
+
+
+@router.get("/lifecycle")
+async def get_lifecycle_stats(call_lifecycle: CallLifecycle = Depends(get_call_lifecycle)):
+    """
+    Tracked calls, end reasons and timer wheel counters
+    """
+    return call_lifecycle.get_stats()
+
+
+@router.get("/history")
+async def get_caller_history_stats(caller_history: CallerHistory = Depends(get_caller_history)):
+    """
+    Indexed and hot callers, prefetch hit rate and late prefetches
+    """
+    return caller_history.get_stats()
+
+
+@router.get("/speculation")
+async def get_speculation_stats(speculative_generator=Depends(get_speculative_generator)):
+    """
+    Speculative generation hit rate, head start and wasted tokens
+    """
+    if speculative_generator is None:
+        return {"enabled": False}
+    return speculative_generator.get_stats()
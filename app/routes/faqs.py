@@ -1,9 +1,16 @@
 """
 FAQ search and management routes
 """
-from fastapi import APIRouter, HTTPException, Query
+import base64
+import binascii
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+from app.container import get_faq_importer, get_tenant_registry
+from app.services.faq_import import FORMAT_CSV, FORMAT_NDJSON, MODE_MERGE, FAQImporter, FAQImportError
+from app.services.tenant_service import TenantRegistry
 
 router = APIRouter(prefix="/faqs", tags=["faqs"])
 
@@ -25,43 +32,24 @@ class FAQSearchResponse(BaseModel):
 @router.get("/search")
 async def search_faqs(
     q: str = Query(..., description="Search query"),
-    limit: int = Query(5, ge=1, le=50, description="Maximum number of results")
+    limit: int = Query(5, ge=1, le=50, description="Maximum number of results"),
+    tenant_id: str = Query("default", description="Tenant whose FAQs to search"),
+    tenant_registry: TenantRegistry = Depends(get_tenant_registry)
 ):
     """
     Search FAQs using semantic search or keyword matching
     """
     try:
-        # Placeholder - in production, this would use FAISS or vector search
-        # to find semantically similar FAQs
-        
-        # Mock results for demonstration
+        # Keyword index per tenant - in production, this would use FAISS or vector search
         results = [
-            FAQItem(
-                id="1",
-                question="What are your business hours?",
-                answer="We are open Monday to Friday, 9 AM to 5 PM EST.",
-                category="general",
-                frequency=150
-            ),
-            FAQItem(
-                id="2",
-                question="How can I book an appointment?",
-                answer="You can book an appointment by calling us or using our online portal.",
-                category="appointments",
-                frequency=89
-            )
+            FAQItem(**{k: v for k, v in faq.items() if k in FAQItem.model_fields})
+            for faq in tenant_registry.get(tenant_id).faq_index.search(q, limit)
         ]
         
-        # Filter results based on query (simplified - use vector search in production)
-        filtered_results = [
-            r for r in results 
-            if q.lower() in r.question.lower() or q.lower() in r.answer.lower()
-        ][:limit]
-        
         return FAQSearchResponse(
             query=q,
-            results=filtered_results,
-            count=len(filtered_results)
+            results=results,
+            count=len(results)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -69,20 +57,93 @@ async def search_faqs(
 
 @router.get("/all")
 async def get_all_faqs(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    tenant_id: str = Query("default", description="Tenant whose FAQs to list"),
+    tenant_registry: TenantRegistry = Depends(get_tenant_registry)
 ):
     """
-    Get all FAQs, optionally filtered by category
+    List FAQs a page at a time, optionally filtered by category.
+    Pages carry the FAQ set's ETag; If-None-Match returns 304 until the set changes.
+    Cursors belong to that set too: once it changes they return 410.
     """
-    # Placeholder - would fetch from database
+    index = tenant_registry.get(tenant_id).faq_index
+    # A URL's page only changes when the FAQ set does, so the set's hash validates every page
+    etag = f'"{index.etag}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    start = 0
+    if cursor:
+        cursor_etag, start = _decode_cursor(cursor)
+        if cursor_etag != index.etag or start > len(index):
+            # Positions only mean something in the FAQ set the cursor was issued for
+            raise HTTPException(status_code=410, detail="Cursor no longer valid; restart the listing")
+    
+    page = []
+    next_cursor = None
+    faqs = index.faqs
+    for i in range(start, len(faqs)):
+        faq = faqs[i]
+        if category and faq.get("category") != category:
+            continue
+        if len(page) == limit:
+            next_cursor = _encode_cursor(index.etag, i)
+            break
+        page.append(FAQItem(**{k: v for k, v in faq.items() if k in FAQItem.model_fields}))
+    
+    response.headers.update(headers)
     return {
-        "faqs": [],
-        "count": 0,
-        "category": category
+        "faqs": page,
+        "count": len(page),
+        "total": len(index),
+        "category": category,
+        "next_cursor": next_cursor
     }
 
 
+def _encode_cursor(etag: str, position: int) -> str:
+    """
+    Opaque cursor: where the next page starts, in the FAQ set with this ETag.
+    FAQ ids can repeat or be missing, so the position is used rather than an id.
+    """
+    raw = f"{etag}:{position}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        etag, position = base64.b64decode(padded, altchars=b"-_", validate=True).decode("ascii").split(":")
+        return etag, int(position)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+
+
+@router.post("/import")
+async def import_faqs(
+    request: Request,
+    tenant_id: str = Query("default", description="Tenant to import into"),
+    format: Optional[str] = Query(None, description="ndjson or csv (default: from Content-Type)"),
+    mode: str = Query(MODE_MERGE, description="merge (upsert by question) or replace the tenant's stored FAQs"),
+    faq_importer: FAQImporter = Depends(get_faq_importer)
+):
+    """
+    Bulk import FAQs from an NDJSON or CSV body, streamed rather than buffered
+    """
+    fmt = format or (FORMAT_CSV if "csv" in request.headers.get("content-type", "") else FORMAT_NDJSON)
+    try:
+        return await faq_importer.import_stream(tenant_id, request.stream(), fmt, mode)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FAQImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/add")
 async def add_faq(faq: FAQItem):
     """
@@ -0,0 +1,41 @@
+"""
+Tenant configuration routes
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.container import get_latency_masker, get_tenant_registry
+from app.services.tenant_service import TenantRegistry
+from app.voice.latency_masking import LatencyMasker
+
+router = APIRouter(prefix="/tenants", tags=["tenants"])
+
+
+@router.get("")
+async def list_tenants(tenant_registry: TenantRegistry = Depends(get_tenant_registry)):
+    """
+    Loaded tenants and their cache usage
+    """
+    return tenant_registry.get_stats()
+
+
+@router.post("/{tenant_id}/load")
+async def load_tenant(
+    tenant_id: str,
+    tenant_registry: TenantRegistry = Depends(get_tenant_registry),
+    latency_masker: LatencyMasker = Depends(get_latency_masker)
+):
+    """
+    Load or reload one tenant without touching calls on other tenants
+    """
+    try:
+        # Built entirely off the event loop, then published with one reference swap
+        tenant = await asyncio.to_thread(tenant_registry.load, tenant_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tenant config: {e}")
+    if tenant.voice_id:
+        asyncio.get_running_loop().run_in_executor(None, latency_masker.presynthesize, [tenant.voice_id])
+    return {"status": "loaded", **tenant.summary()}
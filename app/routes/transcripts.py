@@ -0,0 +1,46 @@
+"""
+Transcript search routes
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from datetime import datetime
+
+from app.container import get_transcript_index
+from app.services.transcript_search import TranscriptIndex
+
+router = APIRouter(prefix="/transcripts", tags=["transcripts"])
+
+
+@router.get("/search")
+async def search_transcripts(
+    q: str = Query(..., description='Terms and "quoted phrases"; all must match'),
+    speaker: Optional[str] = Query(None, description="user or assistant"),
+    intent: Optional[str] = None,
+    call_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=100),
+    index: TranscriptIndex = Depends(get_transcript_index)
+):
+    """
+    Find conversation turns across all calls, best matches first
+    """
+    # Scoring is CPU-bound; keep it off the event loop that carries live call audio
+    hits = await asyncio.to_thread(
+        index.search, q, limit, speaker=speaker, intent=intent, since=since, until=until, call_id=call_id
+    )
+    return {
+        "query": q,
+        "results": [hit._asdict() for hit in hits],
+        "count": len(hits)
+    }
+
+
+@router.get("/stats")
+async def get_index_stats(index: TranscriptIndex = Depends(get_transcript_index)):
+    """
+    Transcript index size and segment layout
+    """
+    return index.get_stats()
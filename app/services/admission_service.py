@@ -0,0 +1,166 @@
+"""
+Adaptive admission control for incoming calls
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+HOLD_PROMPT = "All of our assistants are busy right now. Please hold and the next available agent will be with you shortly."
+
+
+def _parse_quotas(raw: str) -> Dict[str, int]:
+    """
+    Parse "tenant_a=50,tenant_b=20" into a quota mapping
+    """
+    quotas: Dict[str, int] = {}
+    for item in raw.split(","):
+        if "=" in item:
+            tenant, limit = item.split("=", 1)
+            quotas[tenant.strip()] = int(limit)
+    return quotas
+
+
+class AdmissionController:
+    """
+    AIMD concurrency limiter in front of call setup.
+
+    The global limit grows by roughly one call per "limit" healthy provider
+    responses while the worker is busy, and is cut multiplicatively when
+    providers exceed the target latency or return 429s. Each tenant is also
+    capped by its own quota so a single client cannot take the whole worker.
+    The hold prompt is rendered once (presynthesize, run at startup) so a
+    shed call hears it without waiting on TTS while providers are loaded.
+    """
+
+    def __init__(
+        self,
+        tts_service=None,
+        min_limit: int = 4,
+        max_limit: int = 500,
+        initial_limit: float = 50,
+        target_latency_ms: float = 2000,
+        backoff: float = 0.9,
+        decrease_cooldown: float = 1.0,
+        shed_action: str = "transfer",
+        default_quota: int = 0,
+        tenant_quotas: str = "",
+        retry_after_s: int = 5
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.target_latency_ms = target_latency_ms
+        self.backoff = backoff
+        self.decrease_cooldown = decrease_cooldown
+        self.shed_action = shed_action  # transfer, hold
+        # Held callers are told to retry after this many seconds
+        self.retry_after_s = retry_after_s
+        self.default_quota = default_quota  # 0 = no per-tenant cap
+        self.tenant_quotas = _parse_quotas(tenant_quotas)
+        self.tts_service = tts_service
+        # voice_id -> hold prompt audio; voice None is the provider default
+        self.hold_audio: Dict[Optional[str], bytes] = {}
+
+        self.in_flight = 0
+        self.tenant_in_flight: Dict[str, int] = {}
+        self.admitted: Dict[str, str] = {}  # call_id -> tenant_id
+        self.shed_count = 0
+        self.rate_limited_count = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, call_id: str, tenant_id: str = "default") -> Dict[str, Any]:
+        """
+        Admit a call or decide how to shed it
+        """
+        with self._lock:
+            if call_id in self.admitted:
+                return {"admitted": True, "limit": int(self.limit)}
+
+            quota = self.tenant_quotas.get(tenant_id, self.default_quota)
+            if self.in_flight >= int(self.limit):
+                reason = "worker_at_capacity"
+            elif quota and self.tenant_in_flight.get(tenant_id, 0) >= quota:
+                reason = "tenant_quota_exceeded"
+            else:
+                self.in_flight += 1
+                self.tenant_in_flight[tenant_id] = self.tenant_in_flight.get(tenant_id, 0) + 1
+                self.admitted[call_id] = tenant_id
+                return {"admitted": True, "limit": int(self.limit)}
+
+            self.shed_count += 1
+            decision = {
+                "admitted": False,
+                "reason": reason,
+                "action": self.shed_action,
+                "prompt": HOLD_PROMPT,
+                "limit": int(self.limit)
+            }
+            if self.shed_action == "hold":
+                decision["retry_after"] = self.retry_after_s
+            return decision
+
+    def presynthesize(self, voices: Iterable[Optional[str]] = (None,)):
+        """
+        Render the hold prompt via the TTS service, once per voice
+        """
+        if not self.tts_service:
+            return
+        for voice_id in voices:
+            if voice_id in self.hold_audio:
+                continue
+            result = self.tts_service.synthesize_speech(HOLD_PROMPT, voice_id=voice_id)
+            if result.get("success"):
+                self.hold_audio[voice_id] = result["audio"]
+
+    def release(self, call_id: str):
+        """
+        Free the slot held by a call (no-op for calls that were never admitted)
+        """
+        with self._lock:
+            tenant_id = self.admitted.pop(call_id, None)
+            if tenant_id is None:
+                return
+            self.in_flight -= 1
+            self.tenant_in_flight[tenant_id] -= 1
+            if not self.tenant_in_flight[tenant_id]:
+                del self.tenant_in_flight[tenant_id]
+
+    def is_admitted(self, call_id: str) -> bool:
+        return call_id in self.admitted
+
+    def record_sample(self, latency_ms: float, rate_limited: bool = False):
+        """
+        Feed one provider latency sample into the AIMD limit
+        """
+        with self._lock:
+            if rate_limited or latency_ms > self.target_latency_ms:
+                if rate_limited:
+                    self.rate_limited_count += 1
+                now = time.monotonic()
+                # One cut per cooldown so a burst of slow responses doesn't collapse the limit
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+            elif self.in_flight >= self.limit / 2:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def observe_provider(self, router: str, provider: str, latency_ms: float, error: Optional[str]):
+        """
+        Provider router listener: 429s and slow responses shrink the limit
+        """
+        rate_limited = bool(error) and ("429" in error or "rate limit" in error.lower())
+        if error and not rate_limited:
+            # Hard failures are handled by the router's circuit breakers
+            return
+        self.record_sample(latency_ms, rate_limited)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "tenants": dict(self.tenant_in_flight),
+            "shed": self.shed_count,
+            "rate_limited": self.rate_limited_count,
+            "hold_audio_voices": len(self.hold_audio)
+        }
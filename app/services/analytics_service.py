@@ -0,0 +1,172 @@
+"""
+Batch post-call analytics over stored calls
+"""
+import time
+from datetime import datetime, timedelta
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.intent_service import IntentType
+
+INTENTS: List[str] = [i.value for i in IntentType]
+INTENT_CODES: Dict[str, int] = {name: code for code, name in enumerate(INTENTS)}
+UNKNOWN_CODE = INTENT_CODES[IntentType.UNKNOWN.value]
+FAQ_CODE = INTENT_CODES[IntentType.FAQ.value]
+
+SENTIMENTS: List[str] = ["none", "positive", "neutral", "negative", "angry", "frustrated"]
+SENTIMENT_CODES: Dict[str, int] = {name: code for code, name in enumerate(SENTIMENTS)}
+
+PERCENTILES = [50, 75, 90, 95, 99]
+
+
+def local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Stored call times are naive local time; convert an aware bound to match
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+class CallAnalyticsJob:
+    """
+    Computes call analytics from ended calls in the database.
+
+    Calls are streamed in chunks and each chunk is converted once into NumPy
+    columns; all aggregation (intent histograms, escalation and FAQ rates,
+    handle-time percentiles) is vectorized over those columns. The per-call
+    columns and the summary are written to a compressed .npz file.
+    """
+
+    def __init__(self, database, output_dir: str = "analytics", chunk_size: int = 10000):
+        self.database = database
+        self.output_dir = Path(output_dir)
+        self.chunk_size = chunk_size
+        self.last_summary: Optional[Dict[str, Any]] = None
+
+    def _columns(self, calls: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Convert one chunk of call dicts into columnar arrays
+        """
+        n = len(calls)
+        intents = [c.get("intents") or [] for c in calls]
+        per_call = np.fromiter(map(len, intents), dtype=np.int32, count=n)
+        codes = np.fromiter(
+            (INTENT_CODES.get(i, UNKNOWN_CODE) for i in chain.from_iterable(intents)),
+            dtype=np.int16,
+            count=int(per_call.sum())
+        )
+        owner = np.repeat(np.arange(n, dtype=np.int32), per_call)
+
+        # First intent of each call is its primary intent; calls with none are unknown
+        primary = np.full(n, UNKNOWN_CODE, dtype=np.int16)
+        starts = np.cumsum(per_call) - per_call
+        has_intent = per_call > 0
+        primary[has_intent] = codes[starts[has_intent]]
+
+        return {
+            "start_time": np.fromiter(
+                (c["start_time"].timestamp() for c in calls), dtype=np.float64, count=n
+            ),
+            "duration": np.fromiter((c.get("duration") or 0.0 for c in calls), dtype=np.float64, count=n),
+            "escalated": np.fromiter((bool(c.get("escalated")) for c in calls), dtype=np.bool_, count=n),
+            "turns": np.fromiter((c.get("turns", 0) for c in calls), dtype=np.int32, count=n),
+            "sentiment": np.fromiter(
+                (SENTIMENT_CODES.get(c.get("sentiment") or "none", 0) for c in calls), dtype=np.int8, count=n
+            ),
+            "primary_intent": primary,
+            "faq_turns": np.bincount(owner[codes == FAQ_CODE], minlength=n).astype(np.int32),
+            "intent_counts": np.bincount(codes, minlength=len(INTENTS)).astype(np.int64)
+        }
+
+    def run(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Process every ended call in [since, until) and write the results file.
+        Aware bounds are converted to local time, which calls are stored in.
+        """
+        since, until = local_naive(since), local_naive(until)
+        started = time.perf_counter()
+        chunks: List[Dict[str, np.ndarray]] = []
+        intent_counts = np.zeros(len(INTENTS), dtype=np.int64)
+
+        for calls in self.database.iter_ended_calls(self.chunk_size, since, until):
+            cols = self._columns(calls)
+            intent_counts += cols.pop("intent_counts")
+            chunks.append(cols)
+
+        if chunks:
+            columns = {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+        else:
+            columns = {k: np.empty(0) for k in ("start_time", "duration", "escalated", "turns",
+                                                "sentiment", "primary_intent", "faq_turns")}
+
+        summary = self._summarize(columns, intent_counts)
+        summary["window"] = {
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None
+        }
+        summary["output"] = str(self._write(columns, intent_counts, summary))
+        summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.last_summary = summary
+        return summary
+
+    def run_day(self, day: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Analytics for one calendar day (default: yesterday)
+        """
+        day = (day or datetime.now() - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.run(day, day + timedelta(days=1))
+
+    def _summarize(self, columns: Dict[str, np.ndarray], intent_counts: np.ndarray) -> Dict[str, Any]:
+        total = int(columns["duration"].size)
+        if not total:
+            return {"calls": 0}
+
+        durations = columns["duration"]
+        escalated = columns["escalated"]
+        primary = columns["primary_intent"].astype(np.int64)
+        faq_calls = columns["faq_turns"] > 0
+
+        primary_counts = np.bincount(primary, minlength=len(INTENTS))
+        escalated_by_intent = np.bincount(primary, weights=escalated, minlength=len(INTENTS))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            escalation_by_intent = np.where(primary_counts > 0, escalated_by_intent / primary_counts, 0.0)
+
+        return {
+            "calls": total,
+            "intent_distribution": {INTENTS[i]: int(c) for i, c in enumerate(intent_counts) if c},
+            "primary_intents": {INTENTS[i]: int(c) for i, c in enumerate(primary_counts) if c},
+            "escalation_rate": round(float(escalated.mean()), 4),
+            "escalation_rate_by_intent": {
+                INTENTS[i]: round(float(r), 4) for i, r in enumerate(escalation_by_intent) if primary_counts[i]
+            },
+            "handle_time_seconds": {
+                f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(durations, PERCENTILES))
+            } | {"mean": round(float(durations.mean()), 2)},
+            "faq": {
+                "calls_with_faq": int(faq_calls.sum()),
+                "faq_turns": int(columns["faq_turns"].sum()),
+                # FAQ calls that ended without a human taking over
+                "resolved_rate": round(float((faq_calls & ~escalated).sum() / max(int(faq_calls.sum()), 1)), 4)
+            },
+            "sentiment": {
+                SENTIMENTS[i]: int(c)
+                for i, c in enumerate(np.bincount(columns["sentiment"].astype(np.int64), minlength=len(SENTIMENTS)))
+                if c
+            }
+        }
+
+    def _write(self, columns: Dict[str, np.ndarray], intent_counts: np.ndarray, summary: Dict[str, Any]) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"call_analytics_{datetime.now().strftime('%Y%m%dT%H%M%S')}.npz"
+        np.savez_compressed(
+            path,
+            intent_names=np.array(INTENTS),
+            sentiment_names=np.array(SENTIMENTS),
+            intent_counts=intent_counts,
+            **columns
+        )
+        return path
@@ -0,0 +1,251 @@
+"""
+Appointment scheduling with per-resource interval indexes
+"""
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class SlotUnavailableError(Exception):
+    """The requested time is outside bookable hours or already taken"""
+
+
+class IntervalIndex:
+    """
+    Sorted, non-overlapping busy intervals for one resource.
+
+    Because intervals never overlap, both starts and ends are sorted, so a
+    conflict check is a single bisect. Indexes are immutable: adding or
+    removing an interval returns a new index, which lets readers use a
+    snapshot without locks while writers commit optimistically.
+    """
+    __slots__ = ("starts", "ends", "ids", "_block_ends")
+
+    def __init__(
+        self,
+        starts: Sequence[datetime] = (),
+        ends: Sequence[datetime] = (),
+        ids: Sequence[str] = ()
+    ):
+        self.starts = list(starts)
+        self.ends = list(ends)
+        self.ids = list(ids)
+        self._block_ends: Optional[List[datetime]] = None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def conflict(self, start: datetime, end: datetime) -> Optional[int]:
+        """
+        Position of an interval overlapping [start, end), or None
+        """
+        i = bisect_right(self.ends, start)  # first interval ending after start
+        if i < len(self.starts) and self.starts[i] < end:
+            return i
+        return None
+
+    def block_end(self, i: int) -> datetime:
+        """
+        End of the run of back-to-back intervals starting at position i
+        """
+        if self._block_ends is None:
+            # Built once per (immutable) index, so a fully booked day is skipped in one step
+            block_ends = self.ends[:]
+            for j in range(len(block_ends) - 2, -1, -1):
+                if self.starts[j + 1] <= block_ends[j]:
+                    block_ends[j] = block_ends[j + 1]
+            self._block_ends = block_ends
+        return self._block_ends[i]
+
+    def with_interval(self, start: datetime, end: datetime, interval_id: str) -> "IntervalIndex":
+        i = bisect_left(self.starts, start)
+        return IntervalIndex(
+            self.starts[:i] + [start] + self.starts[i:],
+            self.ends[:i] + [end] + self.ends[i:],
+            self.ids[:i] + [interval_id] + self.ids[i:]
+        )
+
+    def without(self, interval_id: str) -> "IntervalIndex":
+        if interval_id not in self.ids:
+            return self
+        i = self.ids.index(interval_id)
+        return IntervalIndex(
+            self.starts[:i] + self.starts[i + 1:],
+            self.ends[:i] + self.ends[i + 1:],
+            self.ids[:i] + self.ids[i + 1:]
+        )
+
+
+EMPTY_INDEX = IntervalIndex()
+
+
+class BookingService:
+    """
+    Books appointments against per-resource schedules kept in the database.
+
+    Reads take the current (version, index) snapshot; a booking builds the
+    new index and commits it only if the version is unchanged, retrying on
+    a lost race. Two callers can therefore never hold the same slot, and no
+    lock is held while searching for free time.
+    """
+
+    def __init__(
+        self,
+        database,
+        resources: Sequence[str] = ("default",),
+        slot_minutes: int = 30,
+        open_hour: int = 9,
+        close_hour: int = 17,
+        horizon_days: int = 60,
+        max_retries: int = 8
+    ):
+        self.database = database
+        self.slot_minutes = slot_minutes
+        self.open_hour = open_hour
+        self.close_hour = close_hour
+        self.horizon_days = horizon_days
+        self.max_retries = max_retries
+        self.resources = list(resources)
+        self.slot = timedelta(minutes=self.slot_minutes)
+        self.bookings_made = 0
+        self.conflicts = 0
+        self.retries = 0
+
+    def _index(self, resource: str):
+        version, index = self.database.get_schedule(resource)
+        return version, index or EMPTY_INDEX
+
+    def _bookable(self, start: datetime, end: datetime) -> bool:
+        return (
+            start.weekday() < 5
+            and start.date() == (end - timedelta(microseconds=1)).date()
+            and start.hour >= self.open_hour
+            and (end.hour, end.minute, end.second) <= (self.close_hour, 0, 0)
+        )
+
+    def _align(self, when: datetime) -> datetime:
+        """
+        Round up to the next slot boundary
+        """
+        day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+        slots = -(-(when - day) // self.slot)
+        return day + slots * self.slot
+
+    def book(
+        self,
+        start: datetime,
+        duration_minutes: Optional[int] = None,
+        resource: Optional[str] = None,
+        service: Optional[str] = None,
+        call_id: Optional[str] = None,
+        caller_number: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Reserve [start, start + duration) on a resource (any free one if not given)
+        """
+        end = start + (timedelta(minutes=duration_minutes) if duration_minutes else self.slot)
+        if start < datetime.now() or not self._bookable(start, end):
+            raise SlotUnavailableError("Requested time is outside bookable hours")
+
+        for candidate in ([resource] if resource else self.resources):
+            for _ in range(self.max_retries):
+                version, index = self._index(candidate)
+                if index.conflict(start, end) is not None:
+                    break
+                booking = {
+                    "booking_id": f"apt_{uuid.uuid4().hex[:12]}",
+                    "resource": candidate,
+                    "start": start,
+                    "end": end,
+                    "service": service,
+                    "call_id": call_id,
+                    "caller_number": caller_number,
+                    "status": "booked",
+                    "created_at": datetime.now()
+                }
+                new_index = index.with_interval(start, end, booking["booking_id"])
+                if self.database.commit_schedule(candidate, version, new_index, booking):
+                    self.bookings_made += 1
+                    return booking
+                self.retries += 1  # another call committed first; re-check against its booking
+
+        self.conflicts += 1
+        raise SlotUnavailableError("Requested time is already booked")
+
+    def cancel(self, booking_id: str) -> bool:
+        booking = self.database.get_booking(booking_id)
+        if booking is None or booking["status"] != "booked":
+            return False
+        for _ in range(self.max_retries):
+            version, index = self._index(booking["resource"])
+            cancelled = dict(booking, status="cancelled")
+            if self.database.commit_schedule(booking["resource"], version, index.without(booking_id), cancelled):
+                return True
+        return False
+
+    def next_available(
+        self,
+        after: Optional[datetime] = None,
+        count: int = 3,
+        duration_minutes: Optional[int] = None,
+        resource: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Earliest free slots at or after a time, across resources
+        """
+        now = datetime.now()
+        after = max(after or now, now)
+        length = timedelta(minutes=duration_minutes) if duration_minutes else self.slot
+        found: List[Dict[str, Any]] = []
+        for candidate in ([resource] if resource else self.resources):
+            _, index = self._index(candidate)
+            found.extend(
+                {"resource": candidate, "start": s, "end": s + length}
+                for s in self._free_starts(index, after, length, count)
+            )
+
+        # One entry per time, earliest first
+        found.sort(key=lambda f: f["start"])
+        slots: List[Dict[str, Any]] = []
+        seen = set()
+        for f in found:
+            if f["start"] not in seen:
+                seen.add(f["start"])
+                slots.append(f)
+                if len(slots) == count:
+                    break
+        return slots
+
+    def _free_starts(self, index: IntervalIndex, after: datetime, length: timedelta, count: int) -> List[datetime]:
+        starts: List[datetime] = []
+        limit = after + timedelta(days=self.horizon_days)
+        current = self._align(after)
+        day = None
+        while len(starts) < count and current < limit:
+            if current.date() != day:
+                day = current.date()
+                day_open = datetime(day.year, day.month, day.day, self.open_hour)
+                day_close = datetime(day.year, day.month, day.day, self.close_hour)
+            if day.weekday() >= 5 or current + length > day_close:
+                current = day_open + timedelta(days=1)
+                continue
+            if current < day_open:
+                current = day_open
+                continue
+            i = index.conflict(current, current + length)
+            if i is None:
+                starts.append(current)
+                current += self.slot
+            else:
+                # Jump straight past the busy run
+                current = self._align(index.block_end(i))
+        return starts
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "resources": {r: len(self._index(r)[1]) for r in self.resources},
+            "bookings": self.bookings_made,
+            "conflicts": self.conflicts,
+            "retries": self.retries
+        }
@@ -0,0 +1,224 @@
+"""
+Per-call timeouts and the single teardown path for calls
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services.timer_wheel import Timer, TimerWheel
+
+REASON_COMPLETED = "completed"
+REASON_IDLE = "idle_timeout"
+REASON_MAX_DURATION = "max_duration"
+REASON_SILENCE = "silence"
+
+SILENCE_PROMPT = "Are you still there? I'm happy to help whenever you're ready."
+
+
+class CallTimers:
+    """
+    One call's timers, plus the stream attached to it, if any.
+    The stream calls activity() for every message it receives and speech()
+    for every transcript.
+    """
+    __slots__ = (
+        "call_id", "idle", "max_duration", "silence", "idle_ticks", "silence_ticks",
+        "silence_prompts", "close", "on_silence"
+    )
+
+    def __init__(self, call_id: str, idle: Timer, max_duration: Timer, idle_ticks: int, silence_ticks: int):
+        self.call_id = call_id
+        self.idle = idle
+        self.max_duration = max_duration
+        self.silence: Optional[Timer] = None
+        self.idle_ticks = idle_ticks
+        self.silence_ticks = silence_ticks
+        self.silence_prompts = 0
+        self.close: Optional[Callable[[str], Awaitable[None]]] = None
+        self.on_silence: Optional[Callable[[str], Awaitable[None]]] = None
+
+    def activity(self):
+        self.idle.extend(self.idle_ticks)
+
+    def speech(self):
+        self.idle.extend(self.idle_ticks)
+        if self.silence is not None:
+            self.silence.extend(self.silence_ticks)
+        self.silence_prompts = 0
+
+    def cancel(self):
+        self.idle.cancel()
+        self.max_duration.cancel()
+        if self.silence is not None:
+            self.silence.cancel()
+
+
+class CallLifecycle:
+    """
+    Reaps calls that were never ended and owns call teardown.
+
+    Every call started through /call/start gets an idle timeout (no stream
+    traffic at all), a maximum duration and, while a stream is attached, a
+    silence timer that prompts the caller and eventually hangs up. The timers
+    live on one timer wheel that is advanced by a single task, so per-frame
+    updates are O(1) whatever the number of calls. Explicit ends, idle
+    expiry and caps all go through end(). It closes the stream, frees the
+    admission slot and sentiment state, and persists the final call record
+    with its end reason. It also hands the record to the caller history.
+    """
+
+    def __init__(
+        self,
+        call_service,
+        admission_controller=None,
+        sentiment_service=None,
+        caller_history=None,
+        idle_timeout: float = 60,
+        max_duration: float = 3600,
+        silence_timeout: float = 10,
+        max_silence_prompts: int = 2,
+        tick: float = 0.1
+    ):
+        self.call_service = call_service
+        self.admission_controller = admission_controller
+        self.sentiment_service = sentiment_service
+        self.caller_history = caller_history
+        self.idle_timeout = idle_timeout
+        self.max_duration = max_duration
+        self.silence_timeout = silence_timeout
+        self.max_silence_prompts = max_silence_prompts
+        self.wheel = TimerWheel(tick)
+        self.calls: Dict[str, CallTimers] = {}
+        self.ended: Dict[str, int] = {}
+        self.silence_prompts = 0
+        self._tasks = set()
+
+    def track(self, call_id: str) -> CallTimers:
+        """
+        Start the idle and max-duration timers for a new call
+        """
+        timers = self.calls.get(call_id)
+        if timers is None:
+            timers = self.calls[call_id] = CallTimers(
+                call_id,
+                self.wheel.schedule(self.idle_timeout, self._expire, call_id, REASON_IDLE),
+                self.wheel.schedule(self.max_duration, self._expire, call_id, REASON_MAX_DURATION),
+                self.wheel.ticks(self.idle_timeout),
+                self.wheel.ticks(self.silence_timeout)
+            )
+        return timers
+
+    def attach(
+        self,
+        call_id: str,
+        close: Callable[[str], Awaitable[None]],
+        on_silence: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Optional[CallTimers]:
+        """
+        Register a connected stream: close(reason) ends it on expiry, and
+        on_silence(prompt) speaks to a caller who has gone quiet
+        """
+        timers = self.calls.get(call_id)
+        if timers is None:
+            return None
+        timers.close = close
+        timers.on_silence = on_silence
+        timers.activity()
+        if on_silence is not None and timers.silence is None:
+            timers.silence = self.wheel.schedule(self.silence_timeout, self._silent, call_id)
+        return timers
+
+    def detach(self, call_id: str):
+        """
+        The stream went away; the idle timer reaps the call unless it reconnects
+        """
+        timers = self.calls.get(call_id)
+        if timers is None:
+            return
+        timers.close = None
+        timers.on_silence = None
+        if timers.silence is not None:
+            timers.silence.cancel()
+            timers.silence = None
+
+    async def end(
+        self,
+        call_id: str,
+        reason: str = REASON_COMPLETED,
+        duration: Optional[float] = None,
+        sentiment: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Tear down every per-call resource and persist the call.
+        Raises ValueError for unknown calls.
+        """
+        timers = self.calls.pop(call_id, None)
+        close = None
+        if timers is not None:
+            timers.cancel()
+            close = timers.close
+        if self.admission_controller is not None:
+            self.admission_controller.release(call_id)
+        if self.sentiment_service is not None:
+            self.sentiment_service.forget(call_id)
+        # Persist before closing the stream so the record is kept even if closing fails
+        call_data = self.call_service.end_call(call_id, duration, sentiment, reason=reason)
+        prefetch = call_data.get("prefetch")
+        if prefetch is not None:
+            prefetch.cancel()
+        if self.caller_history is not None:
+            # The caller's next call should see this one's outcome
+            self.caller_history.record(call_data)
+        self.ended[reason] = self.ended.get(reason, 0) + 1
+        if close is not None:
+            try:
+                await close(reason)
+            except Exception as e:
+                print(f"Closing stream for {call_id} failed: {e}")
+        return call_data
+
+    def _expire(self, call_id: str, reason: str):
+        self._spawn(self._end_quietly(call_id, reason))
+
+    async def _end_quietly(self, call_id: str, reason: str):
+        try:
+            await self.end(call_id, reason)
+        except ValueError:
+            # Already ended through another path
+            self.calls.pop(call_id, None)
+
+    def _silent(self, call_id: str):
+        timers = self.calls.get(call_id)
+        if timers is None or timers.on_silence is None:
+            return
+        if timers.silence_prompts >= self.max_silence_prompts:
+            timers.silence = None
+            self._expire(call_id, REASON_SILENCE)
+            return
+        timers.silence_prompts += 1
+        self.silence_prompts += 1
+        timers.silence = self.wheel.schedule(self.silence_timeout, self._silent, call_id)
+        self._spawn(timers.on_silence(SILENCE_PROMPT))
+
+    def _spawn(self, coro: Awaitable):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self):
+        """
+        Advance the timer wheel every tick; runs for the life of the worker
+        """
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            self.wheel.advance()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tracked": len(self.calls),
+            "idle_timeout_s": self.idle_timeout,
+            "max_duration_s": self.max_duration,
+            "silence_timeout_s": self.silence_timeout,
+            "ended": dict(self.ended),
+            "silence_prompts": self.silence_prompts,
+            "wheel": self.wheel.get_stats()
+        }
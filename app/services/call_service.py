@@ -3,15 +3,38 @@ Call management service
 """
 from typing import Optional, Dict, Any
 from datetime import datetime
+from pathlib import Path
+import re
 import uuid
 
+# Call ids name recording and trace files, so only plain names are accepted
+_CALL_ID = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+
+def is_valid_call_id(call_id: Optional[str]) -> bool:
+    return bool(call_id) and _CALL_ID.fullmatch(call_id) is not None and call_id.strip(".") != ""
+
+
+def call_path(root: Path, call_id: str, suffix: str = "") -> Path:
+    """
+    root/<call_id><suffix>; raises ValueError for ids that could leave root
+    """
+    if not is_valid_call_id(call_id):
+        raise ValueError(f"Invalid call id: {call_id!r}")
+    path = root / f"{call_id}{suffix}"
+    if path.resolve().parent != root.resolve():
+        raise ValueError(f"Invalid call id: {call_id!r}")
+    return path
+
 
 class CallService:
     """Service for managing call sessions"""
     
-    def __init__(self):
-        # In production, this would use a database
+    def __init__(self, database=None, transcript_index=None):
+        # Active sessions live in memory; ended calls are persisted to the database
         self.active_calls: Dict[str, Dict[str, Any]] = {}
+        self.database = database
+        self.transcript_index = transcript_index
     
     def start_call(
         self,
@@ -30,7 +53,8 @@ class CallService:
             "status": "active",
             "messages": [],
             "intents": [],
-            "sentiment": None
+            "sentiment": None,
+            "escalated": False
         }
         
         self.active_calls[call_id] = call_data
@@ -40,10 +64,11 @@ class CallService:
         self,
         call_id: str,
         duration: Optional[float] = None,
-        sentiment: Optional[str] = None
+        sentiment: Optional[str] = None,
+        reason: str = "completed"
     ) -> Dict[str, Any]:
         """
-        End a call session
+        End a call session; reason records why (completed, idle_timeout, ...)
         """
         if call_id not in self.active_calls:
             raise ValueError(f"Call {call_id} not found")
@@ -51,7 +76,9 @@ class CallService:
         call_data = self.active_calls[call_id]
         call_data["status"] = "ended"
         call_data["end_time"] = datetime.now()
-        call_data["sentiment"] = sentiment
+        call_data["end_reason"] = reason
+        if sentiment:
+            call_data["sentiment"] = sentiment
         
         if duration:
             call_data["duration"] = duration
@@ -59,8 +86,9 @@ class CallService:
             delta = call_data["end_time"] - call_data["start_time"]
             call_data["duration"] = delta.total_seconds()
         
-        # In production, save to database before removing from active calls
         result = call_data.copy()
+        if self.database is not None:
+            self._persist(result)
         del self.active_calls[call_id]
         
         return result
@@ -92,10 +120,36 @@ class CallService:
         }
         
         self.active_calls[call_id]["messages"].append(message_data)
+        if self.transcript_index is not None:
+            self.transcript_index.add(call_id, speaker, message, intent, message_data["timestamp"])
         
         if intent:
             self.active_calls[call_id]["intents"].append(intent)
     
+    def _persist(self, call_data: Dict[str, Any]):
+        """
+        Save the final call record and its transcript
+        """
+        # The transcript is stored per message; flow state and prefetched context are not kept
+        record = {k: v for k, v in call_data.items() if k not in ("messages", "flow", "prefetch", "caller_context")}
+        record["turns"] = len(call_data["messages"])
+        self.database.save_call(record)
+        for i, message in enumerate(call_data["messages"]):
+            self.database.save_conversation({
+                "id": f"{call_data['call_id']}_{i}",
+                "call_id": call_data["call_id"],
+                **message
+            })
+    
+    def mark_escalated(self, call_id: str):
+        """
+        Flag a call as handed to a human agent
+        """
+        if call_id not in self.active_calls:
+            raise ValueError(f"Call {call_id} not found")
+        
+        self.active_calls[call_id]["escalated"] = True
+    
     def update_sentiment(self, call_id: str, sentiment: str):
         """
         Update call sentiment
@@ -0,0 +1,167 @@
+"""
+Per-call event traces for reproducing latency (opt-in, TRACE_ENABLED)
+
+Each call's trace is one JSONL file under TRACE_DIR. Every line is an event
+with "t_us" (microseconds since the call began, monotonic clock), "kind" and
+kind-specific fields:
+
+    kind        fields
+    start       call_id, tenant_id
+    frame_in    seq, codec, bytes, ts_us (sender timestamp), hash
+    partial     text
+    final       text
+    span        stage (llm, tool, tts, stt), dur_us, and stage details
+                (route, model, tokens, request/response hashes)
+    response    intent, text_hash
+    audio_out   bytes, end
+    end
+
+Audio and provider payloads are never stored, only their sizes and crc32
+hashes; transcripts are stored as text so a replay can resend them.
+scripts/replay_trace.py replays traces against fake providers.
+"""
+import json
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from app.services.call_service import call_path
+
+
+def payload_hash(data: Union[bytes, bytearray, memoryview, str, None]) -> Optional[str]:
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return f"{zlib.crc32(data) & 0xFFFFFFFF:08x}"
+
+
+class CallTrace:
+    """Events for one call, appended in memory and written when the call ends"""
+    __slots__ = ("call_id", "events", "origin_ns", "max_events", "dropped")
+
+    def __init__(self, call_id: str, max_events: int):
+        self.call_id = call_id
+        self.events: List[Dict[str, Any]] = []
+        self.origin_ns = time.perf_counter_ns()
+        self.max_events = max_events
+        self.dropped = 0
+
+    def now_us(self) -> int:
+        return (time.perf_counter_ns() - self.origin_ns) // 1000
+
+    def event(self, kind: str, t_us: Optional[int] = None, **fields):
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        # list.append is atomic, so provider threads can record spans directly
+        self.events.append({"t_us": self.now_us() if t_us is None else t_us, "kind": kind, **fields})
+
+
+# The trace of the call being handled; asyncio tasks and to_thread inherit it
+_current: ContextVar[Optional[CallTrace]] = ContextVar("call_trace", default=None)
+
+
+def current_trace() -> Optional[CallTrace]:
+    return _current.get()
+
+
+def event(kind: str, **fields):
+    """
+    Record an event on the current call's trace, if any
+    """
+    trace = _current.get()
+    if trace is not None:
+        trace.event(kind, **fields)
+
+
+@contextmanager
+def span(stage: str, **fields) -> Iterator[Dict[str, Any]]:
+    """
+    Time a provider or tool request on the current call's trace.
+    Yields a dict the caller may fill with response details.
+    """
+    trace = _current.get()
+    info: Dict[str, Any] = dict(fields)
+    if trace is None:
+        yield info
+        return
+    start_us = trace.now_us()
+    try:
+        yield info
+    except BaseException as e:
+        info["error"] = type(e).__name__
+        raise
+    finally:
+        trace.event("span", t_us=start_us, stage=stage, dur_us=trace.now_us() - start_us, **info)
+
+
+class CallTracer:
+    """
+    Creates call traces and writes finished ones from a background thread.
+    """
+
+    def __init__(self, trace_dir: str = "traces", max_events: int = 50000):
+        self.trace_dir = Path(trace_dir)
+        self.max_events = max_events
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="call-trace")
+        self.traces_written = 0
+        self.events_written = 0
+        self.dropped = 0
+
+    def begin(self, call_id: str, **fields) -> CallTrace:
+        """
+        Start a trace and make it current for the calling task
+        """
+        trace = CallTrace(call_id, self.max_events)
+        trace.event("start", call_id=call_id, **fields)
+        _current.set(trace)
+        return trace
+
+    def finish(self, trace: CallTrace):
+        trace.event("end")
+        self._writer.submit(self._write, trace)
+
+    def _write(self, trace: CallTrace):
+        try:
+            self.trace_dir.mkdir(parents=True, exist_ok=True)
+            # A reconnecting stream for the same call gets its own file
+            path = call_path(self.trace_dir, trace.call_id, ".jsonl")
+            n = 1
+            while path.exists():
+                path = call_path(self.trace_dir, trace.call_id, f".{n}.jsonl")
+                n += 1
+            with open(path, "w", encoding="utf-8") as f:
+                for e in trace.events:
+                    f.write(json.dumps(e, separators=(",", ":")) + "\n")
+            self.traces_written += 1
+            self.events_written += len(trace.events)
+            self.dropped += trace.dropped
+        except (OSError, ValueError) as e:
+            print(f"Trace write failed for {trace.call_id}: {e}")
+
+    def flush(self):
+        """
+        Wait until every finished trace is on disk
+        """
+        self._writer.submit(lambda: None).result()
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> List[Dict[str, Any]]:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "trace_dir": str(self.trace_dir),
+            "traces_written": self.traces_written,
+            "events_written": self.events_written,
+            "dropped_events": self.dropped
+        }
@@ -0,0 +1,231 @@
+"""
+Returning-caller context, indexed by phone number
+"""
+import asyncio
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+_NON_DIGIT = re.compile(r"\D")
+
+
+def normalize_number(number: str) -> str:
+    """
+    Comparison form of a phone number: digits only, keeping a leading +
+    """
+    number = (number or "").strip()
+    digits = _NON_DIGIT.sub("", number)
+    return f"+{digits}" if number.startswith("+") else digits
+
+
+class CallerContext:
+    """A caller's recent calls and the outcome summary built from them"""
+    __slots__ = ("total_calls", "calls", "summary")
+
+    def __init__(self, total_calls: int, calls: List[Dict[str, Any]]):
+        self.total_calls = total_calls
+        self.calls = calls
+        self.summary = _summarize(total_calls, calls)
+
+    def as_context(self) -> Dict[str, Any]:
+        return {"caller_history": self.summary, "recent_calls": self.calls}
+
+
+class CallerHistory:
+    """
+    Prefetches what the agent should know about a returning caller.
+
+    Every persisted call is indexed by (tenant, normalized number), keeping
+    the ids of the caller's most recent calls. /call/start launches the
+    prefetch as a task and returns the greeting without waiting for it.
+    The stream waits for the task (briefly) before the first LLM turn.
+    Built contexts of hot callers stay in an LRU. A caller's entry is dropped
+    when one of their calls ends, so the next call sees that outcome; a
+    per-caller generation, bumped on every indexed call, stops a lookup that
+    read the index before the call ended from caching its stale context.
+    Callers are scoped per tenant.
+    """
+
+    def __init__(
+        self,
+        database,
+        recent_calls: int = 5,
+        max_hot: int = 10000,
+        wait_ms: float = 300
+    ):
+        self.database = database
+        self.recent_calls = recent_calls
+        self.max_hot = max_hot
+        self.wait = wait_ms / 1000
+        self._index: Dict[Tuple[str, str], Deque[str]] = {}
+        self._totals: Dict[Tuple[str, str], int] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._hot: "OrderedDict[Tuple[str, str], CallerContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale = 0
+        self.late = 0
+
+    def add_many(self, calls: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index already persisted calls, oldest first
+        """
+        records = sorted(
+            (c for c in calls if c.get("caller_number")),
+            key=lambda c: c.get("start_time") or datetime.min
+        )
+        for record in records:
+            self._add(record)
+        return len(records)
+
+    def _add(self, record: Dict[str, Any]) -> Tuple[str, str]:
+        key = (record.get("tenant_id") or "default", normalize_number(record["caller_number"]))
+        with self._lock:
+            ids = self._index.get(key)
+            if ids is None:
+                ids = self._index[key] = deque(maxlen=self.recent_calls)
+            ids.append(record["call_id"])
+            self._totals[key] = self._totals.get(key, 0) + 1
+            self._generations[key] = self._generations.get(key, 0) + 1
+        return key
+
+    def record(self, call_data: Dict[str, Any]):
+        """
+        A call ended: index it and drop the caller's cached context
+        """
+        if not call_data.get("caller_number"):
+            return
+        key = self._add(call_data)
+        with self._lock:
+            if self._hot.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def lookup(self, tenant_id: str, number: str) -> Optional[CallerContext]:
+        """
+        The caller's context, or None for first-time callers (blocking on a cache miss)
+        """
+        key = (tenant_id or "default", normalize_number(number))
+        context = self._hot_get(key)
+        if context is not None:
+            return context
+        with self._lock:
+            ids = list(self._index.get(key, ()))
+            total = self._totals.get(key, 0)
+            generation = self._generations.get(key, 0)
+        if not ids:
+            return None
+        self.misses += 1
+        calls = []
+        for call_id in reversed(ids):
+            record = self.database.get_call(call_id)
+            if record is not None:
+                calls.append(_brief(record))
+        context = CallerContext(total, calls)
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                # A call ended while this one was being built: serve it, but don't cache it
+                self.stale += 1
+                return context
+            self._hot[key] = context
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.max_hot:
+                self._hot.popitem(last=False)
+        return context
+
+    def _hot_get(self, key: Tuple[str, str]) -> Optional[CallerContext]:
+        with self._lock:
+            context = self._hot.get(key)
+            if context is not None:
+                self._hot.move_to_end(key)
+                self.hits += 1
+            return context
+
+    def start(self, call_data: Dict[str, Any]):
+        """
+        Begin prefetching for a new call; the result lands in call_data["caller_context"]
+        """
+        tenant_id = call_data.get("tenant_id") or "default"
+        number = call_data.get("caller_number") or ""
+        key = (tenant_id, normalize_number(number))
+        call_data["caller_context"] = None
+        if key not in self._index:
+            # First-time caller: nothing to fetch
+            return
+        context = self._hot_get(key)
+        if context is not None:
+            call_data["caller_context"] = context.as_context()
+            return
+        task = asyncio.ensure_future(asyncio.to_thread(self.lookup, tenant_id, number))
+
+        def store(done: asyncio.Future):
+            if not done.cancelled() and done.exception() is None and done.result() is not None:
+                call_data["caller_context"] = done.result().as_context()
+        task.add_done_callback(store)
+        call_data["prefetch"] = task
+
+    def pending(self, call_data: Optional[Dict[str, Any]]) -> bool:
+        task = call_data.get("prefetch") if call_data else None
+        return task is not None and not task.done()
+
+    async def ready(self, call_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Wait (up to CALLER_PREFETCH_WAIT_MS) for a call's prefetch to land
+        """
+        if not call_data:
+            return None
+        if self.pending(call_data):
+            try:
+                await asyncio.wait_for(asyncio.shield(call_data["prefetch"]), self.wait)
+            except asyncio.TimeoutError:
+                self.late += 1
+            except Exception:
+                pass
+        return call_data.get("caller_context")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "indexed_callers": len(self._index),
+            "hot_callers": len(self._hot),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "stale_lookups": self.stale,
+            "late_prefetches": self.late
+        }
+
+
+def _brief(record: Dict[str, Any]) -> Dict[str, Any]:
+    start = record.get("start_time")
+    return {
+        "call_id": record.get("call_id"),
+        "date": start.isoformat(timespec="minutes") if isinstance(start, datetime) else start,
+        "intents": list(dict.fromkeys(record.get("intents") or [])),
+        "sentiment": record.get("sentiment"),
+        "escalated": bool(record.get("escalated")),
+        "outcome": record.get("end_reason") or record.get("status")
+    }
+
+
+def _summarize(total_calls: int, calls: List[Dict[str, Any]]) -> str:
+    if not calls:
+        return f"Returning caller with {total_calls} previous call(s)."
+    last = calls[0]
+    topics = ", ".join(last["intents"]) or "no recorded topic"
+    parts = [
+        f"Returning caller with {total_calls} previous call(s).",
+        f"Most recent call {last['date']}: about {topics}, outcome {last['outcome'] or 'unknown'}"
+        + (f", sentiment {last['sentiment']}" if last["sentiment"] else "") + "."
+    ]
+    earlier = list(dict.fromkeys(i for call in calls[1:] for i in call["intents"]))
+    if earlier:
+        parts.append(f"Earlier topics: {', '.join(earlier)}.")
+    escalations = sum(call["escalated"] for call in calls)
+    if escalations:
+        parts.append(f"Escalated to a human in {escalations} of the last {len(calls)} call(s).")
+    return " ".join(parts)
@@ -0,0 +1,43 @@
+"""
+CPU-bound task functions run by the worker pool
+
+These execute in worker processes, so the module avoids importing services,
+clients or the web framework; a worker only loads what its tasks need.
+Audio arguments arrive as a buffer that is valid only during the call.
+"""
+import io
+import wave
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.worker_pool import PRIORITY_BACKGROUND, PRIORITY_LIVE
+from app.voice import dsp
+
+
+def prepare_stt_audio(data, sample_rate: int) -> bytes:
+    """
+    Caller PCM16 to a level-normalized 16 kHz WAV for the STT provider
+    """
+    pcm = np.frombuffer(data, dtype=np.int16)
+    pcm = dsp.resample(pcm, sample_rate, dsp.STT_SAMPLE_RATE)
+    pcm = dsp.RMSNormalizer(max_chunk=max(pcm.size, 1)).process(pcm)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(dsp.STT_SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def build_faq_index(faqs: List[Dict[str, Any]]):
+    from app.services.tenant_service import FAQIndex
+    return FAQIndex(faqs)
+
+
+# name -> (function, priority, max queued)
+TASKS = {
+    "stt_prepare": (prepare_stt_audio, PRIORITY_LIVE, 256),
+    "faq_index": (build_faq_index, PRIORITY_BACKGROUND, 16)
+}
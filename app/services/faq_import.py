@@ -0,0 +1,253 @@
+"""
+Bulk FAQ import from NDJSON or CSV request streams
+
+Rows are parsed as the body arrives and deduplicated by normalized
+question. A later row replaces an earlier one, and imported rows replace
+stored FAQs with the same question. Questions are embedded in fixed-size
+batches while the upload is still streaming, with at most `concurrency`
+requests in flight. Once the body is complete, the tenant's stored FAQs
+are replaced in one step, and its search index is rebuilt in one pass and
+swapped in.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.tenant_service import TenantRegistry, faq_id, normalize_question
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+MODE_MERGE = "merge"
+MODE_REPLACE = "replace"
+
+
+class FAQImportError(ValueError):
+    """The upload cannot be imported (bad format, too many rows)"""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decode a byte stream into lines without buffering the whole body
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple]:
+    """
+    (row number, record dict or error message) per non-empty row
+    """
+    if fmt == FORMAT_NDJSON:
+        row = 0
+        async for line in lines:
+            row += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield row, f"invalid JSON: {e.msg}"
+                continue
+            yield row, record if isinstance(record, dict) else "expected a JSON object"
+        return
+    if fmt != FORMAT_CSV:
+        raise FAQImportError(f"Unsupported format: {fmt}")
+
+    header: Optional[List[str]] = None
+    pending = ""
+    row = 0
+    async for line in lines:
+        # A quoted field may contain newlines: wait until its quotes balance
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        row += 1
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            if "question" not in header or "answer" not in header:
+                raise FAQImportError("CSV header must include question and answer columns")
+            continue
+        yield row, dict(zip(header, values))
+    if pending:
+        yield row + 1, "unterminated quoted field"
+
+
+class FAQImporter:
+    """
+    Streams FAQ uploads into the database and a tenant's search index.
+    embedder(texts) -> vectors is optional; without it FAQs are stored
+    without embeddings.
+    """
+
+    def __init__(
+        self,
+        database,
+        tenant_registry: TenantRegistry,
+        embedder: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        batch_size: int = 256,
+        concurrency: int = 4,
+        max_rows: int = 200000
+    ):
+        self.database = database
+        self.tenant_registry = tenant_registry
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_rows = max_rows
+        # Merging reads the stored FAQs: concurrent imports into one tenant take turns publishing
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.imports = 0
+        self.rows_imported = 0
+
+    async def import_stream(
+        self,
+        tenant_id: str,
+        chunks: AsyncIterator[bytes],
+        fmt: str = FORMAT_NDJSON,
+        mode: str = MODE_MERGE,
+        max_errors: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Import one upload; raises FAQImportError for uploads that can't be imported
+        and FileNotFoundError for unknown tenants
+        """
+        if mode not in (MODE_MERGE, MODE_REPLACE):
+            raise FAQImportError(f"Unsupported mode: {mode}")
+        if tenant_id not in self.tenant_registry.tenants():
+            raise FileNotFoundError(f"Unknown tenant {tenant_id}")
+        start = time.perf_counter()
+        faqs: Dict[str, Dict[str, Any]] = {}
+        embeddings: Dict[str, Any] = {}
+        batch: List[tuple] = []
+        tasks: List[asyncio.Task] = []
+        semaphore = asyncio.Semaphore(self.concurrency)
+        stats = {"rows": 0, "duplicates": 0, "invalid": 0, "embedded": 0, "embed_failed": 0}
+        errors: List[Dict[str, Any]] = []
+
+        async def embed(items: List[tuple]):
+            async with semaphore:
+                try:
+                    vectors = await asyncio.to_thread(self.embedder, [question for _, question in items])
+                except Exception as e:
+                    stats["embed_failed"] += len(items)
+                    if len(errors) < max_errors:
+                        errors.append({"row": None, "error": f"embedding batch failed: {e}"})
+                    return
+            for (key, _), vector in zip(items, vectors):
+                embeddings[key] = np.asarray(vector, dtype=np.float32)
+            stats["embedded"] += len(items)
+
+        try:
+            async for row, record in iter_records(iter_lines(chunks), fmt):
+                stats["rows"] += 1
+                if stats["rows"] > self.max_rows:
+                    raise FAQImportError(f"Upload exceeds {self.max_rows} rows")
+                faq = _clean(record) if isinstance(record, dict) else record
+                if isinstance(faq, str):
+                    stats["invalid"] += 1
+                    if len(errors) < max_errors:
+                        errors.append({"row": row, "error": faq})
+                    continue
+                key = normalize_question(faq["question"])
+                if key in faqs:
+                    stats["duplicates"] += 1
+                elif self.embedder is not None:
+                    # Duplicates reuse the first embedding: same normalized question
+                    batch.append((key, faq["question"]))
+                    if len(batch) >= self.batch_size:
+                        tasks.append(asyncio.create_task(embed(batch)))
+                        batch = []
+                faqs[key] = faq
+            if batch:
+                tasks.append(asyncio.create_task(embed(batch)))
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        for key, faq in faqs.items():
+            if key in embeddings:
+                faq["embedding"] = embeddings[key]
+        async with self._locks.setdefault(tenant_id, asyncio.Lock()):
+            stored = 0 if mode == MODE_REPLACE else len(self.database.get_faqs(tenant_id))
+            merged = self._merge(tenant_id, list(faqs.values()), mode)
+            index_start = time.perf_counter()
+            # Off the event loop; large sets are indexed in the CPU pool
+            tenant = await asyncio.to_thread(self._publish, tenant_id, merged)
+        self.imports += 1
+        self.rows_imported += len(faqs)
+        return {
+            "status": "imported",
+            "tenant_id": tenant_id,
+            "format": fmt,
+            "mode": mode,
+            **stats,
+            "imported": len(faqs),
+            "replaced_existing": max(0, stored + len(faqs) - len(merged)),
+            "total_faqs": len(tenant.faq_index),
+            "etag": tenant.faq_index.etag,
+            "index_build_ms": round((time.perf_counter() - index_start) * 1000, 1),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "errors": errors
+        }
+
+    def _merge(self, tenant_id: str, imported: List[Dict[str, Any]], mode: str) -> List[Dict[str, Any]]:
+        if mode == MODE_REPLACE:
+            return imported
+        merged = {normalize_question(f.get("question", "")): f for f in self.database.get_faqs(tenant_id)}
+        merged.update((normalize_question(f["question"]), f) for f in imported)
+        return list(merged.values())
+
+    def _publish(self, tenant_id: str, faqs: List[Dict[str, Any]]):
+        self.database.replace_faqs(tenant_id, faqs)
+        return self.tenant_registry.reload_faqs(tenant_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "imports": self.imports,
+            "rows_imported": self.rows_imported,
+            "embeddings": self.embedder is not None,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency
+        }
+
+
+def _clean(record: Dict[str, Any]):
+    """
+    Validated FAQ dict, or an error message
+    """
+    question = str(record.get("question") or "").strip()
+    answer = str(record.get("answer") or "").strip()
+    if not question or not answer:
+        return "question and answer are required"
+    if not normalize_question(question):
+        return "question has no words"
+    faq: Dict[str, Any] = {"question": question, "answer": answer}
+    category = str(record.get("category") or "").strip()
+    if category:
+        faq["category"] = category
+    try:
+        faq["frequency"] = int(record.get("frequency") or 0)
+    except (TypeError, ValueError):
+        return "frequency must be an integer"
+    # Stable ids: re-importing the same question updates it rather than adding another
+    faq["id"] = str(record.get("id") or "").strip() or faq_id(question)
+    return faq
@@ -0,0 +1,291 @@
+"""
+Provider routing with health scoring, circuit breakers and hedged requests
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Observers notified after every provider attempt: fn(router, provider, latency_ms, error)
+_listeners: List[Callable[[str, str, float, Optional[str]], None]] = []
+
+
+def add_listener(listener: Callable[[str, str, float, Optional[str]], None]):
+    """
+    Register an observer for provider latency and errors (e.g. admission control)
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when every provider behind a router failed or is circuit-open"""
+
+    def __init__(self, router: str, last_error: Optional[str] = None, last_result: Any = None):
+        super().__init__(f"All {router} providers failed: {last_error or 'no provider available'}")
+        self.last_error = last_error
+        self.last_result = last_result
+
+
+class CircuitBreaker:
+    """Circuit breaker for a single provider (closed -> open -> half-open)"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"  # closed, open, half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """
+        Whether allow_request() would admit a request now, without claiming anything
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "half_open":
+                return not self._trial
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """
+        Return True if a request may be sent to the provider.
+        An open breaker admits a single trial request after reset_timeout;
+        everything else is refused until that trial's result closes or
+        re-opens it.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            if self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class ProviderHealth:
+    """Exponentially weighted latency and error rate for a single provider"""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.latency_ms: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms: float, success: bool):
+        with self._lock:
+            self.requests += 1
+            if not success:
+                self.failures += 1
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms += self.alpha * (latency_ms - self.latency_ms)
+            self.error_rate += self.alpha * ((0.0 if success else 1.0) - self.error_rate)
+
+    def score(self) -> float:
+        """
+        Lower is healthier. Unmeasured providers score 0 so configured order wins.
+        """
+        if self.latency_ms is None:
+            return 0.0
+        return self.latency_ms * (1.0 + 4.0 * self.error_rate)
+
+
+class ProviderRouter:
+    """
+    Routes a request across an ordered list of providers.
+
+    The healthiest provider whose breaker is closed is tried first. If it has
+    not answered within latency_budget seconds a hedged request is sent to the
+    next provider and whichever succeeds first wins. Failed providers fall
+    through to the remaining ones until the list is exhausted. The budget is
+    measured to the complete response, not its first byte, since providers
+    are called for whole results.
+
+    With a deadline, call() gives up after that many seconds in total and
+    raises ProviderUnavailableError so the caller can fall back. Attempts
+    still running are abandoned, not interrupted: each provider call must
+    carry its own request timeout so its worker thread is freed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        providers: List[str],
+        latency_budget: float = 1.0,
+        hedge: bool = True,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        is_failure: Optional[Callable[[Any], bool]] = None,
+        max_workers: int = 16,
+        ordered: bool = False,
+        deadline: Optional[float] = None
+    ):
+        if not providers:
+            raise ValueError(f"{name} router needs at least one provider")
+
+        self.name = name
+        self.providers = list(dict.fromkeys(providers))
+        self.latency_budget = latency_budget
+        self.hedge = hedge
+        self.is_failure = is_failure
+        # Ordered routers keep their configured preference; only breakers skip a provider
+        self.ordered = ordered
+        self.deadline = deadline
+        self.breakers: Dict[str, CircuitBreaker] = {
+            p: CircuitBreaker(failure_threshold, reset_timeout) for p in self.providers
+        }
+        self.health: Dict[str, ProviderHealth] = {p: ProviderHealth() for p in self.providers}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.fallbacks = 0
+        self.deadlines_missed = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-router")
+
+    def ranked_providers(self) -> List[str]:
+        """
+        Providers that currently accept traffic, healthiest first.
+        Read-only: a breaker's trial slot is only claimed when a request is sent.
+        """
+        order = {p: i for i, p in enumerate(self.providers)}
+        available = [p for p in self.providers if self.breakers[p].available()]
+        if self.ordered:
+            return available
+        return sorted(available, key=lambda p: (self.health[p].score(), order[p]))
+
+    def call(self, fn: Callable[[str], Any]) -> Any:
+        """
+        Invoke fn(provider) with hedging and fallback, returning the first success
+        """
+        expires = time.monotonic() + self.deadline if self.deadline else None
+        queue = self.ranked_providers()
+        if not queue:
+            raise ProviderUnavailableError(self.name)
+
+        pending: Dict[Future, str] = {}
+        hedged = False
+        last_error: Optional[str] = None
+        last_result: Any = None
+
+        def launch() -> bool:
+            # Skip providers whose breaker closed (or lost its trial slot) since ranking
+            while queue:
+                provider = queue.pop(0)
+                if self.breakers[provider].allow_request():
+                    break
+            else:
+                return False
+            # Attempts run in the caller's context, so they stay attributed to its call trace
+            context = contextvars.copy_context()
+            pending[self._executor.submit(context.run, self._attempt, provider, fn)] = provider
+            return True
+
+        if not launch():
+            raise ProviderUnavailableError(self.name)
+        primary = next(iter(pending.values()))
+        while pending:
+            can_hedge = self.hedge and not hedged and bool(queue)
+            timeout = self.latency_budget if can_hedge else None
+            if expires is not None:
+                remaining = max(expires - time.monotonic(), 0.0)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done and expires is not None and time.monotonic() >= expires:
+                self.deadlines_missed += 1
+                raise ProviderUnavailableError(
+                    self.name, f"no response within {self.deadline:g}s", last_result
+                )
+            if not done:
+                # Primary blew the latency budget: race it against the next provider
+                hedged = True
+                if launch():
+                    self.hedges_sent += 1
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                success, result, error = future.result()
+                if success:
+                    if provider != primary:
+                        if hedged:
+                            self.hedges_won += 1
+                        else:
+                            self.fallbacks += 1
+                    return result
+                last_error, last_result = error, result
+
+            if not pending and queue:
+                launch()
+
+        raise ProviderUnavailableError(self.name, last_error, last_result)
+
+    def _attempt(self, provider: str, fn: Callable[[str], Any]) -> Tuple[bool, Any, Optional[str]]:
+        start = time.perf_counter()
+        try:
+            result = fn(provider)
+            failed = self.is_failure(result) if self.is_failure else False
+            error = result.get("error") if failed and isinstance(result, dict) else None
+        except Exception as e:
+            result, failed, error = None, True, str(e)
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.health[provider].record(latency_ms, not failed)
+        if failed:
+            error = error or f"{provider} failed"
+        for listener in _listeners:
+            listener(self.name, provider, latency_ms, error)
+
+        if failed:
+            self.breakers[provider].record_failure()
+            return False, result, error
+
+        self.breakers[provider].record_success()
+        return True, result, None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of provider health for monitoring
+        """
+        return {
+            "router": self.name,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "fallbacks": self.fallbacks,
+            "deadlines_missed": self.deadlines_missed,
+            "providers": {
+                p: {
+                    "state": self.breakers[p].state,
+                    "latency_ms": self.health[p].latency_ms,
+                    "error_rate": round(self.health[p].error_rate, 4),
+                    "requests": self.health[p].requests,
+                    "failures": self.health[p].failures
+                }
+                for p in self.providers
+            }
+        }
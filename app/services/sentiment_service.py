@@ -0,0 +1,198 @@
+"""
+Live sentiment scoring and per-call sentiment trajectories
+"""
+import asyncio
+import math
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from app.ai.micro_batcher import MicroBatcher
+
+_TOKEN = re.compile(r"[a-z']+|!")
+
+# Lexicon weights in [-1, 1]; deliberately small and tuned for support calls
+LEXICON: Dict[str, float] = {
+    # positive
+    "thanks": 0.5, "thank": 0.5, "great": 0.7, "perfect": 0.8, "awesome": 0.8, "good": 0.4,
+    "helpful": 0.6, "appreciate": 0.6, "love": 0.7, "excellent": 0.8, "nice": 0.4, "happy": 0.6,
+    "wonderful": 0.8, "fine": 0.2, "sure": 0.1, "okay": 0.1, "glad": 0.5, "resolved": 0.5,
+    # negative
+    "bad": -0.5, "wrong": -0.5, "problem": -0.4, "issue": -0.3, "broken": -0.6, "late": -0.3,
+    "waiting": -0.3, "wait": -0.2, "again": -0.2, "still": -0.2, "never": -0.3, "cancel": -0.4,
+    "refund": -0.3, "complaint": -0.6, "disappointed": -0.7, "frustrated": -0.8, "frustrating": -0.8,
+    "annoyed": -0.7, "annoying": -0.7, "upset": -0.7, "angry": -0.9, "furious": -1.0, "terrible": -0.9,
+    "awful": -0.9, "horrible": -0.9, "worst": -1.0, "useless": -0.9, "ridiculous": -0.8,
+    "unacceptable": -0.9, "hate": -0.9, "stupid": -0.9, "scam": -1.0, "sue": -0.9, "lawyer": -0.7,
+    "manager": -0.4, "supervisor": -0.4, "rude": -0.8, "ignored": -0.7
+}
+NEGATIONS = frozenset({"not", "no", "never", "don't", "didn't", "doesn't", "isn't", "wasn't", "can't", "won't"})
+INTENSIFIERS: Dict[str, float] = {"very": 1.5, "really": 1.4, "so": 1.3, "extremely": 1.8, "totally": 1.5}
+
+ESCALATION_LABEL = "frustrated"
+
+
+class LexiconSentimentModel:
+    """Fast inline scorer: lexicon weights with negation and intensifiers"""
+
+    def score(self, text: str) -> float:
+        """
+        Return a sentiment score in [-1, 1]
+        """
+        tokens = _TOKEN.findall(text.lower())
+        total = 0.0
+        negate = 0
+        boost = 1.0
+        exclaims = 0
+        for token in tokens:
+            if token == "!":
+                exclaims += 1
+                continue
+            if token in NEGATIONS:
+                negate = 3
+                continue
+            if token in INTENSIFIERS:
+                boost = INTENSIFIERS[token]
+                continue
+            weight = LEXICON.get(token)
+            if weight:
+                total += weight * boost * (-0.7 if negate else 1.0)
+            boost = 1.0
+            negate = max(negate - 1, 0)
+
+        if total and exclaims:
+            total *= 1.0 + 0.2 * min(exclaims, 3)
+        if total and sum(1 for c in text if c.isupper()) > 0.6 * max(sum(1 for c in text if c.isalpha()), 1):
+            total *= 1.3  # shouting
+        return math.tanh(total)
+
+
+def label_for(score: float) -> str:
+    if score <= -0.6:
+        return "angry"
+    if score < -0.2:
+        return "negative"
+    if score > 0.3:
+        return "positive"
+    return "neutral"
+
+
+class SentimentTrajectory:
+    """Rolling sentiment for one call"""
+    __slots__ = ("scores", "ewma", "negative_streak", "escalate")
+
+    def __init__(self, window: int):
+        self.scores: Deque[float] = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+        self.negative_streak = 0
+        self.escalate = False
+
+
+class SentimentService:
+    """
+    Scores each finalized user utterance and tracks a per-call trajectory.
+
+    The lexicon model runs inline and costs microseconds. When an LLM service
+    is supplied, utterances from all concurrent calls are also micro-batched
+    into a single classification request in the background; its scores refine
+    the trajectory for the following turns without adding turn latency.
+    """
+
+    def __init__(
+        self,
+        llm_service=None,
+        use_llm: bool = False,
+        alpha: float = 0.5,
+        escalation_threshold: float = -0.45,
+        negative_streak_limit: int = 3,
+        window: int = 10,
+        batch_max: int = 32,
+        batch_wait_ms: float = 50
+    ):
+        self.model = LexiconSentimentModel()
+        self.llm_service = llm_service
+        self.use_llm = llm_service is not None and use_llm
+        self.alpha = alpha
+        self.escalation_threshold = escalation_threshold
+        self.negative_streak_limit = negative_streak_limit
+        self.window = window
+        self.trajectories: Dict[str, SentimentTrajectory] = {}
+        # The event loop only holds weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.batcher = MicroBatcher(
+            llm_service.score_sentiment_batch,
+            max_batch=batch_max,
+            max_wait=batch_wait_ms / 1000,
+            name="sentiment"
+        ) if self.use_llm else None
+
+    def observe(self, call_id: str, text: str) -> Dict[str, Any]:
+        """
+        Score a finalized utterance and update the call's trajectory
+        """
+        score = self.model.score(text)
+        trajectory = self._update(call_id, score)
+        if self.batcher:
+            task = asyncio.get_running_loop().create_task(self._refine_with_llm(call_id, text))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return {
+            "score": round(score, 3),
+            "label": ESCALATION_LABEL if trajectory.escalate else label_for(score),
+            "trajectory": round(trajectory.ewma, 3),
+            "escalate": trajectory.escalate
+        }
+
+    def _update(self, call_id: str, score: float) -> SentimentTrajectory:
+        trajectory = self.trajectories.get(call_id)
+        if trajectory is None:
+            trajectory = self.trajectories[call_id] = SentimentTrajectory(self.window)
+        trajectory.scores.append(score)
+        if trajectory.ewma is None:
+            trajectory.ewma = score
+        else:
+            trajectory.ewma += self.alpha * (score - trajectory.ewma)
+        trajectory.negative_streak = trajectory.negative_streak + 1 if score < -0.2 else 0
+        trajectory.escalate = trajectory.escalate or (
+            trajectory.ewma <= self.escalation_threshold
+            or trajectory.negative_streak >= self.negative_streak_limit
+        )
+        return trajectory
+
+    def get_trajectory(self, call_id: str) -> List[float]:
+        trajectory = self.trajectories.get(call_id)
+        return list(trajectory.scores) if trajectory else []
+
+    def forget(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Drop a finished call's trajectory, returning its final summary
+        """
+        trajectory = self.trajectories.pop(call_id, None)
+        if trajectory is None or trajectory.ewma is None:
+            return None
+        return {
+            "final": round(trajectory.ewma, 3),
+            "min": round(min(trajectory.scores), 3),
+            "escalated": trajectory.escalate
+        }
+
+    # LLM refinement, micro-batched across calls
+
+    async def _refine_with_llm(self, call_id: str, text: str):
+        try:
+            score = await self.batcher.submit(text)
+        except Exception as e:
+            print(f"LLM sentiment scoring failed: {e}")
+            return
+        if score is not None:
+            self._refine(call_id, score)
+
+    def _refine(self, call_id: str, score: float):
+        """
+        Pull the trajectory toward the LLM's score for an utterance already counted
+        """
+        trajectory = self.trajectories.get(call_id)
+        if trajectory is None or trajectory.ewma is None:
+            return
+        trajectory.ewma += self.alpha * (score - trajectory.ewma)
+        trajectory.escalate = trajectory.escalate or trajectory.ewma <= self.escalation_threshold
@@ -0,0 +1,371 @@
+"""
+Per-tenant configuration: prompts, FAQ indexes, voices and cache partitions
+
+Tenants live under TENANTS_DIR, one directory each:
+
+    tenants/<tenant_id>/
+        tenant.json          {"name", "voice_id", "prompt_prefix", "business_hours"}
+        system_prompt.txt    optional; replaces the global prompts/system_prompt.txt
+        faqs.json            optional; [{"question", "answer", "category"}, ...]
+
+Tenants without a directory use the "default" configuration.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TENANT = "default"
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "can", "do", "does", "for", "how", "i", "if", "in", "is", "it",
+    "me", "my", "of", "on", "or", "the", "to", "what", "when", "where", "you", "your"
+})
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def normalize_question(text: str) -> str:
+    """
+    Dedup key for FAQs: case, punctuation and spacing don't make a new question
+    """
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def faq_id(question: str) -> str:
+    """
+    Stable id derived from the normalized question
+    """
+    return "faq_" + hashlib.blake2b(normalize_question(question).encode("utf-8"), digest_size=6).hexdigest()
+
+
+def dedupe_faqs(faqs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    One FAQ per normalized question; a later duplicate replaces the earlier one in place
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for faq in faqs:
+        if faq.get("id") is None:
+            # Listings page by id
+            faq = {**faq, "id": faq_id(faq.get("question", ""))}
+        unique[normalize_question(faq.get("question", ""))] = faq
+    return list(unique.values())
+
+
+class FAQIndex:
+    """
+    Immutable keyword index over one tenant's FAQs.
+
+    Questions weigh more than answers; scores are summed IDF weights of the
+    matched terms. Rebuilds produce a new index that is swapped in whole.
+    """
+
+    def __init__(self, faqs: List[Dict[str, Any]]):
+        self.faqs = faqs
+        postings: Dict[str, Dict[int, float]] = {}
+        for i, faq in enumerate(faqs):
+            for weight, field in ((2.0, "question"), (1.0, "answer")):
+                for term in set(_terms(faq.get(field, ""))):
+                    docs = postings.setdefault(term, {})
+                    docs[i] = max(docs.get(i, 0.0), weight)
+        n = max(len(faqs), 1)
+        self.postings = {
+            term: [(doc, weight * math.log(1 + n / len(docs))) for doc, weight in docs.items()]
+            for term, docs in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.faqs)
+
+    @property
+    def etag(self) -> str:
+        """
+        Content hash of the indexed FAQs, computed once per index
+        """
+        etag = self.__dict__.get("_etag")
+        if etag is None:
+            digest = hashlib.blake2b(digest_size=12)
+            for faq in self.faqs:
+                for field in ("id", "question", "answer", "category"):
+                    digest.update(str(faq.get(field, "")).encode("utf-8"))
+                    digest.update(b"\x1f")
+            etag = self.__dict__["_etag"] = digest.hexdigest()
+        return etag
+
+    def search(self, query: str, limit: int = 5, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        scores: Dict[int, float] = {}
+        for term in set(_terms(query)):
+            for doc, weight in self.postings.get(term, ()):
+                scores[doc] = scores.get(doc, 0.0) + weight
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for doc, score in ranked:
+            faq = self.faqs[doc]
+            if category and faq.get("category") != category:
+                continue
+            results.append({**faq, "score": round(score, 4)})
+            if len(results) >= limit:
+                break
+        return results
+
+
+class CachePartition:
+    """One tenant's LRU slice of the shared cache"""
+
+    def __init__(self, owner: "PartitionedCache", tenant_id: str):
+        self.owner = owner
+        self.tenant_id = tenant_id
+        self.entries: "OrderedDict[Any, Tuple[Any, int]]" = OrderedDict()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Any) -> Any:
+        with self.owner._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Any, value: Any, size: Optional[int] = None):
+        self.owner.put(self, key, value, len(value) if size is None else size)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes_used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class PartitionedCache:
+    """
+    A memory budget shared by per-tenant partitions.
+
+    Tenants may use idle capacity, but when the budget is exceeded entries
+    are evicted from the largest partition first, so every tenant converges
+    to an equal (max-min fair) share and a busy tenant cannot evict a quiet
+    tenant's working set.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.partitions: Dict[str, CachePartition] = {}
+        self._lock = threading.Lock()
+
+    def partition(self, tenant_id: str) -> CachePartition:
+        with self._lock:
+            part = self.partitions.get(tenant_id)
+            if part is None:
+                part = self.partitions[tenant_id] = CachePartition(self, tenant_id)
+            return part
+
+    def fair_share(self) -> int:
+        return self.max_bytes // max(len(self.partitions), 1)
+
+    def put(self, part: CachePartition, key: Any, value: Any, size: int):
+        with self._lock:
+            if size > self.fair_share():
+                return
+            old = part.entries.pop(key, None)
+            if old is not None:
+                part.bytes_used -= old[1]
+                self.bytes_used -= old[1]
+            part.entries[key] = (value, size)
+            part.bytes_used += size
+            self.bytes_used += size
+            while self.bytes_used > self.max_bytes:
+                victim = max(self.partitions.values(), key=lambda p: p.bytes_used)
+                _, (_, evicted) = victim.entries.popitem(last=False)
+                victim.bytes_used -= evicted
+                victim.evictions += 1
+                self.bytes_used -= evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_bytes": self.max_bytes,
+            "bytes": self.bytes_used,
+            "fair_share": self.fair_share(),
+            "partitions": {t: p.get_stats() for t, p in self.partitions.items()}
+        }
+
+
+class TenantConfig:
+    """Everything resolved for one tenant, compiled once at load"""
+    __slots__ = ("tenant_id", "name", "system_prompt", "voice_id", "business_hours", "faq_index", "cache")
+
+    def __init__(
+        self,
+        tenant_id: str,
+        name: str,
+        system_prompt: str,
+        voice_id: Optional[str],
+        business_hours: Optional[str],
+        faq_index: FAQIndex,
+        cache: CachePartition
+    ):
+        self.tenant_id = tenant_id
+        self.name = name
+        self.system_prompt = system_prompt
+        self.voice_id = voice_id
+        self.business_hours = business_hours
+        self.faq_index = faq_index
+        self.cache = cache
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "tenant_id": self.tenant_id,
+            "name": self.name,
+            "voice_id": self.voice_id,
+            "faqs": len(self.faq_index),
+            "cache": self.cache.get_stats()
+        }
+
+
+class TenantRegistry:
+    """
+    Tenant configs keyed by id; resolving a call's tenant is one dict lookup.
+
+    Loading builds the new config completely before publishing it with a
+    single reference swap, so existing tenants never wait on a load.
+    """
+
+    def __init__(
+        self,
+        tenants_dir: Optional[str] = None,
+        prompts_dir: Optional[str] = None,
+        database=None,
+        worker_pool=None,
+        pool_min_faqs: int = 2000,
+        cache_mb: float = 256
+    ):
+        root = Path(__file__).resolve().parents[2]
+        self.tenants_dir = Path(tenants_dir or root / "tenants")
+        self.prompts_dir = Path(prompts_dir or root / "prompts")
+        self.database = database
+        # Large FAQ sets are indexed in the CPU pool at background priority
+        self.worker_pool = worker_pool
+        self.pool_min_faqs = pool_min_faqs
+        self.cache = PartitionedCache(int(cache_mb * 1024 * 1024))
+        self._load_lock = threading.Lock()
+        self._tenants: Dict[str, TenantConfig] = {}
+        self.default = self.load(DEFAULT_TENANT)
+
+    def get(self, tenant_id: Optional[str]) -> TenantConfig:
+        return self._tenants.get(tenant_id, self.default)
+
+    def tenants(self) -> List[str]:
+        return list(self._tenants)
+
+    def load_all(self) -> List[str]:
+        """
+        Load every tenant directory (run off the event loop)
+        """
+        if self.tenants_dir.is_dir():
+            for path in sorted(self.tenants_dir.iterdir()):
+                if (path / "tenant.json").exists():
+                    self.load(path.name)
+        return self.tenants()
+
+    def load(self, tenant_id: str) -> TenantConfig:
+        """
+        Build (or rebuild) one tenant's config and publish it atomically
+        """
+        directory = self.tenants_dir / tenant_id
+        settings: Dict[str, Any] = {}
+        if (directory / "tenant.json").exists():
+            with open(directory / "tenant.json", "r", encoding="utf-8") as f:
+                settings = json.load(f)
+        elif tenant_id != DEFAULT_TENANT:
+            raise FileNotFoundError(f"No tenant.json for tenant {tenant_id}")
+
+        return self._publish(TenantConfig(
+            tenant_id=tenant_id,
+            name=settings.get("name", tenant_id),
+            system_prompt=self._compile_prompt(directory, settings),
+            voice_id=settings.get("voice_id"),
+            business_hours=settings.get("business_hours"),
+            faq_index=self._build_faq_index(self._load_faqs(directory, tenant_id)),
+            cache=self.cache.partition(tenant_id)
+        ))
+
+    def reload_faqs(self, tenant_id: str) -> TenantConfig:
+        """
+        Rebuild only a tenant's FAQ index (e.g. after an import) and publish it atomically
+        """
+        current = self._tenants.get(tenant_id)
+        if current is None:
+            return self.load(tenant_id)
+        index = self._build_faq_index(self._load_faqs(self.tenants_dir / tenant_id, tenant_id))
+        return self._publish(TenantConfig(
+            tenant_id=tenant_id,
+            name=current.name,
+            system_prompt=current.system_prompt,
+            voice_id=current.voice_id,
+            business_hours=current.business_hours,
+            faq_index=index,
+            cache=current.cache
+        ))
+
+    def _publish(self, config: TenantConfig) -> TenantConfig:
+        with self._load_lock:
+            # Copy-on-write: readers always see a complete mapping
+            self._tenants = {**self._tenants, config.tenant_id: config}
+            if config.tenant_id == DEFAULT_TENANT:
+                self.default = config
+        return config
+
+    def _build_faq_index(self, faqs: List[Dict[str, Any]]) -> FAQIndex:
+        if self.worker_pool is not None and len(faqs) >= self.pool_min_faqs:
+            return self.worker_pool.submit("faq_index", faqs).result()
+        return FAQIndex(faqs)
+
+    def _compile_prompt(self, directory: Path, settings: Dict[str, Any]) -> str:
+        for path in (directory / "system_prompt.txt", self.prompts_dir / "system_prompt.txt"):
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    prompt = f.read().strip()
+                break
+        else:
+            prompt = ""
+        prefix = []
+        if settings.get("name"):
+            prefix.append(f"You are answering calls for {settings['name']}.")
+        if settings.get("business_hours"):
+            prefix.append(f"Business hours: {settings['business_hours']}.")
+        if settings.get("prompt_prefix"):
+            prefix.append(settings["prompt_prefix"])
+        return "\n".join(prefix + [prompt]) if prefix else prompt
+
+    def _load_faqs(self, directory: Path, tenant_id: str) -> List[Dict[str, Any]]:
+        faqs: List[Dict[str, Any]] = []
+        if (directory / "faqs.json").exists():
+            with open(directory / "faqs.json", "r", encoding="utf-8") as f:
+                faqs.extend(json.load(f))
+        if self.database is not None:
+            # Embeddings stay in the database; the keyword index doesn't use them
+            faqs.extend(
+                {k: v for k, v in faq.items() if k != "embedding"} for faq in self.database.get_faqs(tenant_id)
+            )
+        # Stored (e.g. imported) FAQs override file ones with the same question
+        return dedupe_faqs(faqs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tenants": {t: c.summary() for t, c in self._tenants.items()},
+            "cache": self.cache.get_stats()
+        }
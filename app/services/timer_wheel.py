@@ -0,0 +1,153 @@
+"""
+Hierarchical timer wheel for per-call timeouts
+
+Timers are bucketed by expiry tick into levels of `slots` buckets; level n
+covers slots**(n+1) ticks. Scheduling, cancelling and extending a timer are
+O(1), and each tick only visits one level-0 bucket, plus a higher-level
+bucket every time a lower level wraps. Timers in a higher-level bucket are
+moved down when their bucket comes around.
+
+Extending is lazy: it only moves the deadline forward, and the timer stays
+in its old bucket. When that bucket fires, a timer whose deadline has moved
+is re-filed instead of expiring. A timer touched on every audio frame
+therefore costs one integer store per frame, and it is re-filed at most
+once per timeout period.
+"""
+import time
+from typing import Any, Callable, List, Optional, Set
+
+
+class Timer:
+    """A scheduled callback; create with TimerWheel.schedule()"""
+    __slots__ = ("wheel", "deadline", "callback", "args", "bucket")
+
+    def __init__(self, wheel: "TimerWheel", deadline: int, callback: Callable, args: tuple):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.bucket: Optional[Set["Timer"]] = None
+
+    @property
+    def active(self) -> bool:
+        return self.bucket is not None
+
+    def extend(self, delay_ticks: int):
+        """
+        Push the deadline to delay_ticks from now (never earlier than it is)
+        """
+        deadline = self.wheel.current + delay_ticks
+        if deadline > self.deadline:
+            self.deadline = deadline
+
+    def cancel(self):
+        if self.bucket is not None:
+            self.bucket.discard(self)
+            self.bucket = None
+            self.wheel.count -= 1
+
+
+class TimerWheel:
+    """
+    Timer wheel driven by advance(); not thread-safe, so use it from one
+    thread (the event loop). Delays are rounded up to whole ticks and capped
+    at the wheel's range (tick * slots**levels).
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 64, levels: int = 4, now: Optional[float] = None):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self.slots = slots
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.max_ticks = slots ** levels - 1
+        self.levels: List[List[Set[Timer]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.current = int((time.monotonic() if now is None else now) / tick)
+        self.count = 0
+        self.fired = 0
+        self.refiled = 0
+
+    def ticks(self, seconds: float) -> int:
+        return min(max(1, -int(-seconds // self.tick)), self.max_ticks)
+
+    def schedule(self, delay: float, callback: Callable, *args: Any) -> Timer:
+        """
+        Run callback(*args) from advance() once delay seconds have passed
+        """
+        timer = Timer(self, self.current + self.ticks(delay), callback, args)
+        self._file(timer)
+        self.count += 1
+        return timer
+
+    def _file(self, timer: Timer):
+        # Cascading runs before the current tick's bucket expires, so a deadline
+        # equal to the current tick still fires on time
+        deadline = max(timer.deadline, self.current)
+        delta = deadline - self.current
+        level = 0
+        span = self.slots
+        while delta >= span and level < len(self.levels) - 1:
+            level += 1
+            span <<= self.bits
+        bucket = self.levels[level][(deadline >> (self.bits * level)) & self.mask]
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """
+        Move the wheel to `now`, running every callback that came due.
+        Returns how many timers fired.
+        """
+        target = int((time.monotonic() if now is None else now) / self.tick)
+        fired = 0
+        while self.current < target:
+            if not self.count:
+                self.current = target
+                break
+            self.current += 1
+            tick = self.current
+            # Bring down higher-level buckets whose range starts at this tick, outermost first
+            level = 0
+            while level + 1 < len(self.levels) and not (tick >> (self.bits * level)) & self.mask:
+                level += 1
+            for n in range(level, 0, -1):
+                self._cascade(n, (tick >> (self.bits * n)) & self.mask)
+            fired += self._expire(self.levels[0][tick & self.mask])
+        self.fired += fired
+        return fired
+
+    def _cascade(self, level: int, index: int):
+        bucket = self.levels[level][index]
+        if not bucket:
+            return
+        self.levels[level][index] = set()
+        for timer in bucket:
+            self._file(timer)
+
+    def _expire(self, bucket: Set[Timer]) -> int:
+        if not bucket:
+            return 0
+        due = []
+        for timer in list(bucket):
+            if timer.deadline > self.current:
+                # Extended since it was filed
+                bucket.discard(timer)
+                self._file(timer)
+                self.refiled += 1
+            else:
+                due.append(timer)
+        fired = 0
+        for timer in due:
+            if timer.bucket is not bucket:
+                # Cancelled by an earlier callback
+                continue
+            bucket.discard(timer)
+            timer.bucket = None
+            self.count -= 1
+            fired += 1
+            timer.callback(*timer.args)
+        return fired
+
+    def get_stats(self):
+        return {"tick_ms": self.tick * 1000, "scheduled": self.count, "fired": self.fired, "refiled": self.refiled}
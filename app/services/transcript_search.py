@@ -0,0 +1,442 @@
+"""
+Incremental full-text search over call transcripts
+"""
+import heapq
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+# Phrase matching packs (doc, position) into one int64
+_POSITION_BITS = 24
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class Postings(NamedTuple):
+    """Documents containing a term, with positions in CSR layout"""
+    docs: np.ndarray       # local doc ids, ascending
+    offsets: np.ndarray    # positions of docs[i] are positions[offsets[i]:offsets[i + 1]]
+    positions: np.ndarray
+
+
+class SearchHit(NamedTuple):
+    score: float
+    doc_id: int
+    call_id: str
+    speaker: str
+    intent: Optional[str]
+    timestamp: datetime
+    message: str
+
+
+class _Memtable:
+    """Mutable in-memory segment that receives new turns"""
+
+    def __init__(self, base: int):
+        self.base = base
+        self.terms: Dict[str, List[int]] = {}
+        self.positions: Dict[str, List[List[int]]] = {}
+        self.call_ids: List[str] = []
+        self.speakers: List[int] = []
+        self.intents: List[int] = []
+        self.timestamps: List[float] = []
+        self.lengths: List[int] = []
+        self.messages: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.call_ids)
+
+    def add(self, call_id: str, speaker: int, intent: int, timestamp: float, message: str):
+        doc = len(self.call_ids)
+        tokens = tokenize(message)
+        for pos, term in enumerate(tokens):
+            docs = self.terms.get(term)
+            if docs is None:
+                self.terms[term] = [doc]
+                self.positions[term] = [[pos]]
+            elif docs[-1] != doc:
+                docs.append(doc)
+                self.positions[term].append([pos])
+            else:
+                self.positions[term][-1].append(pos)
+        self.call_ids.append(call_id)
+        self.speakers.append(speaker)
+        self.intents.append(intent)
+        self.timestamps.append(timestamp)
+        self.lengths.append(len(tokens))
+        self.messages.append(message)
+
+
+class Segment:
+    """Immutable, array-backed slice of the index covering doc ids [base, base + len)"""
+
+    def __init__(
+        self,
+        base: int,
+        postings: Dict[str, Postings],
+        call_ids: List[str],
+        speakers: np.ndarray,
+        intents: np.ndarray,
+        timestamps: np.ndarray,
+        lengths: np.ndarray,
+        messages: List[str]
+    ):
+        self.base = base
+        self.postings = postings
+        self.call_ids = call_ids
+        self.speakers = speakers
+        self.intents = intents
+        self.timestamps = timestamps
+        self.lengths = lengths
+        self.messages = messages
+        self.level = 0
+
+    def __len__(self) -> int:
+        return len(self.call_ids)
+
+    @classmethod
+    def from_memtable(cls, mem: _Memtable) -> "Segment":
+        postings = {}
+        for term, docs in mem.terms.items():
+            plist = mem.positions[term]
+            offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+            np.cumsum([len(p) for p in plist], out=offsets[1:])
+            postings[term] = Postings(
+                np.array(docs, dtype=np.int32),
+                offsets,
+                np.fromiter((p for ps in plist for p in ps), dtype=np.int32, count=int(offsets[-1]))
+            )
+        return cls(
+            mem.base,
+            postings,
+            list(mem.call_ids),
+            np.array(mem.speakers, dtype=np.int16),
+            np.array(mem.intents, dtype=np.int16),
+            np.array(mem.timestamps, dtype=np.float64),
+            np.array(mem.lengths, dtype=np.int32),
+            list(mem.messages)
+        )
+
+    @classmethod
+    def merge(cls, segments: List["Segment"]) -> "Segment":
+        """
+        Merge adjacent segments (ascending, contiguous doc ranges) into one
+        """
+        base = segments[0].base
+        terms = set().union(*(s.postings for s in segments))
+        postings = {}
+        for term in terms:
+            parts = [(s, s.postings[term]) for s in segments if term in s.postings]
+            docs = np.concatenate([p.docs + (s.base - base) for s, p in parts])
+            positions = np.concatenate([p.positions for _, p in parts])
+            offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+            np.cumsum(np.concatenate([np.diff(p.offsets) for _, p in parts]), out=offsets[1:])
+            postings[term] = Postings(docs.astype(np.int32), offsets, positions)
+        merged = cls(
+            base,
+            postings,
+            [c for s in segments for c in s.call_ids],
+            np.concatenate([s.speakers for s in segments]),
+            np.concatenate([s.intents for s in segments]),
+            np.concatenate([s.timestamps for s in segments]),
+            np.concatenate([s.lengths for s in segments]),
+            [m for s in segments for m in s.messages]
+        )
+        merged.level = segments[0].level + 1
+        return merged
+
+
+class TranscriptIndex:
+    """
+    Full-text index over conversation turns, built for cheap ingestion.
+
+    New turns go into an in-memory memtable (a few dict appends per token).
+    Full memtables are frozen and converted into immutable NumPy segments on
+    a background thread, which also merges every `merge_factor` segments of
+    the same level into one, so the number of segments a query visits stays
+    logarithmic in the number of turns. Queries read an atomic snapshot of
+    the segment list and never block ingestion.
+
+    Queries AND together bare terms and "quoted phrases", can filter by
+    speaker, intent and time range, and return the top-k turns by BM25.
+    """
+
+    def __init__(self, flush_docs: int = 20000, merge_factor: int = 8):
+        self.flush_docs = flush_docs
+        self.merge_factor = merge_factor
+        self._codes: Dict[str, int] = {"": 0}
+        self._names: List[str] = [""]
+        self._lock = threading.Lock()
+        self._memtable = _Memtable(0)
+        self._frozen: Tuple[_Memtable, ...] = ()
+        self._segments: Tuple[Segment, ...] = ()
+        self._total_length = 0
+        self._merger = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcript-merge")
+        self.merges = 0
+
+    def _code(self, value: Optional[str]) -> int:
+        code = self._codes.get(value or "")
+        if code is None:
+            with self._lock:
+                code = self._codes.setdefault(value, len(self._names))
+                if code == len(self._names):
+                    self._names.append(value)
+        return code
+
+    # Ingestion
+
+    def add(
+        self,
+        call_id: str,
+        speaker: str,
+        message: str,
+        intent: Optional[str] = None,
+        timestamp: Optional[datetime] = None
+    ) -> int:
+        """
+        Index one turn; returns its doc id
+        """
+        mem = self._memtable
+        mem.add(call_id, self._code(speaker), self._code(intent), (timestamp or datetime.now()).timestamp(), message)
+        self._total_length += mem.lengths[-1]
+        if len(mem) >= self.flush_docs:
+            self._freeze()
+        return mem.base + len(mem) - 1
+
+    def add_many(self, conversations: Iterable[Dict[str, Any]]) -> int:
+        """
+        Bulk-index stored conversation dicts (call_id, speaker, message, intent, timestamp)
+        """
+        count = 0
+        for c in conversations:
+            self.add(c["call_id"], c.get("speaker", ""), c.get("message", ""), c.get("intent"), c.get("timestamp"))
+            count += 1
+        return count
+
+    def _freeze(self):
+        with self._lock:
+            mem = self._memtable
+            self._memtable = _Memtable(mem.base + len(mem))
+            self._frozen = self._frozen + (mem,)
+        self._merger.submit(self._build_segment, mem)
+
+    def _build_segment(self, mem: _Memtable):
+        try:
+            segment = Segment.from_memtable(mem)
+            with self._lock:
+                self._segments = self._segments + (segment,)
+                self._frozen = tuple(m for m in self._frozen if m is not mem)
+            self._maybe_merge()
+        except Exception as e:
+            print(f"Transcript segment build failed: {e}")
+
+    def _maybe_merge(self):
+        # Tiered: merge the newest run of merge_factor segments at the same level
+        while True:
+            segments = self._segments
+            tail = segments[-self.merge_factor:]
+            if len(tail) < self.merge_factor or len({s.level for s in tail}) != 1:
+                return
+            merged = Segment.merge(list(tail))
+            with self._lock:
+                # Only this thread replaces segments, so the tail is unchanged
+                self._segments = self._segments[:-self.merge_factor] + (merged,)
+            self.merges += 1
+
+    def flush(self):
+        """
+        Freeze the memtable and wait for all pending segment builds and merges
+        """
+        if len(self._memtable):
+            self._freeze()
+        self._merger.submit(lambda: None).result()
+
+    # Query
+
+    @staticmethod
+    def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+        """
+        Split a query into bare terms and quoted phrases
+        """
+        terms: List[str] = []
+        phrases: List[List[str]] = []
+        for phrase, word in _QUERY.findall(query):
+            tokens = tokenize(phrase or word)
+            if phrase and len(tokens) > 1:
+                phrases.append(tokens)
+            terms.extend(tokens)
+        return terms, phrases
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        speaker: Optional[str] = None,
+        intent: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        call_id: Optional[str] = None
+    ) -> List[SearchHit]:
+        """
+        Top turns matching every term and phrase in the query, best first
+        """
+        terms, phrases = self.parse_query(query)
+        if not terms:
+            return []
+        unique_terms = list(dict.fromkeys(terms))
+
+        with self._lock:
+            parts = list(self._segments) + list(self._frozen) + [self._memtable]
+
+        # Corpus statistics for BM25 are global, not per segment
+        total_docs = sum(len(p) for p in parts)
+        if not total_docs:
+            return []
+        avg_len = max(self._total_length / total_docs, 1.0)
+        postings = [{t: self._postings(p, t) for t in unique_terms} for p in parts]
+        df = {t: sum(len(ps[t].docs) for ps in postings if ps[t] is not None) for t in unique_terms}
+        idf = {t: math.log(1 + (total_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in unique_terms}
+
+        speaker_code = self._codes.get(speaker) if speaker else None
+        intent_code = self._codes.get(intent) if intent else None
+        if (speaker and speaker_code is None) or (intent and intent_code is None):
+            return []
+        filters = (speaker_code, intent_code, since.timestamp() if since else None,
+                   until.timestamp() if until else None, call_id)
+
+        best: List[Tuple[float, int, Any, int]] = []
+        for part, term_postings in zip(parts, postings):
+            if any(term_postings[t] is None for t in unique_terms):
+                continue
+            for score, local in self._search_part(part, unique_terms, phrases, term_postings, idf, avg_len, filters, limit):
+                entry = (score, -(part.base + local), part, local)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+
+        return [self._hit(score, part, local) for score, _, part, local in sorted(best, reverse=True)]
+
+    def _postings(self, part, term: str) -> Optional[Postings]:
+        if isinstance(part, Segment):
+            return part.postings.get(term)
+        docs = part.terms.get(term)
+        if docs is None:
+            return None
+        # The live memtable may grow while we read; slice a consistent prefix
+        n = len(docs)
+        plist = part.positions[term][:n]
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in plist], out=offsets[1:])
+        return Postings(
+            np.array(docs[:n], dtype=np.int32),
+            offsets,
+            np.fromiter((p for ps in plist for p in ps), dtype=np.int32, count=int(offsets[-1]))
+        )
+
+    def _column(self, part, name: str, dtype) -> np.ndarray:
+        value = getattr(part, name)
+        return value if isinstance(value, np.ndarray) else np.asarray(value, dtype=dtype)
+
+    def _search_part(self, part, terms, phrases, term_postings, idf, avg_len, filters, limit):
+        # Intersect from the rarest term up
+        ordered = sorted(terms, key=lambda t: len(term_postings[t].docs))
+        candidates = term_postings[ordered[0]].docs
+        for t in ordered[1:]:
+            candidates = np.intersect1d(candidates, term_postings[t].docs, assume_unique=True)
+            if not candidates.size:
+                return []
+
+        speaker_code, intent_code, since_ts, until_ts, call_id = filters
+        if speaker_code is not None or intent_code is not None or since_ts or until_ts:
+            mask = np.ones(candidates.size, dtype=bool)
+            if speaker_code is not None:
+                mask &= self._column(part, "speakers", np.int16)[candidates] == speaker_code
+            if intent_code is not None:
+                mask &= self._column(part, "intents", np.int16)[candidates] == intent_code
+            if since_ts or until_ts:
+                ts = self._column(part, "timestamps", np.float64)[candidates]
+                if since_ts:
+                    mask &= ts >= since_ts
+                if until_ts:
+                    mask &= ts < until_ts
+            candidates = candidates[mask]
+        if call_id is not None:
+            candidates = np.array([d for d in candidates if part.call_ids[d] == call_id], dtype=np.int32)
+        if not candidates.size:
+            return []
+
+        for phrase in phrases:
+            candidates = self._match_phrase(candidates, phrase, term_postings)
+            if not candidates.size:
+                return []
+
+        lengths = self._column(part, "lengths", np.int32)[candidates]
+        norm = K1 * (1 - B + B * lengths / avg_len)
+        scores = np.zeros(candidates.size, dtype=np.float64)
+        for t in terms:
+            p = term_postings[t]
+            idx = np.searchsorted(p.docs, candidates)
+            tf = (p.offsets[idx + 1] - p.offsets[idx]).astype(np.float64)
+            scores += idf[t] * tf * (K1 + 1) / (tf + norm)
+
+        if scores.size > limit:
+            # Keep every doc tied with the cutoff: the caller breaks ties by doc id
+            kth = np.partition(scores, scores.size - limit)[scores.size - limit]
+            top = np.flatnonzero(scores >= kth)
+        else:
+            top = np.arange(scores.size)
+        return [(float(scores[i]), int(candidates[i])) for i in top]
+
+    @staticmethod
+    def _match_phrase(candidates: np.ndarray, phrase: List[str], term_postings) -> np.ndarray:
+        # Encode each occurrence as (doc, position - offset in phrase) in one int64 and
+        # intersect across the phrase's terms; survivors are phrase starts
+        keys = None
+        for k, t in enumerate(phrase):
+            p = term_postings[t]
+            idx = np.searchsorted(p.docs, candidates)
+            starts = p.offsets[idx]
+            counts = p.offsets[idx + 1] - starts
+            gather = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+            term_keys = (np.repeat(candidates.astype(np.int64), counts) << _POSITION_BITS) + (p.positions[gather] - k)
+            keys = np.unique(term_keys) if keys is None else np.intersect1d(keys, term_keys)
+            if not keys.size:
+                break
+        return np.unique(keys >> _POSITION_BITS).astype(np.int32)
+
+    def _hit(self, score: float, part, local: int) -> SearchHit:
+        intent = self._names[int(part.intents[local])]
+        return SearchHit(
+            score=round(score, 4),
+            doc_id=part.base + local,
+            call_id=part.call_ids[local],
+            speaker=self._names[int(part.speakers[local])],
+            intent=intent or None,
+            timestamp=datetime.fromtimestamp(float(part.timestamps[local])),
+            message=part.messages[local]
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        segments = self._segments
+        return {
+            "documents": self._memtable.base + len(self._memtable),
+            "segments": [len(s) for s in segments],
+            "pending_segments": len(self._frozen),
+            "memtable": len(self._memtable),
+            "merges": self.merges
+        }
@@ -0,0 +1,366 @@
+"""
+Process pool for CPU-bound work, kept off the event loop and out of the GIL
+
+Task types are registered once with a priority and a queue bound. Each type
+waits in its own queue in this process; a task is handed to a worker only
+when one is free, so the next free worker always takes the most urgent
+queued task. Some workers are held back from non-live work, so a live-call
+task never waits behind background indexing. A pool too small to hold any
+worker back runs non-live work in a separate one-process executor instead.
+
+Large buffers go through one shared-memory arena with a fixed slot per
+running task. The worker reads its input in place and writes a large result
+back into the same slot, so neither direction is pickled.
+"""
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+PRIORITY_LIVE = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+
+_ALIGN = 64
+
+
+class WorkerPoolFullError(RuntimeError):
+    """A task type's queue is at its bound"""
+
+
+class SharedSlice(NamedTuple):
+    name: str
+    offset: int
+    length: int
+
+
+# Worker side
+
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(name: str) -> memoryview:
+    shm = _attached.get(name)
+    if shm is None:
+        # Workers share the parent's resource tracker, which unlinks the segment once
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+    return shm.buf
+
+
+def _invoke(fn: Callable, data: Any, shared: Optional[SharedSlice], capacity: int, args: tuple):
+    if shared is None:
+        return fn(data, *args) if data is not None else fn(*args)
+    buf = _attach(shared.name)
+    view = buf[shared.offset:shared.offset + shared.length]
+    try:
+        result = fn(view, *args)
+    finally:
+        view.release()
+    if isinstance(result, (bytes, bytearray)):
+        start = -(-shared.length // _ALIGN) * _ALIGN
+        if start + len(result) <= capacity:
+            buf[shared.offset + start:shared.offset + start + len(result)] = result
+            return SharedSlice(shared.name, shared.offset + start, len(result))
+    return result
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# Parent side
+
+class SharedArena:
+    """Fixed-size shared-memory slots, one per running task"""
+
+    def __init__(self, slots: int, slot_bytes: int):
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(slots * slot_bytes, 1))
+        self._free: Deque[int] = deque(range(slots))
+
+    def acquire(self, data) -> Optional[SharedSlice]:
+        """
+        Copy data into a free slot; None if it does not fit or every slot is busy
+        """
+        size = memoryview(data).nbytes
+        if size > self.slot_bytes or not self._free:
+            return None
+        offset = self._free.popleft() * self.slot_bytes
+        self.shm.buf[offset:offset + size] = memoryview(data).cast("B")
+        return SharedSlice(self.shm.name, offset, size)
+
+    def read(self, shared: SharedSlice) -> bytes:
+        return bytes(self.shm.buf[shared.offset:shared.offset + shared.length])
+
+    def release(self, shared: SharedSlice):
+        self._free.append(shared.offset // self.slot_bytes)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class TaskType:
+    """A registered kind of task with its own queue and counters"""
+    __slots__ = (
+        "name", "fn", "priority", "max_queue", "queue",
+        "submitted", "completed", "failed", "rejected", "wait_s", "run_s"
+    )
+
+    def __init__(self, name: str, fn: Callable, priority: int, max_queue: int):
+        self.name = name
+        self.fn = fn
+        self.priority = priority
+        self.max_queue = max_queue
+        self.queue: Deque["_Pending"] = deque()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_s = 0.0
+        self.run_s = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        done = max(self.completed + self.failed, 1)
+        return {
+            "priority": self.priority,
+            "queued": len(self.queue),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_s / done * 1000, 3),
+            "avg_run_ms": round(self.run_s / done * 1000, 3)
+        }
+
+
+class _Pending:
+    __slots__ = ("task_type", "args", "data", "future", "seq", "enqueued", "started", "shared", "background")
+
+    def __init__(self, task_type: TaskType, args: tuple, data: Any, seq: int):
+        self.task_type = task_type
+        self.args = args
+        self.data = data
+        self.future: Future = Future()
+        self.seq = seq
+        self.enqueued = time.perf_counter()
+        self.started = 0.0
+        self.shared: Optional[SharedSlice] = None
+        self.background = False
+
+
+class WorkerPool:
+    """
+    Prioritized process pool shared by the voice and NLP services.
+
+    submit() is thread-safe and returns a concurrent Future; run() awaits the
+    same from the event loop. At most `workers` tasks are ever inside the
+    executor, so its own FIFO queue never decides ordering.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        live_reserve: int = 1,
+        shm_slot_bytes: int = 4 * 1024 * 1024,
+        shm_threshold: int = 64 * 1024,
+        start_method: str = "spawn"
+    ):
+        # 0 workers: one per core, leaving a core for the event loop
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.live_reserve = max(0, min(live_reserve, self.workers))
+        # Every worker is reserved (e.g. one worker on a 2-core host): non-live work gets its own process
+        self.background_workers = 1 if self.live_reserve == self.workers else 0
+        self.shm_threshold = shm_threshold
+        self.arena = SharedArena(self.workers + self.background_workers, shm_slot_bytes)
+        context = multiprocessing.get_context(start_method)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        self._background = (
+            ProcessPoolExecutor(max_workers=self.background_workers, mp_context=context)
+            if self.background_workers else None
+        )
+        self._types: Dict[str, TaskType] = {}
+        self._ordered: List[TaskType] = []
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._running = 0
+        self._running_nonlive = 0
+        self._running_background = 0
+        self._closed = False
+        self.shared_transfers = 0
+        self.pickled_transfers = 0
+
+    def register(self, name: str, fn: Callable, priority: int = PRIORITY_BACKGROUND, max_queue: int = 1000):
+        """
+        Add a task type; fn must be a module-level function importable by workers
+        """
+        with self._lock:
+            self._types[name] = TaskType(name, fn, priority, max_queue)
+            self._ordered = sorted(self._types.values(), key=lambda t: t.priority)
+
+    def warm(self, timeout: float = 30.0) -> List[int]:
+        """
+        Start every worker process now rather than on the first live task
+        """
+        futures = [self._executor.submit(_ping) for _ in range(self.workers)]
+        if self._background is not None:
+            futures.append(self._background.submit(_ping))
+        return [f.result(timeout) for f in futures]
+
+    def submit(self, name: str, *args, data: Any = None) -> Future:
+        """
+        Queue one task. data, if given, is passed to fn as its first argument
+        (through shared memory when large).
+        """
+        task_type = self._types[name]
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Worker pool is shut down")
+            if len(task_type.queue) >= task_type.max_queue:
+                task_type.rejected += 1
+                raise WorkerPoolFullError(f"{name} queue is full ({task_type.max_queue})")
+            pending = _Pending(task_type, args, data, next(self._seq))
+            task_type.queue.append(pending)
+            task_type.submitted += 1
+            dispatched = self._pump()
+        self._watch(dispatched)
+        return pending.future
+
+    async def run(self, name: str, *args, data: Any = None) -> Any:
+        return await asyncio.wrap_future(self.submit(name, *args, data=data))
+
+    def _next(self, nonlive_slots: int, live: bool = True) -> Optional[_Pending]:
+        best: Optional[TaskType] = None
+        for task_type in self._ordered:
+            if best is not None and task_type.priority > best.priority:
+                break
+            if not task_type.queue or (task_type.priority == PRIORITY_LIVE and not live):
+                continue
+            if task_type.priority > PRIORITY_LIVE and nonlive_slots <= 0:
+                break
+            # Same priority: oldest head first
+            if best is None or task_type.queue[0].seq < best.queue[0].seq:
+                best = task_type
+        return best.queue.popleft() if best else None
+
+    def _pump(self) -> List[tuple]:
+        """
+        Hand queued tasks to free workers; caller holds the lock.
+        Returns (pending, executor future or error) for _watch() to handle
+        once the lock is released.
+        """
+        dispatched = []
+        while self._running < self.workers:
+            pending = self._next(self.workers - self.live_reserve - self._running_nonlive)
+            if pending is None:
+                break
+            self._dispatch(pending, self._executor, dispatched)
+        while self._running_background < self.background_workers:
+            pending = self._next(self.background_workers - self._running_background, live=False)
+            if pending is None:
+                break
+            pending.background = True
+            self._dispatch(pending, self._background, dispatched)
+        return dispatched
+
+    def _dispatch(self, pending: _Pending, executor: ProcessPoolExecutor, dispatched: List[tuple]):
+        # Caller holds the lock
+        if not pending.future.set_running_or_notify_cancel():
+            return
+        task_type = pending.task_type
+        data = pending.data
+        if data is not None and memoryview(data).nbytes >= self.shm_threshold:
+            pending.shared = self.arena.acquire(data)
+            if pending.shared is not None:
+                data = None
+                self.shared_transfers += 1
+            else:
+                self.pickled_transfers += 1
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        pending.started = time.perf_counter()
+        task_type.wait_s += pending.started - pending.enqueued
+        if pending.background:
+            self._running_background += 1
+        else:
+            self._running += 1
+            if task_type.priority > PRIORITY_LIVE:
+                self._running_nonlive += 1
+        try:
+            future = executor.submit(
+                _invoke, task_type.fn, data, pending.shared, self.arena.slot_bytes, pending.args
+            )
+        except Exception as e:
+            self._release(pending, failed=True)
+            dispatched.append((pending, e))
+            return
+        dispatched.append((pending, future))
+
+    def _watch(self, dispatched: List[tuple]):
+        # Outside the lock: a finished future runs its callback immediately
+        for pending, future in dispatched:
+            if isinstance(future, Future):
+                future.add_done_callback(lambda f, p=pending: self._done(p, f))
+            else:
+                pending.future.set_exception(future)
+
+    def _done(self, pending: _Pending, future: Future):
+        error = future.exception()
+        result = None if error else future.result()
+        with self._lock:
+            if isinstance(result, SharedSlice):
+                result = self.arena.read(result)
+            self._release(pending, failed=error is not None)
+            dispatched = self._pump()
+        # Resolve outside the lock so callbacks may submit more work
+        if error is not None:
+            pending.future.set_exception(error)
+        else:
+            pending.future.set_result(result)
+        self._watch(dispatched)
+
+    def _release(self, pending: _Pending, failed: bool):
+        # Caller holds the lock
+        task_type = pending.task_type
+        if pending.shared is not None:
+            self.arena.release(pending.shared)
+        if pending.background:
+            self._running_background -= 1
+        else:
+            self._running -= 1
+            if task_type.priority > PRIORITY_LIVE:
+                self._running_nonlive -= 1
+        task_type.run_s += time.perf_counter() - pending.started
+        pending.data = None
+        if failed:
+            task_type.failed += 1
+        else:
+            task_type.completed += 1
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            for task_type in self._ordered:
+                while task_type.queue:
+                    task_type.queue.popleft().future.cancel()
+        self._executor.shutdown(wait=True)
+        if self._background is not None:
+            self._background.shutdown(wait=True)
+        self.arena.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "live_reserve": self.live_reserve,
+            "background_workers": self.background_workers,
+            "running": self._running + self._running_background,
+            "shared_transfers": self.shared_transfers,
+            "pickled_transfers": self.pickled_transfers,
+            "tasks": {t.name: t.get_stats() for t in self._ordered}
+        }
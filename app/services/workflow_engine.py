@@ -0,0 +1,258 @@
+"""
+Compiled call-flow engine for workflows/call_flow.json
+"""
+import asyncio
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional
+
+DEFAULT_WORKFLOW_PATH = Path(__file__).resolve().parents[2] / "workflows" / "call_flow.json"
+
+# Tool each routing action needs. The LLM answers these turns and is offered every
+# tool, so it makes the call itself with arguments from the conversation; the name
+# is reported on the turn (TurnPlan.tool) for clients and analytics
+ACTION_TOOLS: Dict[str, str] = {
+    "provide_hours": "get_business_hours",
+    "book_appointment": "book_appointment",
+    "provide_job_info": "get_job_openings",
+    "search_faqs": "search_faqs",
+    "transfer_to_human": "transfer_to_human",
+    "escalate_to_human": "transfer_to_human"
+}
+
+# Prompts for actions the workflow file routes to without defining text
+DEFAULT_PROMPTS: Dict[str, str] = {
+    "ask_clarification": "Sorry, I didn't quite catch that. Could you tell me a little more about what you need?",
+    "escalate_to_human": "I'm going to connect you with one of our team members who can help. Please hold for a moment.",
+    "transfer_to_human": "Of course. Let me transfer you to a member of our team now."
+}
+
+ANGRY_SENTIMENTS = frozenset({"angry", "frustrated", "upset"})
+
+
+class TurnPlan(NamedTuple):
+    """What to do for one caller turn; shared, immutable, built at compile time"""
+    action: str
+    tool: Optional[str] = None
+    prompt: Optional[str] = None
+    use_llm: bool = False
+    escalate: bool = False
+    end_call: bool = False
+    follow_up: Optional[str] = None
+
+
+class CallFlowState:
+    """Per-call position in the workflow"""
+    __slots__ = ("workflow", "turns", "low_confidence_streak", "last_action", "ended")
+
+    def __init__(self, workflow: "CompiledWorkflow"):
+        # Calls finish on the workflow version they started with, even across reloads
+        self.workflow = workflow
+        self.turns = 0
+        self.low_confidence_streak = 0
+        self.last_action: Optional[str] = None
+        self.ended = False
+
+
+class CompiledWorkflow:
+    """Immutable lookup tables compiled from a workflow definition"""
+
+    def __init__(self, definition: Dict[str, Any], version: int):
+        self.version = version
+        self.name = definition.get("name", "workflow")
+        steps = {s["action"]: s for s in sorted(definition.get("steps", []), key=lambda s: s.get("step", 0))}
+
+        self.greeting = steps.get("greeting", {}).get("prompt")
+        self.follow_up = steps.get("check_satisfaction", {}).get("prompt")
+        goodbye_prompt = steps.get("goodbye", {}).get("prompt")
+        use_llm = steps.get("respond", {}).get("use_llm", True)
+        self.triggers: FrozenSet[str] = frozenset(definition.get("escalation_triggers", []))
+
+        conditions: Dict[str, str] = steps.get("route", {}).get("conditions", {})
+        self.dispatch: Dict[str, TurnPlan] = {}
+        for intent, action in conditions.items():
+            tool = ACTION_TOOLS.get(action)
+            is_transfer = tool == "transfer_to_human"
+            prompt = DEFAULT_PROMPTS.get(action) if (is_transfer or not tool) else None
+            self.dispatch[intent] = TurnPlan(
+                action=action,
+                tool=tool,
+                prompt=prompt,
+                use_llm=use_llm and not prompt,
+                escalate=is_transfer,
+                end_call=is_transfer,
+                follow_up=None if prompt else self.follow_up
+            )
+
+        self.default_plan = TurnPlan(action="respond", use_llm=use_llm, follow_up=self.follow_up)
+        self.goodbye_plan = TurnPlan(action="goodbye", prompt=goodbye_prompt, end_call=True)
+        self.escalation_plan = TurnPlan(
+            action="escalate_to_human",
+            tool="transfer_to_human",
+            prompt=DEFAULT_PROMPTS["escalate_to_human"],
+            escalate=True,
+            end_call=True
+        )
+        self.clarify_plan = self.dispatch.get("unknown") or TurnPlan(
+            action="ask_clarification", prompt=DEFAULT_PROMPTS["ask_clarification"]
+        )
+
+        # Filled in by pre-synthesis; prompt text -> audio bytes
+        self.audio: Dict[str, bytes] = {}
+
+    def prompts(self):
+        """
+        Every static prompt this workflow can speak
+        """
+        plans = list(self.dispatch.values()) + [self.goodbye_plan, self.escalation_plan, self.clarify_plan]
+        texts = {self.greeting, self.follow_up} | {p.prompt for p in plans}
+        return [t for t in texts if t]
+
+
+class WorkflowEngine:
+    """
+    Compiles the call-flow JSON once and answers each turn with table lookups.
+
+    The compiled workflow is swapped atomically on reload, so in-flight calls
+    keep a consistent view while new calls pick up the change.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        tts_service=None,
+        low_confidence_threshold: float = 0.3,
+        max_clarifications: int = 3
+    ):
+        self.path = Path(path or DEFAULT_WORKFLOW_PATH)
+        self.low_confidence_threshold = low_confidence_threshold
+        self.max_clarifications = max_clarifications
+        self.tts_service = tts_service
+        self._mtime = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+        self.workflow = self._compile()
+
+    def _compile(self) -> CompiledWorkflow:
+        # Record mtime first so a broken file is retried only after it changes again
+        self._mtime = self.path.stat().st_mtime
+        with open(self.path, "r", encoding="utf-8") as f:
+            definition = json.load(f)
+        self._version += 1
+        return CompiledWorkflow(definition, self._version)
+
+    def reload(self) -> bool:
+        """
+        Recompile the workflow file; keeps the current version if the new file is invalid
+        """
+        with self._lock:
+            try:
+                workflow = self._compile()
+            except Exception as e:
+                # Any malformed definition (wrong types included) must not take down live calls
+                print(f"Workflow reload failed, keeping version {self.workflow.version}: {e}")
+                return False
+            # Carry over audio for prompts that did not change
+            workflow.audio = {t: a for t, a in self.workflow.audio.items() if t in set(workflow.prompts())}
+            self.workflow = workflow
+        self.presynthesize()
+        return True
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return False
+        return mtime != self._mtime and self.reload()
+
+    async def watch(self, interval: float = 2.0):
+        """
+        Poll the workflow file and hot-reload it when it changes
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                print(f"Workflow watch failed: {e}")
+
+    def presynthesize(self):
+        """
+        Render every static prompt to audio so prompts never wait on TTS
+        """
+        if not self.tts_service:
+            return
+        workflow = self.workflow
+        for text in workflow.prompts():
+            if text in workflow.audio:
+                continue
+            result = self.tts_service.synthesize_speech(text)
+            if result.get("success"):
+                workflow.audio[text] = result["audio"]
+
+    def new_state(self) -> CallFlowState:
+        return CallFlowState(self.workflow)
+
+    def greeting(self, state: CallFlowState) -> Optional[str]:
+        return state.workflow.greeting
+
+    def next_turn(
+        self,
+        state: CallFlowState,
+        intent: str,
+        confidence: float = 1.0,
+        sentiment: Optional[str] = None
+    ) -> TurnPlan:
+        """
+        Pick the plan for a caller turn from the compiled tables
+        """
+        state.turns += 1
+        if confidence < self.low_confidence_threshold:
+            state.low_confidence_streak += 1
+        else:
+            state.low_confidence_streak = 0
+        plan = self._plan(state.workflow, intent, state.low_confidence_streak, sentiment)
+        state.last_action = plan.action
+        state.ended = plan.end_call
+        return plan
+
+    def predict(
+        self,
+        state: CallFlowState,
+        intent: str,
+        confidence: float = 1.0,
+        sentiment: Optional[str] = None
+    ) -> TurnPlan:
+        """
+        The plan next_turn() would pick, without advancing the call's state
+        """
+        streak = state.low_confidence_streak + 1 if confidence < self.low_confidence_threshold else 0
+        return self._plan(state.workflow, intent, streak, sentiment)
+
+    def _plan(
+        self,
+        workflow: CompiledWorkflow,
+        intent: str,
+        low_confidence_streak: int,
+        sentiment: Optional[str]
+    ) -> TurnPlan:
+        triggers = workflow.triggers
+        if (
+            ("angry_sentiment" in triggers and sentiment in ANGRY_SENTIMENTS)
+            or ("low_confidence_intent" in triggers and low_confidence_streak >= self.max_clarifications)
+        ):
+            plan = workflow.escalation_plan
+        elif intent == "goodbye":
+            plan = workflow.goodbye_plan
+        else:
+            plan = workflow.dispatch.get(intent, workflow.default_plan)
+            if plan.escalate and not (
+                ("complaint_intent" in triggers and intent == "complaint")
+                or ("explicit_transfer_request" in triggers and intent == "transfer")
+            ):
+                plan = workflow.default_plan
+        return plan
+
+    def prompt_audio(self, state: CallFlowState, text: Optional[str]) -> Optional[bytes]:
+        return state.workflow.audio.get(text) if text else None
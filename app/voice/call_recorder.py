@@ -0,0 +1,272 @@
+"""
+Call recording: inbound and outbound audio frames teed to chunked files per call
+
+On disk, each call gets a directory:
+
+    <RECORDING_DIR>/<call_id>/
+        chunk_00000.rec      append-only records (gzip'd to .rec.gz once the call ends)
+        index.jsonl          seek points: {"ts_us", "chunk", "offset", "turn"?}
+
+Each record is a 14-byte big-endian header followed by the payload:
+
+    offset  size  field
+    0       1     direction (DIRECTION_IN, DIRECTION_OUT)
+    1       1     codec (framing.CODEC_*)
+    2       8     server receive/send time, microseconds since the epoch
+    10      4     payload length
+"""
+import gzip
+import json
+import queue
+import re
+import shutil
+import struct
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional
+
+from app.services.call_service import call_path
+
+RECORD_HEADER = struct.Struct("!BBQI")
+
+DIRECTION_IN = 1
+DIRECTION_OUT = 2
+
+_FRAME = 0
+_TURN = 1
+_FINISH = 2
+_STOP = 3
+
+_CHUNK_NAME = re.compile(r"chunk_(\d+)\.rec(?:\.gz)?")
+
+
+class RecordedFrame(NamedTuple):
+    direction: int
+    codec: int
+    timestamp_us: int
+    payload: bytes
+
+
+class _OpenRecording:
+    """Writer-thread state for one call being recorded"""
+    __slots__ = ("directory", "first_chunk", "chunk", "file", "offset", "index", "last_indexed_us")
+
+    def __init__(self, directory: Path, last_chunk: int = -1):
+        self.directory = directory
+        self.first_chunk = last_chunk + 1
+        self.chunk = last_chunk
+        self.file: Optional[BinaryIO] = None
+        self.offset = 0
+        self.index: Optional[BinaryIO] = None
+        self.last_indexed_us = -1
+
+
+class CallRecorder:
+    """
+    Tees call audio to disk without touching the live call's latency.
+
+    record() only copies the payload into a bounded queue; a single writer
+    thread owns every file handle. If the disk stalls long enough for the
+    queue to fill, frames are dropped (and counted) rather than blocking the
+    call. Finished recordings are gzip'd by a small background pool.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = "recordings",
+        chunk_bytes: int = 4 * 1024 * 1024,
+        max_queue: int = 20000,
+        index_interval_ms: int = 1000,
+        compress_workers: int = 2
+    ):
+        self.root_dir = Path(root_dir)
+        self.chunk_bytes = chunk_bytes
+        self.index_interval_us = index_interval_ms * 1000
+        self.max_queue = max_queue
+        # Unbounded so control messages always get through; frames enforce max_queue themselves
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._compressor = ThreadPoolExecutor(max_workers=compress_workers, thread_name_prefix="recording-gzip")
+        self._open: Dict[str, _OpenRecording] = {}
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.compressed = 0
+        self._writer = threading.Thread(target=self._run, name="call-recorder", daemon=True)
+        self._writer.start()
+
+    # Hot path (event loop)
+
+    def record(self, call_id: str, direction: int, codec: int, timestamp_us: int, payload) -> bool:
+        """
+        Queue one audio frame; never blocks
+        """
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._queue.put_nowait((_FRAME, call_id, direction, codec, timestamp_us, bytes(payload)))
+        return True
+
+    def mark_turn(self, call_id: str, timestamp_us: int, label: str):
+        """
+        Add a named seek point, e.g. the start of a caller turn
+        """
+        self._queue.put_nowait((_TURN, call_id, timestamp_us, label))
+
+    def finish(self, call_id: str):
+        """
+        Close the call's files and compress them in the background
+        """
+        self._queue.put_nowait((_FINISH, call_id))
+
+    def close(self, timeout: float = 10.0):
+        self._queue.put_nowait((_STOP,))
+        self._writer.join(timeout)
+        self._compressor.shutdown(wait=True)
+
+    # Writer thread
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                kind = item[0]
+                if kind == _FRAME:
+                    self._write_frame(*item[1:])
+                elif kind == _TURN:
+                    self._write_turn(*item[1:])
+                elif kind == _FINISH:
+                    self._close(item[1])
+                else:
+                    for call_id in list(self._open):
+                        self._close(call_id)
+                    return
+                if self._queue.empty():
+                    # Idle: make everything written so far readable
+                    for rec in self._open.values():
+                        rec.file.flush()
+                        rec.index.flush()
+            except Exception as e:
+                # One bad item must never stop the writer thread
+                print(f"Recording write failed: {e}")
+
+    def _recording(self, call_id: str) -> _OpenRecording:
+        rec = self._open.get(call_id)
+        if rec is None:
+            directory = call_path(self.root_dir, call_id)
+            directory.mkdir(parents=True, exist_ok=True)
+            # A reconnecting call continues after its highest existing chunk
+            chunks = (_CHUNK_NAME.fullmatch(p.name) for p in directory.iterdir())
+            last_chunk = max((int(m.group(1)) for m in chunks if m), default=-1)
+            rec = self._open[call_id] = _OpenRecording(directory, last_chunk)
+            rec.index = open(directory / "index.jsonl", "ab")
+            self._next_chunk(rec)
+        return rec
+
+    def _next_chunk(self, rec: _OpenRecording):
+        if rec.file is not None:
+            rec.file.close()
+        rec.chunk += 1
+        rec.file = open(rec.directory / f"chunk_{rec.chunk:05d}.rec", "ab")
+        rec.offset = 0
+        rec.last_indexed_us = -1
+
+    def _seek_point(self, rec: _OpenRecording, timestamp_us: int, turn: Optional[str] = None):
+        entry: Dict[str, Any] = {"ts_us": timestamp_us, "chunk": rec.chunk, "offset": rec.offset}
+        if turn is not None:
+            entry["turn"] = turn
+        rec.index.write(json.dumps(entry).encode() + b"\n")
+        rec.last_indexed_us = timestamp_us
+
+    def _write_frame(self, call_id: str, direction: int, codec: int, timestamp_us: int, payload: bytes):
+        rec = self._recording(call_id)
+        if rec.offset >= self.chunk_bytes:
+            self._next_chunk(rec)
+        if rec.last_indexed_us < 0 or timestamp_us - rec.last_indexed_us >= self.index_interval_us:
+            self._seek_point(rec, timestamp_us)
+        rec.file.write(RECORD_HEADER.pack(direction, codec, timestamp_us, len(payload)))
+        rec.file.write(payload)
+        rec.offset += RECORD_HEADER.size + len(payload)
+        self.frames_written += 1
+        self.bytes_written += RECORD_HEADER.size + len(payload)
+
+    def _write_turn(self, call_id: str, timestamp_us: int, label: str):
+        self._seek_point(self._recording(call_id), timestamp_us, label)
+
+    def _close(self, call_id: str):
+        rec = self._open.pop(call_id, None)
+        if rec is None:
+            return
+        rec.file.close()
+        rec.index.close()
+        # Only this session's chunks: a reconnected stream may already be writing the next one
+        paths = [rec.directory / f"chunk_{n:05d}.rec" for n in range(rec.first_chunk, rec.chunk + 1)]
+        self._compressor.submit(self._compress, paths)
+
+    def _compress(self, paths: List[Path]):
+        for path in paths:
+            if not path.exists():
+                continue
+            target = path.with_name(path.name + ".gz")
+            try:
+                with open(path, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                path.unlink()
+                self.compressed += 1
+            except OSError as e:
+                print(f"Recording compression failed for {path}: {e}")
+
+    # Reading
+
+    def load_index(self, call_id: str) -> List[Dict[str, Any]]:
+        path = call_path(self.root_dir, call_id) / "index.jsonl"
+        if not path.exists():
+            return []
+        with open(path, "rb") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def turns(self, call_id: str) -> List[Dict[str, Any]]:
+        return [e for e in self.load_index(call_id) if "turn" in e]
+
+    def read(self, call_id: str, from_us: int = 0) -> Iterator[RecordedFrame]:
+        """
+        Frames at or after a timestamp, seeking via the index
+        """
+        index = self.load_index(call_id)
+        directory = call_path(self.root_dir, call_id)
+        # Seek points are written in arrival order, so timestamps are close to sorted
+        points = sorted((e["ts_us"], e["chunk"], e["offset"]) for e in index)
+        i = bisect_right(points, (from_us, float("inf"), float("inf"))) - 1
+        chunk, offset = (points[i][1], points[i][2]) if i >= 0 else (0, 0)
+
+        while True:
+            path = directory / f"chunk_{chunk:05d}.rec"
+            if path.exists():
+                f = open(path, "rb")
+            elif path.with_name(path.name + ".gz").exists():
+                f = gzip.open(path.with_name(path.name + ".gz"), "rb")
+            else:
+                return
+            with f:
+                f.seek(offset)
+                while True:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    direction, codec, timestamp_us, length = RECORD_HEADER.unpack(header)
+                    payload = f.read(length)
+                    if timestamp_us >= from_us:
+                        yield RecordedFrame(direction, codec, timestamp_us, payload)
+            chunk += 1
+            offset = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "open_calls": len(self._open),
+            "queued": self._queue.qsize(),
+            "frames_written": self.frames_written,
+            "bytes_written": self.bytes_written,
+            "dropped": self.dropped,
+            "chunks_compressed": self.compressed
+        }
@@ -0,0 +1,311 @@
+"""
+Vectorized audio DSP: G.711 codecs, polyphase resampling and level normalization
+
+Everything works on NumPy arrays in streaming chunks (typically 20 ms) and
+writes into caller-supplied or internally preallocated buffers, so the
+per-chunk cost is a handful of vectorized operations with no Python loop
+over samples. PCM is signed 16-bit mono throughout.
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.voice.framing import CODEC_ALAW, CODEC_MULAW, INBOUND_CODECS
+
+SUPPORTED_RATES = (8000, 16000, 24000, 48000)
+G711_SAMPLE_RATE = 8000
+STT_SAMPLE_RATE = 16000
+
+
+# G.711 codecs, table driven: decode is a 256-entry gather, encode a 64K-entry gather
+# indexed by the PCM sample's bit pattern
+
+def _build_mulaw_tables() -> Tuple[np.ndarray, np.ndarray]:
+    codes = np.arange(256, dtype=np.int32)
+    u = ~codes & 0xFF
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    decode = np.where(u & 0x80, -magnitude, magnitude).astype(np.int16)
+
+    # G.711 operates on 14-bit samples
+    pcm = np.arange(-32768, 32768, dtype=np.int32)
+    linear = pcm >> 2
+    mask = np.where(linear < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(linear), 8159) + 0x21
+    segment = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    mantissa = (magnitude >> np.minimum(segment + 1, 8)) & 0x0F
+    encoded = np.where(segment >= 8, 0x7F, (segment << 4) | mantissa) ^ mask
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[pcm.astype(np.int16).view(np.uint16)] = encoded
+    return decode, encode
+
+
+def _build_alaw_tables() -> Tuple[np.ndarray, np.ndarray]:
+    codes = np.arange(256, dtype=np.int32)
+    a = codes ^ 0x55
+    exponent = (a >> 4) & 0x07
+    mantissa = a & 0x0F
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0)
+    )
+    decode = np.where(a & 0x80, magnitude, -magnitude).astype(np.int16)
+
+    pcm = np.arange(-32768, 32768, dtype=np.int32)
+    sign = np.where(pcm >= 0, 0x80, 0)
+    magnitude = np.minimum(np.where(pcm >= 0, pcm, -pcm - 1), 32767)
+    exponent = np.where(magnitude >= 256, np.floor(np.log2(np.maximum(magnitude, 1))).astype(np.int32) - 7, 0)
+    mantissa = np.where(exponent == 0, magnitude >> 4, magnitude >> (exponent + 3)) & 0x0F
+    encoded = (sign | (exponent << 4) | mantissa) ^ 0x55
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[pcm.astype(np.int16).view(np.uint16)] = encoded
+    return decode, encode
+
+
+MULAW_DECODE, MULAW_ENCODE = _build_mulaw_tables()
+ALAW_DECODE, ALAW_ENCODE = _build_alaw_tables()
+
+
+def _as_codes(data) -> np.ndarray:
+    return data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+
+
+def _as_pcm(data) -> np.ndarray:
+    return data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.int16)
+
+
+def mulaw_decode(data, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    μ-law bytes (or uint8 array) to int16 PCM
+    """
+    codes = _as_codes(data)
+    return np.take(MULAW_DECODE, codes, out=None if out is None else out[:codes.size])
+
+
+def mulaw_encode(pcm, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    int16 PCM (array or bytes) to μ-law uint8
+    """
+    samples = _as_pcm(pcm)
+    return np.take(MULAW_ENCODE, samples.view(np.uint16), out=None if out is None else out[:samples.size])
+
+
+def alaw_decode(data, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    A-law bytes (or uint8 array) to int16 PCM
+    """
+    codes = _as_codes(data)
+    return np.take(ALAW_DECODE, codes, out=None if out is None else out[:codes.size])
+
+
+def alaw_encode(pcm, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    int16 PCM (array or bytes) to A-law uint8
+    """
+    samples = _as_pcm(pcm)
+    return np.take(ALAW_ENCODE, samples.view(np.uint16), out=None if out is None else out[:samples.size])
+
+
+# Polyphase resampling
+
+_FILTERS: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+
+def _design_filter(up: int, down: int, taps_per_phase: int) -> np.ndarray:
+    """
+    Kaiser-windowed sinc low-pass at the upsampled rate, split into `up` phases.
+    Returns shape (up, taps) with each phase reversed, ready for a dot product
+    against a window of input samples (oldest first).
+    """
+    key = (up, down, taps_per_phase)
+    if key not in _FILTERS:
+        taps = taps_per_phase * max(1, math.ceil(down / up))
+        length = taps * up
+        cutoff = 0.5 / max(up, down) * 0.92
+        n = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+        h *= up / h.sum()
+        phases = h.reshape(taps, up).T  # phases[p][j] = h[p + j * up]
+        _FILTERS[key] = np.ascontiguousarray(phases[:, ::-1], dtype=np.float32)
+    return _FILTERS[key]
+
+
+class Resampler:
+    """
+    Streaming rational-ratio resampler for one audio stream.
+
+    Keeps its filter history between chunks, so chunk boundaries are
+    seamless, and reuses one work buffer. For each of the `up` output phases
+    the outputs form a strided view over a sliding window of the input, so a
+    chunk costs `up` small matrix-vector products.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 16, max_chunk: int = 4800):
+        if in_rate not in SUPPORTED_RATES or out_rate not in SUPPORTED_RATES:
+            raise ValueError(f"Unsupported rate conversion {in_rate} -> {out_rate}")
+        g = math.gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self.phases = _design_filter(self.up, self.down, taps_per_phase)
+        self.taps = self.phases.shape[1]
+        self._allocate(max_chunk)
+        self._t = 0  # position of the next output, in upsampled units from the chunk start
+
+    def _allocate(self, max_chunk: int):
+        work = np.zeros(self.taps - 1 + max_chunk, dtype=np.float32)
+        if hasattr(self, "_work"):
+            work[:self.taps - 1] = self._work[:self.taps - 1]
+        self._work = work
+        self._windows = np.lib.stride_tricks.sliding_window_view(work, self.taps)
+        self._result = np.empty(self.output_size(max_chunk), dtype=np.float32)
+
+    def output_size(self, n_in: int) -> int:
+        """
+        Upper bound on outputs produced for n_in input samples
+        """
+        return (n_in * self.up) // self.down + 1
+
+    def reset(self):
+        self._work[:] = 0
+        self._t = 0
+
+    def process(self, pcm, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Resample one chunk of int16 PCM; returns the int16 output (a view of out if given)
+        """
+        x = _as_pcm(pcm)
+        n = x.size
+        if self.up == self.down:
+            if out is None:
+                return x.copy()
+            out[:n] = x
+            return out[:n]
+
+        history = self.taps - 1
+        if history + n > self._work.size:
+            self._allocate(n)
+        work = self._work
+        work[history:history + n] = x
+
+        # Outputs whose current input sample lies in this chunk
+        count = max(0, -(-(n * self.up - self._t) // self.down))
+        result = self._result[:count]
+        windows = self._windows
+        for r in range(min(self.up, count)):
+            t = self._t + r * self.down
+            phase, start = t % self.up, t // self.up
+            idx = slice(start, start + (count - r - 1) // self.up * self.down + 1, self.down)
+            np.matmul(windows[idx], self.phases[phase], out=result[r::self.up])
+
+        self._t += count * self.down - n * self.up
+        work[:history] = work[n:n + history]
+
+        np.clip(result, -32768, 32767, out=result)
+        if out is None:
+            return result.astype(np.int16)
+        np.copyto(out[:count], result, casting="unsafe")
+        return out[:count]
+
+
+def resample(pcm, in_rate: int, out_rate: int) -> np.ndarray:
+    """
+    One-shot resampling of a complete clip
+    """
+    x = _as_pcm(pcm)
+    return Resampler(in_rate, out_rate, max_chunk=max(x.size, 1)).process(x)
+
+
+# Level normalization
+
+class RMSNormalizer:
+    """
+    Streaming gain control toward a target RMS level.
+
+    Gain is computed per chunk, smoothed (fast to reduce, slow to raise),
+    capped, and ramped linearly across the chunk so gain changes never click.
+    Near-silent chunks keep the current gain instead of amplifying noise.
+    """
+
+    def __init__(
+        self,
+        target_dbfs: float = -20.0,
+        max_gain_db: float = 20.0,
+        gate_dbfs: float = -55.0,
+        attack: float = 0.5,
+        release: float = 0.05,
+        max_chunk: int = 4800
+    ):
+        self.target = 32768.0 * 10 ** (target_dbfs / 20)
+        self.max_gain = 10 ** (max_gain_db / 20)
+        self.gate = 32768.0 * 10 ** (gate_dbfs / 20)
+        self.attack = attack
+        self.release = release
+        self.gain = 1.0
+        self._work = np.empty(max_chunk, dtype=np.float32)
+        self._gains = np.empty(max_chunk, dtype=np.float32)
+        self._steps = np.arange(max_chunk, dtype=np.float32)
+
+    def process(self, pcm, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Normalize one chunk of int16 PCM (in place when out is the input array)
+        """
+        x = _as_pcm(pcm)
+        n = x.size
+        if n > self._work.size:
+            self._work = np.empty(n, dtype=np.float32)
+            self._gains = np.empty(n, dtype=np.float32)
+            self._steps = np.arange(n, dtype=np.float32)
+        work = self._work[:n]
+        np.copyto(work, x, casting="unsafe")
+
+        rms = math.sqrt(float(np.dot(work, work)) / n) if n else 0.0
+        previous = self.gain
+        if rms > self.gate:
+            desired = min(self.target / rms, self.max_gain)
+            rate = self.attack if desired < self.gain else self.release
+            self.gain += rate * (desired - self.gain)
+
+        # Linear ramp from the previous gain to the new one
+        gains = self._gains[:n]
+        np.multiply(self._steps[:n], (self.gain - previous) / max(n, 1), out=gains)
+        gains += previous
+        work *= gains
+        np.clip(work, -32768, 32767, out=work)
+        if out is None:
+            return work.astype(np.int16)
+        np.copyto(out[:n], work, casting="unsafe")
+        return out[:n]
+
+
+class InboundDecoder:
+    """
+    One stream's inbound telephony audio to 16 kHz PCM16 for STT.
+
+    G.711 payloads are expanded and upsampled from 8 kHz; PCM16 passes
+    through untouched. Output lands in buffers owned by the decoder, so the
+    returned view is only valid until the next call.
+    """
+
+    def __init__(self, codec: int, out_rate: int = STT_SAMPLE_RATE, max_frame: int = 4800):
+        if codec not in INBOUND_CODECS:
+            raise ValueError(f"Unsupported inbound codec: {codec}")
+        self.codec = codec
+        self._decode = {CODEC_MULAW: mulaw_decode, CODEC_ALAW: alaw_decode}.get(codec)
+        self._pcm = np.empty(max_frame, dtype=np.int16)
+        self.resampler = Resampler(G711_SAMPLE_RATE, out_rate, max_chunk=max_frame) if self._decode else None
+        self._out = np.empty(self.resampler.output_size(max_frame) if self.resampler else 0, dtype=np.int16)
+
+    def process(self, payload) -> memoryview:
+        if self._decode is None:
+            return memoryview(payload)
+        n = len(payload)
+        if n > self._pcm.size:
+            self._pcm = np.empty(n, dtype=np.int16)
+            self._out = np.empty(self.resampler.output_size(n), dtype=np.int16)
+        pcm = self._decode(payload, out=self._pcm)
+        return memoryview(self.resampler.process(pcm, out=self._out)).cast("B")
@@ -0,0 +1,149 @@
+"""
+Binary audio framing for the call WebSocket
+
+Audio travels as binary WebSocket messages: a fixed 14-byte big-endian header
+followed by the raw payload. JSON text messages are reserved for control.
+
+    offset  size  field
+    0       1     frame type (FRAME_AUDIO_IN, FRAME_AUDIO_OUT, ...)
+    1       1     codec (CODEC_PCM16, CODEC_MULAW, CODEC_ALAW, CODEC_MP3)
+    2       4     sequence number (wraps at 2**32)
+    6       8     capture timestamp in microseconds
+    14      ...   payload
+"""
+import struct
+from typing import NamedTuple
+
+FRAME_HEADER = struct.Struct("!BBIQ")
+HEADER_SIZE = FRAME_HEADER.size
+
+FRAME_AUDIO_IN = 1
+FRAME_AUDIO_OUT = 2
+FRAME_AUDIO_END = 3  # end of an utterance (either direction), empty payload
+
+CODEC_PCM16 = 0
+CODEC_MULAW = 1
+CODEC_ALAW = 2
+CODEC_MP3 = 3  # provider TTS output, outbound only
+
+# Codecs a caller may send; everything else cannot be decoded for STT
+INBOUND_CODECS = frozenset({CODEC_PCM16, CODEC_MULAW, CODEC_ALAW})
+
+SEQ_MODULO = 1 << 32
+
+# 5 seconds of 16 kHz 16-bit mono audio
+DEFAULT_RING_CAPACITY = 160000
+
+
+class FrameError(ValueError):
+    """Raised for malformed binary frames"""
+
+
+class Frame(NamedTuple):
+    frame_type: int
+    codec: int
+    seq: int
+    timestamp_us: int
+    payload: memoryview
+
+
+def parse_frame(data: bytes) -> Frame:
+    """
+    Split a binary message into header fields and a zero-copy payload view
+    """
+    if len(data) < HEADER_SIZE:
+        raise FrameError(f"Frame too short: {len(data)} bytes")
+    frame_type, codec, seq, timestamp_us = FRAME_HEADER.unpack_from(data)
+    return Frame(frame_type, codec, seq, timestamp_us, memoryview(data)[HEADER_SIZE:])
+
+
+class FrameWriter:
+    """
+    Builds outbound frames in a reusable buffer, one per call
+    """
+
+    def __init__(self, max_payload: int = 8192):
+        self._buffer = bytearray(HEADER_SIZE + max_payload)
+        self._view = memoryview(self._buffer)
+        self.seq = 0
+
+    def build(self, frame_type: int, codec: int, timestamp_us: int, payload: bytes = b"") -> bytes:
+        size = len(payload)
+        if size > len(self._buffer) - HEADER_SIZE:
+            self._buffer = bytearray(HEADER_SIZE + size)
+            self._view = memoryview(self._buffer)
+        FRAME_HEADER.pack_into(self._buffer, 0, frame_type, codec, self.seq, timestamp_us)
+        self._view[HEADER_SIZE:HEADER_SIZE + size] = payload
+        self.seq = (self.seq + 1) % SEQ_MODULO
+        # ASGI requires bytes, so this is the single copy on the way out
+        return bytes(self._view[:HEADER_SIZE + size])
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity byte ring buffer for a call's inbound audio.
+
+    Storage is allocated once; writes and reads copy through memoryviews. When
+    the reader falls behind, the oldest audio is overwritten and counted in
+    overruns rather than growing the buffer.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RING_CAPACITY):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._read_pos = 0
+        self._size = 0
+        self.overruns = 0
+
+    @property
+    def readable(self) -> int:
+        return self._size
+
+    def write(self, data) -> int:
+        """
+        Append bytes (or a memoryview), dropping the oldest audio if full
+        """
+        data = memoryview(data).cast("B")
+        n = len(data)
+        if n >= self.capacity:
+            # Only the newest capacity bytes can be kept
+            self.overruns += n - self.capacity + self._size
+            data = data[n - self.capacity:]
+            n = self.capacity
+            self._read_pos = 0
+            self._size = 0
+
+        overflow = self._size + n - self.capacity
+        if overflow > 0:
+            self._read_pos = (self._read_pos + overflow) % self.capacity
+            self._size -= overflow
+            self.overruns += overflow
+
+        write_pos = (self._read_pos + self._size) % self.capacity
+        first = min(n, self.capacity - write_pos)
+        self._view[write_pos:write_pos + first] = data[:first]
+        if first < n:
+            self._view[:n - first] = data[first:]
+        self._size += n
+        return n
+
+    def read_into(self, out, n: int = -1) -> int:
+        """
+        Copy up to n readable bytes into a caller-owned buffer; returns bytes copied
+        """
+        out = memoryview(out).cast("B")
+        if n < 0:
+            n = len(out)
+        n = min(n, self._size, len(out))
+        first = min(n, self.capacity - self._read_pos)
+        out[:first] = self._view[self._read_pos:self._read_pos + first]
+        if first < n:
+            out[first:n] = self._view[:n - first]
+        self._read_pos = (self._read_pos + n) % self.capacity
+        self._size -= n
+        return n
+
+    def clear(self):
+        self._read_pos = 0
+        self._size = 0
@@ -0,0 +1,201 @@
+"""
+Adaptive jitter buffer with packet-loss concealment for inbound call audio
+"""
+import math
+import time
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+from app.voice.framing import SEQ_MODULO
+
+FRAME_OK = 0
+FRAME_CONCEALED = 1
+FRAME_SILENCE = 2
+
+_HALF_SEQ = SEQ_MODULO // 2
+
+# Silence byte per codec: PCM16 zero, mu-law 0xFF, A-law 0xD5
+SILENCE_BYTES = {0: 0x00, 1: 0xFF, 2: 0xD5}
+# Payload bytes per millisecond of audio: 16 kHz PCM16, 8 kHz G.711
+BYTES_PER_MS = {0: 32, 1: 8, 2: 8}
+
+
+class JitterBuffer:
+    """
+    Reorders inbound frames by sequence number before they reach STT.
+
+    Frames live in a fixed array of slots indexed by seq % capacity, so
+    pushing and popping never allocate. The playout depth adapts to the
+    RFC 3550 interarrival jitter estimate between min_depth and max_depth.
+    A single missing frame is concealed by repeating the previous frame;
+    longer gaps are filled with codec silence. A payload larger than a slot
+    is truncated and counted; for_codec() sizes slots so that only a sender
+    exceeding the longest expected packetization time ever hits this.
+    """
+
+    def __init__(
+        self,
+        max_frame_bytes: int = 640,
+        frame_ms: float = 20,
+        min_depth: int = 2,
+        max_depth: int = 12,
+        silence_byte: int = 0x00
+    ):
+        self.frame_ms = frame_ms
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.capacity = self.max_depth * 2
+        self.max_frame_bytes = max_frame_bytes
+        self.silence_byte = silence_byte
+
+        self._slots = bytearray(self.capacity * max_frame_bytes)
+        self._view = memoryview(self._slots)
+        self._slot_seq = array("q", [-1] * self.capacity)
+        self._slot_len = array("I", [0] * self.capacity)
+        self._last_frame = bytearray(max_frame_bytes)
+        self._last_len = 0
+        self._silence = memoryview(bytes([silence_byte]) * max_frame_bytes)
+        self._consecutive_lost = 0
+
+        self.next_seq: Optional[int] = None  # extended (non-wrapping) sequence number
+        self.highest_seq = -1
+        self.count = 0
+        self.target_depth = self.min_depth
+
+        self._prev_transit: Optional[float] = None
+        self.jitter_ms = 0.0
+
+        self.received = 0
+        self.late = 0
+        self.duplicates = 0
+        self.lost = 0
+        self.resets = 0
+        self.truncated = 0
+
+    @classmethod
+    def for_codec(cls, codec: int, max_ptime_ms: float = 60, **kwargs) -> "JitterBuffer":
+        """
+        A buffer whose slots hold the longest frame expected for the codec
+        """
+        return cls(
+            max_frame_bytes=int(BYTES_PER_MS.get(codec, 32) * max_ptime_ms),
+            silence_byte=SILENCE_BYTES.get(codec, 0x00),
+            **kwargs
+        )
+
+    def _extend(self, seq: int) -> int:
+        """
+        Map a 32-bit wire sequence number onto the extended sequence space
+        """
+        diff = (seq - self.next_seq + _HALF_SEQ) % SEQ_MODULO - _HALF_SEQ
+        return self.next_seq + diff
+
+    def push(self, seq: int, timestamp_us: int, payload, arrival: Optional[float] = None):
+        """
+        Insert a frame. Late and duplicate frames are counted and discarded.
+        """
+        self.received += 1
+        if self.next_seq is None:
+            self.next_seq = seq
+        ext = self._extend(seq)
+
+        if ext < self.next_seq:
+            self.late += 1
+            return
+        if ext - self.next_seq >= self.capacity:
+            # Sender jumped far ahead (restart or long outage): resynchronise
+            self.resets += 1
+            self._reset(ext)
+
+        arrival = time.monotonic() if arrival is None else arrival
+        self._update_jitter(arrival * 1000.0 - timestamp_us / 1000.0)
+
+        slot = ext % self.capacity
+        if self._slot_seq[slot] == ext:
+            self.duplicates += 1
+            return
+
+        n = len(payload)
+        if n > self.max_frame_bytes:
+            self.truncated += 1
+            n = self.max_frame_bytes
+        offset = slot * self.max_frame_bytes
+        self._view[offset:offset + n] = payload[:n]
+        self._slot_seq[slot] = ext
+        self._slot_len[slot] = n
+        self.count += 1
+        if ext > self.highest_seq:
+            self.highest_seq = ext
+
+    def ready(self) -> bool:
+        """
+        True when a frame should be played out now
+        """
+        if self.next_seq is None or self.highest_seq < self.next_seq:
+            return False
+        return self.count >= self.target_depth or self.highest_seq - self.next_seq >= self.max_depth
+
+    def has_pending(self) -> bool:
+        """
+        True while frames up to the newest one received have not been played out
+        """
+        return self.next_seq is not None and self.highest_seq >= self.next_seq
+
+    def pop_into(self, out) -> Tuple[int, int]:
+        """
+        Copy the next frame into out, concealing it if it never arrived.
+        Returns (bytes_written, FRAME_OK | FRAME_CONCEALED | FRAME_SILENCE).
+        """
+        out = memoryview(out).cast("B")
+        slot = self.next_seq % self.capacity
+        self.next_seq += 1
+
+        if self._slot_seq[slot] == self.next_seq - 1:
+            n = self._slot_len[slot]
+            offset = slot * self.max_frame_bytes
+            out[:n] = self._view[offset:offset + n]
+            self._last_frame[:n] = self._view[offset:offset + n]
+            self._last_len = n
+            self._slot_seq[slot] = -1
+            self.count -= 1
+            self._consecutive_lost = 0
+            return n, FRAME_OK
+
+        self.lost += 1
+        self._consecutive_lost += 1
+        n = self._last_len or self.max_frame_bytes
+        if self._consecutive_lost == 1 and self._last_len:
+            out[:n] = self._last_frame[:n]
+            return n, FRAME_CONCEALED
+
+        out[:n] = self._silence[:n]
+        return n, FRAME_SILENCE
+
+    def _update_jitter(self, transit_ms: float):
+        if self._prev_transit is not None:
+            d = abs(transit_ms - self._prev_transit)
+            self.jitter_ms += (d - self.jitter_ms) / 16.0
+            depth = self.min_depth + math.ceil(2.0 * self.jitter_ms / self.frame_ms)
+            self.target_depth = min(self.max_depth, depth)
+        self._prev_transit = transit_ms
+
+    def _reset(self, next_seq: int):
+        for i in range(self.capacity):
+            self._slot_seq[i] = -1
+        self.count = 0
+        self.next_seq = next_seq
+        self.highest_seq = next_seq - 1
+        self._prev_transit = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "late": self.late,
+            "duplicates": self.duplicates,
+            "lost": self.lost,
+            "resets": self.resets,
+            "truncated": self.truncated,
+            "jitter_ms": round(self.jitter_ms, 2),
+            "target_depth": self.target_depth,
+            "buffered": self.count
+        }
@@ -0,0 +1,163 @@
+"""
+Filler audio that masks slow tool calls, LLM generations and TTS
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.services.intent_service import IntentType
+
+# Short acknowledgments per intent; DEFAULT_FILLERS cover every other intent
+FILLERS: Dict[str, List[str]] = {
+    IntentType.APPOINTMENT_BOOKING.value: [
+        "Let me check the calendar for you.",
+        "One moment while I look at available times."
+    ],
+    IntentType.BUSINESS_HOURS.value: [
+        "Let me pull that up for you."
+    ],
+    IntentType.JOB_INQUIRY.value: [
+        "Let me check our current openings.",
+        "One moment while I look that up."
+    ],
+    IntentType.FAQ.value: [
+        "Let me look that up for you.",
+        "Good question, one moment."
+    ],
+    IntentType.COMPLAINT.value: [
+        "I understand, give me just a moment.",
+        "I'm sorry about that. Let me see what I can do."
+    ]
+}
+DEFAULT_FILLERS: List[str] = [
+    "Let me check that for you.",
+    "One moment please."
+]
+
+AudioSender = Callable[[bytes, bool], Awaitable[None]]
+
+
+class LatencyMasker:
+    """
+    Plays a pre-synthesized filler when a turn's audio is late.
+
+    Filler audio is rendered once (presynthesize, run at startup) and never
+    synthesized on the hot path. play() waits up to the budget for the real
+    response; if it is not ready, the filler is sent first and the response
+    is spliced in right after it as one continuous utterance.
+    """
+
+    def __init__(self, tts_service=None, enabled: bool = True, budget_ms: float = 700):
+        self.tts_service = tts_service
+        self.budget = budget_ms / 1000
+        self.enabled = enabled
+        # (voice_id, text) -> audio; voice None is the provider default
+        self.audio: Dict[Tuple[Optional[str], str], bytes] = {}
+        self.played = 0
+        self.on_time = 0
+
+    def presynthesize(self, voices: Iterable[Optional[str]] = (None,)):
+        """
+        Render every filler to audio via the TTS service, once per voice
+        """
+        if not self.tts_service:
+            return
+        texts = set(DEFAULT_FILLERS).union(*FILLERS.values())
+        for voice_id in voices:
+            for text in texts:
+                if (voice_id, text) in self.audio:
+                    continue
+                result = self.tts_service.synthesize_speech(text, voice_id=voice_id)
+                if result.get("success"):
+                    self.audio[(voice_id, text)] = result["audio"]
+
+    def pick(self, intent: Optional[str], avoid: Optional[str] = None, voice_id: Optional[str] = None) -> Optional[str]:
+        """
+        A cached filler suited to the intent, not repeating the last one played on the call
+        """
+        for pool in (FILLERS.get(intent or "", []), DEFAULT_FILLERS):
+            ready = [t for t in pool if (voice_id, t) in self.audio]
+            if not ready:
+                continue
+            fresh = [t for t in ready if t != avoid]
+            return (fresh or ready)[0]
+        return None
+
+    async def play(
+        self,
+        response: Awaitable[Optional[bytes]],
+        send: AudioSender,
+        intent: Optional[str] = None,
+        avoid: Optional[str] = None,
+        voice_id: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Send the response audio, preceded by a filler if it misses the budget.
+        send(audio, end) sends one chunk of an utterance; end closes it.
+        Returns the filler played, if any.
+        """
+        task = asyncio.ensure_future(response)
+        filler = None
+        try:
+            if self.enabled:
+                done, _ = await asyncio.wait({task}, timeout=self.budget)
+                if not done:
+                    filler = self.pick(intent, avoid, voice_id)
+                    if filler:
+                        self.played += 1
+                        await send(self.audio[(voice_id, filler)], False)
+                else:
+                    self.on_time += 1
+            audio = await task
+        except asyncio.CancelledError:
+            # The call ended mid-turn: stop generating the response too
+            task.cancel()
+            raise
+        if audio:
+            await send(audio, True)
+        elif filler:
+            await send(b"", True)
+        return filler
+
+    async def speak(
+        self,
+        text: str,
+        send: AudioSender,
+        intent: Optional[str] = None,
+        avoid: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        cache: Optional[Any] = None
+    ) -> Optional[str]:
+        """
+        Synthesize a reply off the event loop and play it, masking the wait.
+        With a cache (a tenant's partition), repeated replies skip TTS entirely.
+        """
+        if cache is not None:
+            audio = cache.get((voice_id, text))
+            if audio:
+                await send(audio, True)
+                return None
+        return await self.play(self._synthesize(text, voice_id, cache), send, intent, avoid, voice_id)
+
+    async def render(self, text: str, voice_id: Optional[str] = None, cache: Optional[Any] = None) -> Optional[bytes]:
+        """
+        Audio for a reply, from the tenant's cache partition or synthesized off the event loop.
+        For play(), when the text itself is still being produced.
+        """
+        if cache is not None:
+            audio = cache.get((voice_id, text))
+            if audio:
+                return audio
+        return await self._synthesize(text, voice_id, cache)
+
+    async def _synthesize(self, text: str, voice_id: Optional[str] = None, cache: Optional[Any] = None) -> Optional[bytes]:
+        if not self.tts_service:
+            return None
+        result = await asyncio.to_thread(self.tts_service.synthesize_speech, text, voice_id)
+        if not result.get("success"):
+            return None
+        if cache is not None:
+            cache.put((voice_id, text), result["audio"])
+        return result["audio"]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"cached": len(self.audio), "played": self.played, "on_time": self.on_time}
@@ -1,24 +1,21 @@
 """
 Speech-to-Text service
 """
-import os
+import asyncio
 from typing import Optional, BinaryIO, Dict, Any
 from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.services.call_tracer import payload_hash, span
 
 
 class STTService:
     """Service for converting speech to text"""
     
-    def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found")
-        
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, client: Optional[OpenAI] = None, worker_pool=None):
+        # Without a client, the OpenAI SDK reads OPENAI_API_KEY itself
+        self.client = client or OpenAI()
         self.model = "whisper-1"
+        # Audio preparation runs in the CPU pool when one is configured
+        self.worker_pool = worker_pool
     
     def transcribe_audio(
         self,
@@ -36,11 +33,13 @@ class STTService:
             Dict with transcribed text and metadata
         """
         try:
-            transcript = self.client.audio.transcriptions.create(
-                model=self.model,
-                file=audio_file,
-                language=language
-            )
+            with span("stt", model=self.model) as trace:
+                transcript = self.client.audio.transcriptions.create(
+                    model=self.model,
+                    file=audio_file,
+                    language=language
+                )
+                trace["text_hash"] = payload_hash(transcript.text)
             
             return {
                 "text": transcript.text,
@@ -55,6 +54,23 @@ class STTService:
                 "success": False
             }
     
+    async def transcribe_pcm(
+        self,
+        pcm,
+        sample_rate: int = 16000,
+        language: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Transcribe raw PCM16 caller audio drained from the stream's ring buffer.
+        pcm (bytes or a memoryview) must not change until this returns.
+        """
+        if self.worker_pool is not None:
+            wav = await self.worker_pool.run("stt_prepare", sample_rate, data=pcm)
+        else:
+            from app.services.cpu_tasks import prepare_stt_audio
+            wav = await asyncio.to_thread(prepare_stt_audio, pcm, sample_rate)
+        return await asyncio.to_thread(self.transcribe_audio, ("audio.wav", wav), language)
+    
     def transcribe_audio_url(self, audio_url: str) -> Dict[str, Any]:
         """
         Transcribe audio from URL
@@ -1,21 +1,44 @@
 """
 Text-to-Speech service
 """
-import os
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, Sequence
 import requests
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.services.call_tracer import payload_hash, span
+from app.services.provider_router import ProviderRouter, ProviderUnavailableError
 
 
 class TTSService:
     """Service for converting text to speech"""
     
-    def __init__(self):
-        self.provider = os.getenv("TTS_PROVIDER", "elevenlabs")  # elevenlabs, openai, playht
-        self.elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
-        self.elevenlabs_voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+    def __init__(
+        self,
+        client_factory: Optional[Callable[[], Any]] = None,
+        provider: str = "elevenlabs",
+        fallback_providers: Sequence[str] = ("openai",),
+        latency_budget_ms: float = 800,
+        elevenlabs_api_key: Optional[str] = None,
+        elevenlabs_voice_id: str = "21m00Tcm4TlvDq8ikWAM",
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        request_timeout: float = 4,
+        deadline_ms: float = 8000
+    ):
+        # Builds the shared OpenAI client on first use of OpenAI TTS
+        self.client_factory = client_factory
+        self.provider = provider  # elevenlabs, openai, playht
+        self.elevenlabs_api_key = elevenlabs_api_key
+        self.elevenlabs_voice_id = elevenlabs_voice_id
+        # Per request, so an abandoned (hedged or past-deadline) attempt frees its thread
+        self.request_timeout = request_timeout
+        self.router = ProviderRouter(
+            "tts",
+            [self.provider] + list(fallback_providers),
+            latency_budget=latency_budget_ms / 1000,
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout,
+            deadline=deadline_ms / 1000,
+            is_failure=lambda result: not result.get("success")
+        )
     
     def synthesize_speech(
         self,
@@ -34,16 +57,42 @@ class TTSService:
         Returns:
             Dict with audio data (base64 or bytes) and metadata
         """
-        if self.provider == "elevenlabs":
-            return self._elevenlabs_tts(text, voice_id)
-        elif self.provider == "openai":
-            return self._openai_tts(text, voice_id)
+        with span("tts", text_hash=payload_hash(text), chars=len(text)) as trace:
+            try:
+                result = self.router.call(lambda provider: self._provider_tts(provider, text, voice_id))
+            except ProviderUnavailableError as e:
+                result = e.last_result or {
+                    "audio": None,
+                    "error": str(e),
+                    "success": False
+                }
+            trace.update(
+                provider=result.get("provider"),
+                success=bool(result.get("success")),
+                bytes=len(result.get("audio") or b"")
+            )
+        return result
+    
+    def _provider_tts(self, provider: str, text: str, voice_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Synthesize with a single provider.
+        Voice IDs are provider-specific, so only the configured provider receives one.
+        """
+        if provider != self.provider:
+            voice_id = None
+        
+        if provider == "elevenlabs":
+            result = self._elevenlabs_tts(text, voice_id)
+        elif provider == "openai":
+            result = self._openai_tts(text, voice_id)
         else:
-            return {
+            result = {
                 "audio": None,
-                "error": f"Unsupported TTS provider: {self.provider}",
+                "error": f"Unsupported TTS provider: {provider}",
                 "success": False
             }
+        result["provider"] = provider
+        return result
     
     def _elevenlabs_tts(self, text: str, voice_id: Optional[str] = None) -> Dict[str, any]:
         """
@@ -75,7 +124,7 @@ class TTSService:
         }
         
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = requests.post(url, json=data, headers=headers, timeout=self.request_timeout)
             if response.status_code == 200:
                 return {
                     "audio": response.content,  # MP3 audio bytes
@@ -99,8 +148,11 @@ class TTSService:
         """
         Use OpenAI TTS API
         """
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        if self.client_factory:
+            client = self.client_factory()
+        else:
+            from openai import OpenAI
+            client = OpenAI()
         
         voice = voice_id or "alloy"  # alloy, echo, fable, onyx, nova, shimmer
         
@@ -108,7 +160,8 @@ class TTSService:
             response = client.audio.speech.create(
                 model="tts-1",
                 voice=voice,
-                input=text
+                input=text,
+                timeout=self.request_timeout
             )
             
             return {
@@ -0,0 +1,131 @@
+"""
+Audio DSP microbenchmark
+
+Runs the per-stream pipelines from app/voice/dsp.py over 20 ms chunks on one
+core and reports how many concurrent streams that core keeps real-time:
+  inbound   - G.711 μ-law 8 kHz -> PCM16 16 kHz (what STT consumes)
+  outbound  - PCM16 24 kHz TTS -> RMS normalize -> 8 kHz -> μ-law
+  wideband  - PCM16 48 kHz -> 16 kHz
+plus the raw codec and resampler kernels.
+
+Streams are interleaved chunk by chunk, as the event loop would run them,
+so per-stream state and buffers are exercised the way calls use them.
+
+Usage:
+    python scripts/bench_dsp.py [streams] [seconds]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.voice import dsp  # noqa: E402
+from app.voice.framing import CODEC_MULAW  # noqa: E402
+
+CHUNK_MS = 20
+
+
+def _speechlike(rate: int, seconds: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    tone = sum(np.sin(2 * np.pi * f * t) for f in (180, 720, 2400))
+    signal = 3000 * envelope * tone + 300 * rng.standard_normal(t.size)
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def _chunks(data: np.ndarray, rate: int):
+    size = rate * CHUNK_MS // 1000
+    return [data[i:i + size] for i in range(0, data.size - size + 1, size)]
+
+
+def run_pipeline(name: str, make_stream, rate: int, streams: int, seconds: float):
+    source = _speechlike(rate, seconds, 0)
+    chunks = _chunks(source, rate)
+    pipelines = [make_stream() for _ in range(streams)]
+    # Warm the per-stream buffers once
+    for step in pipelines:
+        step(chunks[0])
+
+    start = time.process_time()
+    for chunk in chunks:
+        for step in pipelines:
+            step(chunk)
+    elapsed = time.process_time() - start
+
+    audio_seconds = streams * len(chunks) * CHUNK_MS / 1000
+    per_chunk_us = elapsed / (streams * len(chunks)) * 1e6
+    realtime_streams = audio_seconds / elapsed
+    print(f"{name:<10} {per_chunk_us:8.1f} us/chunk  {realtime_streams:8.0f} real-time streams per core")
+
+
+def inbound():
+    payload_source = dsp.mulaw_encode(_speechlike(8000, 0.02, 1)).tobytes()
+    decoder = dsp.InboundDecoder(CODEC_MULAW, max_frame=len(payload_source))
+    payload = bytearray(payload_source)
+
+    def step(chunk):
+        # The chunk stands in for the G.711 payload read from the jitter buffer
+        decoder.process(payload)
+    return step
+
+
+def outbound():
+    normalizer = dsp.RMSNormalizer(max_chunk=480)
+    resampler = dsp.Resampler(24000, 8000, max_chunk=480)
+    level = np.empty(480, dtype=np.int16)
+    narrow = np.empty(resampler.output_size(480), dtype=np.int16)
+    encoded = np.empty(narrow.size, dtype=np.uint8)
+
+    def step(chunk):
+        normalized = normalizer.process(chunk, out=level)
+        dsp.mulaw_encode(resampler.process(normalized, out=narrow), out=encoded)
+    return step
+
+
+def wideband():
+    resampler = dsp.Resampler(48000, 16000, max_chunk=960)
+    out = np.empty(resampler.output_size(960), dtype=np.int16)
+
+    def step(chunk):
+        resampler.process(chunk, out=out)
+    return step
+
+
+def kernels(seconds: float):
+    pcm8 = _speechlike(8000, seconds, 2)
+    pcm24 = _speechlike(24000, seconds, 3)
+    encoded = np.empty(pcm8.size, dtype=np.uint8)
+    decoded = np.empty(pcm8.size, dtype=np.int16)
+    rows = [
+        ("mulaw_encode", pcm8.size, lambda: dsp.mulaw_encode(pcm8, out=encoded)),
+        ("mulaw_decode", pcm8.size, lambda: dsp.mulaw_decode(encoded, out=decoded)),
+        ("alaw_encode", pcm8.size, lambda: dsp.alaw_encode(pcm8, out=encoded)),
+        ("resample 24k->8k", pcm24.size, lambda: dsp.resample(pcm24, 24000, 8000)),
+        ("resample 8k->16k", pcm8.size, lambda: dsp.resample(pcm8, 8000, 16000)),
+    ]
+    for name, samples, fn in rows:
+        fn()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} {samples / elapsed / 1e6:8.1f} Msamples/s")
+
+
+def main():
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    print(f"{streams} interleaved streams, {seconds:.0f}s of audio each, {CHUNK_MS} ms chunks\n")
+    run_pipeline("inbound", inbound, 8000, streams, seconds)
+    run_pipeline("outbound", outbound, 24000, streams, seconds)
+    run_pipeline("wideband", wideband, 48000, streams, seconds)
+    print("\nKernels over one long buffer:")
+    kernels(max(seconds, 10.0) * 6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Worker startup benchmark
+
+Spawns fresh interpreters and measures, per process:
+  framework  - importing fastapi (the floor we cannot go below)
+  app_import - importing app.main on top of the framework
+  ready      - lifespan startup until the worker accepts requests
+  warm       - background prewarm until caches are filled
+
+Usage:
+    python scripts/bench_startup.py [runs]
+"""
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+CHILD = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import fastapi
+t1 = time.perf_counter()
+from app.main import app
+from app.container import container
+t2 = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        t3 = time.perf_counter()
+        await asyncio.to_thread(container.warm.wait, 30)
+        t4 = time.perf_counter()
+    return t3, t4
+
+t3, t4 = asyncio.run(main())
+print(json.dumps({
+    "framework": t1 - t0,
+    "app_import": t2 - t1,
+    "ready": t3 - t2,
+    "warm": t4 - t3,
+    "total_to_ready": t3 - t0
+}))
+"""
+
+
+def run_once() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [run_once() for _ in range(runs)]
+    print(f"{'stage':<16}{'median ms':>12}{'max ms':>12}")
+    for stage in samples[0]:
+        values = [s[stage] * 1000 for s in samples]
+        print(f"{stage:<16}{statistics.median(values):>12.1f}{max(values):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Deterministic replay of recorded call traces
+
+Drives the app in-process through POST /call/start, WS /call/stream and
+POST /call/end, resending each trace's audio frames (silence of the recorded
+size, original seq and timestamps), partial and final transcripts on the
+recorded schedule. The OpenAI client is replaced by a fake that answers
+LLM, TTS and STT requests after the latency the trace recorded for them,
+so two builds see identical input and identical provider behavior and any
+latency difference is the build's own. Everything is scaled by --speed:
+2 replays twice as fast (inputs and provider delays alike).
+
+Capture traces with TRACE_ENABLED=true (see SETUP.md), then:
+
+    python scripts/replay_trace.py run traces/ --speed 4 --out before.json
+    # ... switch builds ...
+    python scripts/replay_trace.py run traces/ --speed 4 --out after.json
+    python scripts/replay_trace.py diff before.json after.json [--fail-over 10]
+
+Stages:
+  response_ms     final transcript sent -> response received (client side)
+  first_audio_ms  final transcript sent -> first audio frame received
+  audio_end_ms    final transcript sent -> end-of-audio frame received
+  turn_ms         final -> response, in the replayed server trace
+  llm_ms, tts_ms, stt_ms, tool_ms
+                  provider and tool spans in the replayed server trace
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+SPAN_STAGES = ("llm", "tts", "stt", "tool")
+
+
+# Fake providers
+
+class RecordedLatencies:
+    """
+    Provider spans from the trace being replayed. A request is matched to a
+    recorded span by payload hash; generated text that hashes differently
+    takes the next unmatched span of its stage in recorded order.
+    """
+
+    def __init__(self, events: List[Dict[str, Any]], speed: float):
+        self.speed = speed
+        self.by_hash: Dict[tuple, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.in_order: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for e in events:
+            if e["kind"] != "span":
+                continue
+            key = e.get("prompt_hash") or e.get("text_hash")
+            self.by_hash[(e["stage"], key)].append(e)
+            self.in_order[e["stage"]].append(e)
+
+    def take(self, stage: str, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        from app.services.call_tracer import current_trace
+        matches = self.by_hash.get((stage, key))
+        if matches:
+            span = matches.popleft()
+        elif current_trace() is not None and self.in_order[stage]:
+            # Only requests made for the replayed call consume unmatched spans, not prewarm
+            span = self.in_order[stage][0]
+            self.by_hash[(stage, span.get("prompt_hash") or span.get("text_hash"))].remove(span)
+        else:
+            return None
+        self.in_order[stage].remove(span)
+        time.sleep(span["dur_us"] / 1e6 / self.speed)
+        return span
+
+
+class FakeOpenAI:
+    """Stands in for the OpenAI client; every request answers from the recorded trace"""
+
+    def __init__(self):
+        self.recorded: Optional[RecordedLatencies] = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+        self.audio = SimpleNamespace(
+            speech=SimpleNamespace(create=self._speech),
+            transcriptions=SimpleNamespace(create=self._transcribe)
+        )
+
+    def _take(self, stage: str, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.recorded.take(stage, key) if self.recorded else None
+
+    def _complete(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        from app.services.call_tracer import payload_hash
+        if kwargs.get("response_format"):
+            # Batched intent and sentiment requests are not traced per call
+            content = json.dumps({"results": [], "scores": []})
+            span = None
+        else:
+            span = self._take("llm", payload_hash(messages[-1]["content"]))
+            tokens = (span or {}).get("completion_tokens") or 12
+            content = " ".join(["replayed"] * tokens)
+        usage = SimpleNamespace(prompt_tokens=len(str(messages)) // 4, completion_tokens=len(content.split()))
+        message = SimpleNamespace(content=content, tool_calls=None)
+        return SimpleNamespace(
+            model=(span or {}).get("model") or model,
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=usage
+        )
+
+    def _speech(self, model: str, voice: str, input: str, **kwargs):
+        from app.services.call_tracer import payload_hash
+        span = self._take("tts", payload_hash(input))
+        return SimpleNamespace(content=b"\xff" * ((span or {}).get("bytes") or 4096))
+
+    def _transcribe(self, model: str, file, **kwargs):
+        self._take("stt", None)
+        return SimpleNamespace(text="", language=kwargs.get("language"))
+
+
+# Replay
+
+def _configure_environment(trace_dir: str):
+    # Read once by Settings, so set before importing the app
+    os.environ["OPENAI_API_KEY"] = "replay"
+    os.environ["TTS_PROVIDER"] = "openai"
+    os.environ["TTS_FALLBACK_PROVIDERS"] = ""
+    os.environ["TRACE_ENABLED"] = "true"
+    os.environ["TRACE_DIR"] = trace_dir
+
+
+def _trace_files(paths: List[str]) -> List[Path]:
+    files: List[Path] = []
+    for p in map(Path, paths):
+        files.extend(sorted(p.glob("*.jsonl")) if p.is_dir() else [p])
+    return files
+
+
+def _receive(ws, log: List[tuple]):
+    from app.voice.framing import FRAME_AUDIO_END, FRAME_AUDIO_OUT, parse_frame
+    while True:
+        try:
+            message = ws.receive()
+        except Exception:
+            return
+        now = time.perf_counter()
+        if message.get("type") == "websocket.close":
+            return
+        if message.get("bytes") is not None:
+            frame_type = parse_frame(message["bytes"]).frame_type
+            if frame_type == FRAME_AUDIO_OUT:
+                log.append((now, "audio"))
+            elif frame_type == FRAME_AUDIO_END:
+                log.append((now, "audio_end"))
+        elif message.get("text") is not None:
+            if json.loads(message["text"]).get("type") == "response":
+                log.append((now, "response"))
+
+
+def replay_one(client, fake: FakeOpenAI, tracer, path: Path, speed: float, index: int) -> Dict[str, Any]:
+    from app.services.call_tracer import CallTracer
+    from app.voice.framing import FRAME_AUDIO_IN, FRAME_HEADER
+    from app.voice.jitter_buffer import SILENCE_BYTES
+
+    events = CallTracer.load(path)
+    start = next((e for e in events if e["kind"] == "start"), {})
+    tenant_id = start.get("tenant_id") or "default"
+    call_id = f"replay_{index}_{start.get('call_id', path.stem)}"
+    fake.recorded = RecordedLatencies(events, speed)
+
+    client.post("/call/start", json={"caller_number": "+10000000000", "call_id": call_id, "tenant_id": tenant_id})
+    finals: List[float] = []
+    received: List[tuple] = []
+    with client.websocket_connect(f"/call/stream?call_id={call_id}&tenant_id={tenant_id}") as ws:
+        receiver = threading.Thread(target=_receive, args=(ws, received), daemon=True)
+        receiver.start()
+        origin = time.perf_counter()
+        inputs = sorted((e for e in events if e["kind"] in ("frame_in", "partial", "final")), key=lambda e: e["t_us"])
+        for e in inputs:
+            delay = origin + e["t_us"] / 1e6 / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if e["kind"] == "frame_in":
+                payload = bytes([SILENCE_BYTES.get(e["codec"], 0)]) * e["bytes"]
+                ws.send_bytes(FRAME_HEADER.pack(FRAME_AUDIO_IN, e["codec"], e["seq"], e["ts_us"]) + payload)
+            elif e["kind"] == "partial":
+                ws.send_text(json.dumps({"type": "partial", "text": e["text"]}))
+            else:
+                finals.append(time.perf_counter())
+                ws.send_text(json.dumps({"text": e["text"]}))
+        # Let the last turn finish, including its audio
+        deadline = time.perf_counter() + 30
+        while time.perf_counter() < deadline and sum(k == "audio_end" for _, k in received) < len(finals):
+            if sum(k == "response" for _, k in received) >= len(finals) and time.perf_counter() - received[-1][0] > 2:
+                break
+            time.sleep(0.01)
+    client.post("/call/end", json={"call_id": call_id})
+    tracer.flush()
+
+    stages: Dict[str, List[float]] = defaultdict(list)
+    # Turns are answered in order: attribute each reply and its audio to the latest final sent before it
+    turn = -1
+    seen = set()
+    for at, kind in sorted(received):
+        if kind == "response":
+            turn += 1
+        if turn < 0 or turn >= len(finals):
+            continue
+        stage = {"response": "response_ms", "audio": "first_audio_ms", "audio_end": "audio_end_ms"}[kind]
+        if (turn, stage) not in seen:
+            seen.add((turn, stage))
+            stages[stage].append((at - finals[turn]) * 1000)
+    stages.update(_server_stages(Path(tracer.trace_dir) / f"{call_id}.jsonl"))
+    return {"trace": str(path), "call_id": call_id, "turns": len(finals), "stages": dict(stages)}
+
+
+def _server_stages(path: Path) -> Dict[str, List[float]]:
+    from app.services.call_tracer import CallTracer
+    stages: Dict[str, List[float]] = defaultdict(list)
+    if not path.exists():
+        return stages
+    final_at: Optional[int] = None
+    for e in CallTracer.load(path):
+        if e["kind"] == "final":
+            final_at = e["t_us"]
+        elif e["kind"] == "response" and final_at is not None:
+            stages["turn_ms"].append((e["t_us"] - final_at) / 1000)
+            final_at = None
+        elif e["kind"] == "span" and e["stage"] in SPAN_STAGES:
+            stages[f"{e['stage']}_ms"].append(e["dur_us"] / 1000)
+    return stages
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "p50": round(statistics.median(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "mean": round(statistics.fmean(ordered), 3),
+        "max": round(ordered[-1], 3)
+    }
+
+
+def run(args) -> int:
+    trace_dir = tempfile.mkdtemp(prefix="replay_traces_")
+    _configure_environment(trace_dir)
+    from fastapi.testclient import TestClient
+    from app.container import container
+    from app.main import app
+
+    fake = FakeOpenAI()
+    container.__dict__["openai_client"] = fake
+    files = _trace_files(args.traces)
+    if not files:
+        print("No traces found")
+        return 1
+
+    calls = []
+    with TestClient(app) as client:
+        container.warm.wait(60)
+        for i, path in enumerate(files):
+            for repeat in range(args.repeat):
+                result = replay_one(client, fake, container.call_tracer, path, args.speed, i * args.repeat + repeat)
+                calls.append(result)
+                print(f"{path.name}: {result['turns']} turns replayed")
+
+    merged: Dict[str, List[float]] = defaultdict(list)
+    for call in calls:
+        for stage, values in call["stages"].items():
+            merged[stage].extend(values)
+    report = {
+        "speed": args.speed,
+        "replayed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "calls": calls,
+        "summary": {stage: summarize(values) for stage, values in sorted(merged.items()) if values}
+    }
+    _print_summary(report["summary"])
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.out}")
+    return 0
+
+
+def _print_summary(summary: Dict[str, Dict[str, float]]):
+    print(f"\n{'stage':<16}{'n':>6}{'p50':>10}{'p95':>10}{'mean':>10}")
+    for stage, s in summary.items():
+        print(f"{stage:<16}{s['n']:>6}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['mean']:>10.1f}")
+
+
+def diff(args) -> int:
+    a = json.loads(Path(args.before).read_text())
+    b = json.loads(Path(args.after).read_text())
+    if a["speed"] != b["speed"]:
+        print(f"Warning: replayed at different speeds ({a['speed']}x vs {b['speed']}x)")
+    print(f"{'stage':<16}{'p50 before':>12}{'p50 after':>12}{'Δ%':>8}{'p95 before':>12}{'p95 after':>12}{'Δ%':>8}")
+    regressed = []
+    for stage in sorted(set(a["summary"]) | set(b["summary"])):
+        sa, sb = a["summary"].get(stage), b["summary"].get(stage)
+        if not sa or not sb:
+            print(f"{stage:<16}  only in {'before' if sa else 'after'}")
+            continue
+        row = [stage]
+        for q in ("p50", "p95"):
+            change = (sb[q] - sa[q]) / sa[q] * 100 if sa[q] else 0.0
+            row += [sa[q], sb[q], change]
+            if args.fail_over is not None and change > args.fail_over:
+                regressed.append(f"{stage} {q} +{change:.1f}%")
+        print("{:<16}{:>12.1f}{:>12.1f}{:>+8.1f}{:>12.1f}{:>12.1f}{:>+8.1f}".format(*row))
+    if regressed:
+        print("Regressed: " + ", ".join(regressed))
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="replay traces and report per-stage latencies")
+    run_parser.add_argument("traces", nargs="+", help="trace files or directories of them")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="time compression factor (1 = real time)")
+    run_parser.add_argument("--repeat", type=int, default=1, help="replays per trace")
+    run_parser.add_argument("--out", help="write the report as JSON")
+    diff_parser = sub.add_parser("diff", help="compare two reports")
+    diff_parser.add_argument("before")
+    diff_parser.add_argument("after")
+    diff_parser.add_argument("--fail-over", type=float, help="exit 1 if a stage's p50 or p95 grew by more than this %%")
+    args = parser.parse_args()
+    return run(args) if args.command == "run" else diff(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
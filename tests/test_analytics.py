@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db.database import Database
+from app.services.analytics_service import CallAnalyticsJob, local_naive
+
+
+def ended_call(call_id: str, end_time: datetime, intents=("faq",), escalated=False) -> dict:
+    return {
+        "call_id": call_id,
+        "status": "ended",
+        "start_time": end_time - timedelta(minutes=3),
+        "end_time": end_time,
+        "duration": 180.0,
+        "intents": list(intents),
+        "escalated": escalated,
+        "turns": 4,
+        "sentiment": "neutral"
+    }
+
+
+def make_job(tmp_path, calls) -> CallAnalyticsJob:
+    database = Database()
+    for call in calls:
+        database.calls[call["call_id"]] = call
+    return CallAnalyticsJob(database, output_dir=str(tmp_path))
+
+
+def test_aware_window_matches_naive_local_end_times(tmp_path):
+    now = datetime.now().replace(microsecond=0)
+    job = make_job(tmp_path, [
+        ended_call("old", now - timedelta(days=2)),
+        ended_call("recent", now - timedelta(hours=1), escalated=True)
+    ])
+    since = (now - timedelta(days=1)).astimezone(timezone.utc)
+
+    summary = job.run(since=since)
+
+    assert summary["calls"] == 1
+    assert summary["window"]["since"] == (now - timedelta(days=1)).isoformat()
+    assert job.last_summary is summary
+
+
+def test_naive_window_unchanged(tmp_path):
+    now = datetime.now()
+    job = make_job(tmp_path, [ended_call("a", now - timedelta(hours=2)), ended_call("b", now)])
+    assert job.run(until=now - timedelta(hours=1))["calls"] == 1
+
+
+def test_local_naive():
+    assert local_naive(None) is None
+    naive = datetime(2026, 1, 1, 12)
+    assert local_naive(naive) is naive
+    aware = naive.astimezone(timezone.utc)
+    assert local_naive(aware) == naive
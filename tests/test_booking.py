@@ -0,0 +1,116 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.database import Database
+from app.services.booking_service import BookingService, IntervalIndex, SlotUnavailableError
+
+
+def next_weekday(hour: int) -> datetime:
+    day = datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+class RacingDatabase(Database):
+    """Lets another caller commit a booking just before our first commit lands"""
+
+    def __init__(self, competing):
+        super().__init__()
+        self.competing = competing
+
+    def commit_schedule(self, resource, expected_version, schedule, booking=None):
+        competing, self.competing = self.competing, None
+        if competing is not None:
+            version, index = self.get_schedule(resource)
+            index = (index or IntervalIndex()).with_interval(competing[0], competing[1], "apt_other")
+            assert super().commit_schedule(resource, version, index)
+        return super().commit_schedule(resource, expected_version, schedule, booking)
+
+
+def test_lost_race_rechecks_and_retries():
+    start = next_weekday(10)
+    database = RacingDatabase((start + timedelta(hours=1), start + timedelta(hours=2)))
+    service = BookingService(database)
+
+    booking = service.book(start)
+
+    assert booking["start"] == start
+    assert service.retries == 1
+    version, index = database.get_schedule("default")
+    assert version == 2
+    assert index.ids == [booking["booking_id"], "apt_other"]
+
+
+def test_lost_race_for_same_slot_is_a_conflict():
+    start = next_weekday(10)
+    database = RacingDatabase((start, start + timedelta(minutes=30)))
+    service = BookingService(database)
+
+    with pytest.raises(SlotUnavailableError):
+        service.book(start)
+    assert service.retries == 1
+    assert service.conflicts == 1
+
+
+def test_concurrent_bookings_never_share_a_slot():
+    start = next_weekday(11)
+    service = BookingService(Database())
+    barrier = threading.Barrier(8)
+    results = []
+
+    def book():
+        barrier.wait()
+        try:
+            results.append(service.book(start)["booking_id"])
+        except SlotUnavailableError:
+            results.append(None)
+
+    threads = [threading.Thread(target=book) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len([r for r in results if r]) == 1
+    assert len(service._index("default")[1]) == 1
+
+
+def test_falls_through_to_a_free_resource():
+    start = next_weekday(10)
+    service = BookingService(Database(), resources=("alice", "bob"))
+    first = service.book(start)
+    second = service.book(start)
+    assert {first["resource"], second["resource"]} == {"alice", "bob"}
+    with pytest.raises(SlotUnavailableError):
+        service.book(start)
+
+
+def test_cancel_frees_the_slot():
+    start = next_weekday(10)
+    service = BookingService(Database())
+    booking = service.book(start)
+    assert service.cancel(booking["booking_id"])
+    assert not service.cancel(booking["booking_id"])
+    assert service.book(start)["start"] == start
+
+
+def test_rejects_times_outside_hours():
+    service = BookingService(Database())
+    with pytest.raises(SlotUnavailableError):
+        service.book(next_weekday(8))
+    with pytest.raises(SlotUnavailableError):
+        service.book(next_weekday(16) + timedelta(minutes=45))
+
+
+def test_next_available_skips_busy_run():
+    start = next_weekday(9)
+    service = BookingService(Database())
+    for i in range(4):
+        service.book(start + i * timedelta(minutes=30))
+
+    slots = service.next_available(after=start, count=2)
+
+    assert [s["start"] for s in slots] == [start + timedelta(hours=2), start + timedelta(hours=2, minutes=30)]
@@ -0,0 +1,141 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.container import container
+from app.services.admission_service import AdmissionController
+from app.main import app
+from app.voice.dsp import InboundDecoder
+from app.voice.framing import (
+    CODEC_MP3, CODEC_MULAW, CODEC_PCM16, FRAME_AUDIO_END, FRAME_AUDIO_IN, FRAME_AUDIO_OUT, FRAME_HEADER,
+    parse_frame
+)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def eventually(condition, timeout: float = 2.0) -> bool:
+    # The server finishes its teardown after the client side of the socket closes
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def say(ws, text: str) -> dict:
+    ws.send_json({"type": "final", "text": text})
+    return ws.receive_json()
+
+
+def test_stream_without_session_forgets_sentiment(client):
+    with client.websocket_connect("/call/stream?call_id=orphan_stream") as ws:
+        assert say(ws, "I am really angry about my bill")["type"] == "response"
+        assert "orphan_stream" in container.sentiment_service.trajectories
+    assert eventually(lambda: "orphan_stream" not in container.sentiment_service.trajectories)
+
+
+def test_session_sentiment_kept_until_call_end(client):
+    call_id = client.post("/call/start", json={"caller_number": "+15550100", "call_id": "session_call"}).json()["call_id"]
+    with client.websocket_connect(f"/call/stream?call_id={call_id}") as ws:
+        say(ws, "I am really angry about my bill")
+    # The caller may reconnect; the session still owns the trajectory
+    assert not eventually(lambda: call_id not in container.sentiment_service.trajectories, timeout=0.2)
+    assert client.post("/call/end", json={"call_id": call_id}).status_code == 200
+    assert call_id not in container.sentiment_service.trajectories
+
+
+def test_prompt_synthesized_when_not_presynthesized(client, monkeypatch):
+    rendered = []
+
+    def synthesize_speech(text, voice_id=None, language="en"):
+        rendered.append(text)
+        return {"audio": b"prompt-audio", "format": "mp3", "success": True}
+
+    monkeypatch.setattr(container.tts_service, "synthesize_speech", synthesize_speech)
+    assert not container.workflow_engine.workflow.audio
+    with client.websocket_connect("/call/stream?tenant_id=default") as ws:
+        response = say(ws, "blorp")
+        assert response["action"] == "ask_clarification"
+        audio = parse_frame(ws.receive_bytes())
+        assert audio.frame_type == FRAME_AUDIO_OUT
+        assert bytes(audio.payload) == b"prompt-audio"
+        assert parse_frame(ws.receive_bytes()).frame_type == FRAME_AUDIO_END
+    assert rendered == [response["text"]]
+
+
+def test_empty_transcript_does_not_reset_silence_timer(client):
+    call_id = client.post("/call/start", json={"caller_number": "+15550101", "call_id": "quiet_call"}).json()["call_id"]
+    timers = container.call_lifecycle.calls[call_id]
+    try:
+        with client.websocket_connect(f"/call/stream?call_id={call_id}") as ws:
+            assert eventually(lambda: timers.silence is not None)
+            deadline = timers.silence.deadline
+            time.sleep(0.25)  # let the wheel move past a few ticks
+            ws.send_json({"type": "partial", "text": "  "})
+            ws.send_json({"type": "partial", "text": ""})
+            assert not eventually(lambda: timers.silence.deadline != deadline, timeout=0.2)
+            ws.send_json({"type": "partial", "text": "hello"})
+            assert eventually(lambda: timers.silence.deadline > deadline)
+    finally:
+        client.post("/call/end", json={"call_id": call_id})
+
+
+def audio_frame(codec: int, seq: int, payload: bytes = b"\xff" * 160) -> bytes:
+    return FRAME_HEADER.pack(FRAME_AUDIO_IN, codec, seq, seq * 20000) + payload
+
+
+@pytest.mark.parametrize("codec", [CODEC_MP3, 9])
+def test_undecodable_inbound_codec_closes_stream(client, codec):
+    with client.websocket_connect("/call/stream") as ws:
+        ws.send_bytes(audio_frame(codec, 0))
+        assert ws.receive_json() == {"type": "error", "error": f"Unsupported inbound codec: {codec}"}
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1003
+
+
+def test_codec_change_mid_stream_drops_frame(client):
+    with client.websocket_connect("/call/stream") as ws:
+        ws.send_bytes(audio_frame(CODEC_MULAW, 0))
+        ws.send_bytes(audio_frame(CODEC_PCM16, 1, b"\x00" * 320))
+        error = ws.receive_json()
+        assert error["type"] == "error"
+        assert "Codec changed mid-stream" in error["error"]
+        # The stream stays open for the original codec
+        ws.send_bytes(audio_frame(CODEC_MULAW, 1))
+        ws.send_json({"type": "final", "text": "hello"})
+        assert ws.receive_json()["frames_received"] == 2
+
+
+def test_decoder_rejects_outbound_codecs():
+    with pytest.raises(ValueError):
+        InboundDecoder(CODEC_MP3)
+
+
+def test_held_call_gets_retry_after_and_hold_audio(client, monkeypatch):
+    controller = AdmissionController(shed_action="hold", tenant_quotas="default=1", retry_after_s=7)
+    controller.hold_audio[None] = b"hold-audio"
+    assert controller.try_acquire("occupant")["admitted"]
+    monkeypatch.setitem(container.__dict__, "admission_controller", controller)
+
+    response = client.post("/call/start", json={"caller_number": "+15550100", "call_id": "held_call"})
+    assert response.status_code == 200
+    assert response.headers["Retry-After"] == "7"
+    body = response.json()
+    assert body["status"] == "shed" and body["action"] == "hold" and body["retry_after"] == 7
+
+    audio = client.get(body["hold_audio_url"])
+    assert audio.status_code == 200
+    assert audio.headers["content-type"] == "audio/mpeg"
+    assert audio.content == b"hold-audio"
+
+    controller.hold_audio.clear()
+    assert client.get("/call/hold_audio?tenant_id=default").status_code == 404
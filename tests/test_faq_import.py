@@ -0,0 +1,198 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import get_faq_importer, get_tenant_registry
+from app.db.database import Database
+from app.routes import faqs
+from app.services.faq_import import FAQImporter, FAQImportError
+from app.services.tenant_service import TenantRegistry
+
+
+async def stream(body: bytes, chunk: int = 7):
+    # Small chunks split rows (and multi-byte characters) across reads
+    for i in range(0, len(body), chunk):
+        yield body[i:i + chunk]
+
+
+def ndjson(rows) -> bytes:
+    return "\n".join(json.dumps(r) for r in rows).encode("utf-8")
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return TenantRegistry(tenants_dir=str(tmp_path), prompts_dir=str(tmp_path), database=Database())
+
+
+@pytest.fixture
+def importer(registry):
+    return FAQImporter(registry.database, registry, batch_size=2)
+
+
+def run_import(importer, body: bytes, **kwargs):
+    return asyncio.run(importer.import_stream("default", stream(body), **kwargs))
+
+
+def test_ndjson_import_dedupes_and_reports_bad_rows(importer, registry):
+    body = ndjson([
+        {"question": "What are your hours?", "answer": "9 to 5"},
+        {"question": "what are your HOURS", "answer": "9 to 6"},
+        {"question": "Do you deliver?", "answer": "Yes, café orders too"},
+        {"question": "", "answer": "no question"},
+        {"question": "Price?", "answer": "Ten", "frequency": "often"}
+    ]) + b"\n{not json"
+
+    result = run_import(importer, body)
+
+    assert result["rows"] == 6
+    assert result["imported"] == 2
+    assert result["duplicates"] == 1
+    assert result["invalid"] == 3
+    assert [e["row"] for e in result["errors"]] == [4, 5, 6]
+    index = registry.get("default").faq_index
+    assert result["total_faqs"] == len(index) == 2
+    # A later row replaces an earlier one with the same question
+    assert index.search("hours", 1)[0]["answer"] == "9 to 6"
+    assert index.search("deliver", 1)[0]["answer"] == "Yes, café orders too"
+
+
+def test_csv_import_handles_quoted_newlines(importer, registry):
+    body = 'question,answer,category\n"Where are you?","12 Main St\nSuite 4",location\nParking?,Free,location\n'
+
+    result = run_import(importer, body.encode("utf-8"), fmt="csv")
+
+    assert result["imported"] == 2
+    answers = {f["question"]: f["answer"] for f in registry.get("default").faq_index.faqs}
+    assert answers == {"Where are you?": "12 Main St\nSuite 4", "Parking?": "Free"}
+
+
+def test_csv_without_required_columns_is_rejected(importer):
+    with pytest.raises(FAQImportError):
+        run_import(importer, b"q,a\nx,y\n", fmt="csv")
+
+
+def test_merge_upserts_and_replace_drops(importer, registry):
+    run_import(importer, ndjson([{"question": "A one?", "answer": "1"}, {"question": "B two?", "answer": "2"}]))
+
+    merged = run_import(importer, ndjson([{"question": "a one", "answer": "uno"}, {"question": "C three?", "answer": "3"}]))
+    assert merged["total_faqs"] == 3
+    assert merged["replaced_existing"] == 1
+
+    replaced = run_import(importer, ndjson([{"question": "D four?", "answer": "4"}]), mode="replace")
+    assert replaced["total_faqs"] == 1
+    assert [f["question"] for f in registry.get("default").faq_index.faqs] == ["D four?"]
+
+
+def test_embeddings_batched_and_failures_counted(registry):
+    calls = []
+
+    def embedder(texts):
+        calls.append(list(texts))
+        if "Bad?" in texts:
+            raise RuntimeError("rate limited")
+        return [[float(len(t))] for t in texts]
+
+    importer = FAQImporter(registry.database, registry, embedder=embedder, batch_size=2)
+    rows = [{"question": q, "answer": "x"} for q in ("One?", "Two?", "Three?", "Bad?", "Five?")]
+
+    result = run_import(importer, ndjson(rows))
+
+    assert sorted(len(c) for c in calls) == [1, 2, 2]
+    assert result["embedded"] == 3
+    assert result["embed_failed"] == 2
+    stored = {f["question"]: f for f in registry.database.get_faqs("default")}
+    assert stored["One?"]["embedding"].tolist() == [4.0]
+    assert "embedding" not in stored["Bad?"]
+
+
+def test_unknown_tenant(importer):
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(importer.import_stream("nope", stream(b"")))
+
+
+@pytest.fixture
+def client(registry, importer):
+    app = FastAPI()
+    app.include_router(faqs.router)
+    app.dependency_overrides[get_tenant_registry] = lambda: registry
+    app.dependency_overrides[get_faq_importer] = lambda: importer
+    return TestClient(app)
+
+
+def test_import_route_and_paginated_listing(client):
+    rows = [
+        {"question": f"Question {i}?", "answer": str(i), "category": "even" if i % 2 == 0 else "odd"}
+        for i in range(7)
+    ]
+    imported = client.post("/faqs/import", content=ndjson(rows), headers={"content-type": "application/x-ndjson"})
+    assert imported.status_code == 200
+    assert imported.json()["imported"] == 7
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/faqs/all", params=params).json()
+        seen.extend(f["answer"] for f in page["faqs"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [str(i) for i in range(7)]
+
+    even = client.get("/faqs/all", params={"category": "even", "limit": 2}).json()
+    assert [f["answer"] for f in even["faqs"]] == ["0", "2"]
+    rest = client.get("/faqs/all", params={"category": "even", "limit": 2, "cursor": even["next_cursor"]}).json()
+    assert [f["answer"] for f in rest["faqs"]] == ["4", "6"]
+    assert rest["next_cursor"] is None
+
+
+def test_listing_etag_and_cursor_errors(client):
+    client.post("/faqs/import", content=ndjson([{"question": "Hours?", "answer": "9-5"}]))
+    first = client.get("/faqs/all")
+    etag = first.headers["etag"]
+    assert client.get("/faqs/all", headers={"if-none-match": etag}).status_code == 304
+
+    assert client.get("/faqs/all", params={"cursor": "!!!"}).status_code == 400
+    assert client.get("/faqs/all", params={"cursor": faqs._encode_cursor("stale", 1)}).status_code == 410
+
+    client.post("/faqs/import", content=ndjson([{"question": "Parking?", "answer": "Free"}]))
+    assert client.get("/faqs/all", headers={"if-none-match": etag}).status_code == 200
+
+
+def test_cursor_invalidated_when_set_changes(client):
+    client.post("/faqs/import", content=ndjson([{"question": f"Q{i}?", "answer": str(i)} for i in range(3)]))
+    cursor = client.get("/faqs/all", params={"limit": 1}).json()["next_cursor"]
+    client.post("/faqs/import", content=ndjson([{"question": "New?", "answer": "n"}]))
+    assert client.get("/faqs/all", params={"limit": 1, "cursor": cursor}).status_code == 410
+
+
+def test_pagination_with_duplicate_and_missing_ids(client, registry):
+    # Ids come from callers and files: they may repeat or be absent
+    faqs_with_odd_ids = [
+        {"id": "dup", "question": "First?", "answer": "1"},
+        {"id": "dup", "question": "Second?", "answer": "2"},
+        {"question": "Third?", "answer": "3"},
+        {"id": None, "question": "Fourth?", "answer": "4"},
+        {"id": "dup", "question": "Fifth?", "answer": "5"}
+    ]
+    registry.database.replace_faqs("default", faqs_with_odd_ids)
+    registry.reload_faqs("default")
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/faqs/all", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(f["answer"] for f in page["faqs"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["1", "2", "3", "4", "5"]
+
+
+def test_import_route_errors(client):
+    assert client.post("/faqs/import", params={"tenant_id": "nope"}, content=b"").status_code == 404
+    assert client.post("/faqs/import", params={"format": "xml"}, content=b"x").status_code == 400
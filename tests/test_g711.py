@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from app.voice import dsp
+
+audioop = pytest.importorskip("audioop")
+
+ALL_CODES = bytes(range(256))
+ALL_PCM = np.arange(-32768, 32768, dtype=np.int16).tobytes()
+
+
+def test_mulaw_decode_matches_reference():
+    assert dsp.mulaw_decode(ALL_CODES).tobytes() == audioop.ulaw2lin(ALL_CODES, 2)
+
+
+def test_mulaw_encode_matches_reference():
+    assert dsp.mulaw_encode(ALL_PCM).tobytes() == audioop.lin2ulaw(ALL_PCM, 2)
+
+
+def test_alaw_decode_matches_reference():
+    assert dsp.alaw_decode(ALL_CODES).tobytes() == audioop.alaw2lin(ALL_CODES, 2)
+
+
+def test_alaw_encode_matches_reference():
+    assert dsp.alaw_encode(ALL_PCM).tobytes() == audioop.lin2alaw(ALL_PCM, 2)
+
+
+@pytest.mark.parametrize("decode, encode", [
+    (dsp.mulaw_decode, dsp.mulaw_encode),
+    (dsp.alaw_decode, dsp.alaw_encode)
+])
+def test_decoded_codes_reencode_to_themselves(decode, encode):
+    codes = np.frombuffer(ALL_CODES, dtype=np.uint8)
+    roundtrip = encode(decode(codes))
+    if decode is dsp.mulaw_decode:
+        # 0x7F and 0xFF are both zero; zero encodes as 0xFF
+        codes = np.where(codes == 0x7F, 0xFF, codes)
+    assert np.array_equal(roundtrip, codes)
+
+
+def test_decode_writes_into_caller_buffer():
+    out = np.zeros(320, dtype=np.int16)
+    result = dsp.mulaw_decode(ALL_CODES[:160], out=out)
+    assert np.shares_memory(result, out)
+    assert result.size == 160
+    assert out[:160].tobytes() == audioop.ulaw2lin(ALL_CODES[:160], 2)
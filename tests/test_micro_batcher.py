@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.ai.micro_batcher import MicroBatcher
+
+
+def run_batch(batcher, items):
+    async def main():
+        return await asyncio.gather(*(batcher.submit(i) for i in items), return_exceptions=True)
+    return asyncio.run(main())
+
+
+class Recorder:
+    """Batch function that records every call and fails as configured"""
+
+    def __init__(self, poison=(), error=ValueError):
+        self.poison = set(poison)
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, items):
+        self.calls.append(list(items))
+        if self.poison.intersection(items):
+            raise self.error("bad batch")
+        return [i * 10 for i in items]
+
+
+def test_items_batched_into_one_call():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=8, max_wait=0.01)
+    assert run_batch(batcher, range(5)) == [0, 10, 20, 30, 40]
+    assert fn.calls == [[0, 1, 2, 3, 4]]
+    assert batcher.get_stats()["batches"] == 1
+
+
+def test_full_batch_flushes_immediately():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=3, max_wait=10)
+    assert run_batch(batcher, range(6)) == [0, 10, 20, 30, 40, 50]
+    assert fn.calls == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_poison_item_bisected_out():
+    fn = Recorder(poison={5})
+    batcher = MicroBatcher(fn, max_batch=8, max_wait=0.01)
+    results = run_batch(batcher, range(8))
+
+    assert isinstance(results[5], ValueError)
+    assert [r for i, r in enumerate(results) if i != 5] == [0, 10, 20, 30, 40, 60, 70]
+    assert [5] in fn.calls
+    stats = batcher.get_stats()
+    # Retried halves are not counted as new batches or items
+    assert stats["batches"] == 1
+    assert stats["items"] == 8
+    assert stats["failures"] == 1
+    assert stats["splits"] == 3
+
+
+def test_transport_error_fails_batch_once():
+    fn = Recorder(poison={0}, error=ConnectionError)
+    batcher = MicroBatcher(fn, max_batch=8, max_wait=0.01)
+    results = run_batch(batcher, range(8))
+
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert len(fn.calls) == 1
+    assert batcher.get_stats()["splits"] == 0
+    assert batcher.get_stats()["failures"] == 8
+
+
+def test_no_split_when_isolation_disabled():
+    fn = Recorder(poison={3})
+    batcher = MicroBatcher(fn, max_batch=4, max_wait=0.01, isolate_failures=False)
+    results = run_batch(batcher, range(4))
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(fn.calls) == 1
+
+
+def test_exception_result_fails_only_its_item():
+    def fn(items):
+        return [KeyError(i) if i == 1 else i for i in items]
+
+    batcher = MicroBatcher(fn, max_batch=4, max_wait=0.01)
+    results = run_batch(batcher, range(3))
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], KeyError)
+
+
+def test_missing_result_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:1], max_batch=4, max_wait=0.01, name="short")
+    results = run_batch(batcher, ["a", "b"])
+    assert results[0] == "a"
+    with pytest.raises(ValueError, match="short: no result for item 1"):
+        raise results[1]
+
+
+def test_malformed_reply_fails_callers_instead_of_hanging():
+    batcher = MicroBatcher(lambda items: None, max_batch=4, max_wait=0.01)
+    results = run_batch(batcher, range(4))
+    assert all(isinstance(r, TypeError) for r in results)
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from app.services.provider_router import CircuitBreaker, ProviderRouter, ProviderUnavailableError
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    # Let abandoned attempts finish so their threads exit
+    event.set()
+
+
+def test_hedge_wins_over_slow_primary(release):
+    router = ProviderRouter("t", ["slow", "fast"], latency_budget=0.02, ordered=True)
+
+    def fn(provider):
+        if provider == "slow":
+            release.wait(5)
+        return provider
+
+    assert router.call(fn) == "fast"
+    assert (router.hedges_sent, router.hedges_won) == (1, 1)
+
+
+def test_falls_back_after_failure():
+    router = ProviderRouter("t", ["a", "b"], ordered=True)
+
+    def fn(provider):
+        if provider == "a":
+            raise RuntimeError("down")
+        return provider
+
+    assert router.call(fn) == "b"
+    assert router.fallbacks == 1
+
+
+def test_deadline_raises_when_every_provider_hangs(release):
+    router = ProviderRouter("t", ["a", "b"], latency_budget=0.02, deadline=0.1)
+    start = time.monotonic()
+    with pytest.raises(ProviderUnavailableError, match="no response within 0.1s"):
+        router.call(lambda provider: release.wait(5))
+    assert time.monotonic() - start < 1
+    assert router.deadlines_missed == 1
+
+
+def test_without_deadline_waits_for_slow_success():
+    router = ProviderRouter("t", ["a"], latency_budget=0.01)
+    assert router.call(lambda provider: time.sleep(0.05) or "done") == "done"
+
+
+def test_half_open_admits_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.02)
+    breaker.record_failure()
+    assert not breaker.available()
+    time.sleep(0.03)
+    # Checking availability does not claim the trial
+    assert breaker.available() and breaker.state == "open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow_request()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.02)
+    breaker.record_failure()
+    time.sleep(0.03)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow_request()
+
+
+def test_ranking_skips_open_breakers():
+    router = ProviderRouter("t", ["a", "b"], failure_threshold=1, reset_timeout=60, ordered=True)
+    router.breakers["a"].record_failure()
+    assert router.ranked_providers() == ["b"]
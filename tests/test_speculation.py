@@ -0,0 +1,177 @@
+import asyncio
+import threading
+
+from app.ai.speculation import SpeculativeGenerator, normalize_utterance
+
+
+class FakeLLM:
+    """Echoes the text it was asked about; optionally blocks until released"""
+
+    def __init__(self, block: bool = False):
+        self.calls = []
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def generate_response(self, text, **kwargs):
+        self.calls.append(text)
+        self.release.wait(5)
+        return {"response": f"re: {text}", "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+
+
+def make(llm=None, stable_ms=10, **kwargs):
+    llm = llm or FakeLLM()
+    return llm, SpeculativeGenerator(llm, stable_ms=stable_ms, min_words=3, **kwargs)
+
+
+async def settle():
+    # Past the 10 ms stability window and the worker thread's reply
+    await asyncio.sleep(0.05)
+
+
+def test_normalize_ignores_case_punctuation_and_fillers():
+    assert normalize_utterance("Um, I'd like to BOOK... uh an appointment!") == "i'd like to book an appointment"
+
+
+def test_stable_partial_reused_by_matching_final():
+    llm, generator = make()
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("I need to book an appointment", intent="booking")
+        await settle()
+        return await turn.final("I need to book an appointment.", intent="booking")
+
+    result = asyncio.run(main())
+    assert result["response"] == "re: I need to book an appointment"
+    assert llm.calls == ["I need to book an appointment"]
+    stats = generator.get_stats()
+    assert (stats["started"], stats["hits"], stats["misses"]) == (1, 1, 0)
+    assert stats["hit_rate"] == 1.0
+    assert stats["wasted_tokens"] == 0
+
+
+def test_different_final_is_a_miss_and_wastes_tokens():
+    llm, generator = make()
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("I need to book an appointment")
+        await settle()
+        result = await turn.final("I need to cancel my appointment")
+        await settle()
+        return result
+
+    result = asyncio.run(main())
+    assert result["response"] == "re: I need to cancel my appointment"
+    assert llm.calls == ["I need to book an appointment", "I need to cancel my appointment"]
+    stats = generator.get_stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+    assert stats["wasted_tokens"] == 15
+
+
+def test_routing_args_are_part_of_the_match():
+    llm, generator = make()
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("what time do you open", intent="faq", intent_confidence=0.9)
+        await settle()
+        return await turn.final("what time do you open", intent="faq", intent_confidence=0.2)
+
+    asyncio.run(main())
+    assert len(llm.calls) == 2
+    assert generator.get_stats()["misses"] == 1
+
+
+def test_changing_partial_restarts_the_stability_window():
+    llm, generator = make(stable_ms=100)
+
+    async def main():
+        turn = generator.turn()
+        for text in ("I want", "I want to check", "I want to check my order", "I want to check my order status"):
+            turn.partial(text)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        return await turn.final("I want to check my order status")
+
+    asyncio.run(main())
+    # Only the last hypothesis held still long enough; the two-word one was too short anyway
+    assert llm.calls == ["I want to check my order status"]
+    assert generator.get_stats()["hits"] == 1
+
+
+def test_superseded_speculation_is_counted():
+    llm, generator = make()
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("I want to check my order")
+        await settle()
+        turn.partial("I want to check my order status please")
+        await settle()
+        return await turn.final("I want to check my order status please")
+
+    asyncio.run(main())
+    stats = generator.get_stats()
+    assert (stats["started"], stats["superseded"], stats["hits"]) == (2, 1, 1)
+
+
+def test_final_before_stability_generates_directly():
+    llm, generator = make()
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("I need to book an appointment")
+        return await turn.final("I need to book an appointment")
+
+    asyncio.run(main())
+    assert llm.calls == ["I need to book an appointment"]
+    assert generator.get_stats()["started"] == 0
+
+
+def test_hit_waits_for_in_flight_speculation():
+    llm, generator = make(FakeLLM(block=True))
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("I need to book an appointment")
+        await settle()
+        final = asyncio.ensure_future(turn.final("I need to book an appointment"))
+        await asyncio.sleep(0.01)
+        assert not final.done()
+        llm.release.set()
+        return await final
+
+    assert asyncio.run(main())["response"] == "re: I need to book an appointment"
+    assert len(llm.calls) == 1
+
+
+def test_cancel_counts_unused():
+    llm, generator = make()
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("I need to book an appointment")
+        await settle()
+        turn.cancel()
+        await settle()
+
+    asyncio.run(main())
+    stats = generator.get_stats()
+    assert stats["unused"] == 1
+    assert stats["wasted_tokens"] == 15
+
+
+def test_disabled_never_speculates():
+    llm, generator = make(enabled=False)
+
+    async def main():
+        turn = generator.turn()
+        turn.partial("I need to book an appointment")
+        await settle()
+        return await turn.final("I need to book an appointment")
+
+    asyncio.run(main())
+    assert generator.get_stats()["started"] == 0
+    assert len(llm.calls) == 1
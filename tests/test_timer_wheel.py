@@ -0,0 +1,97 @@
+from app.services.timer_wheel import TimerWheel
+
+
+def make_wheel(**kwargs):
+    # Integer-second ticks starting at t=0 keep the arithmetic exact
+    return TimerWheel(tick=1.0, now=0, **kwargs)
+
+
+def test_fires_on_its_tick():
+    wheel = make_wheel()
+    fired = []
+    wheel.schedule(5, fired.append, "a")
+    assert wheel.advance(4) == 0
+    assert wheel.advance(5) == 1
+    assert fired == ["a"]
+    assert wheel.count == 0
+
+
+def test_delay_rounds_up_to_whole_ticks():
+    wheel = make_wheel()
+    fired = []
+    wheel.schedule(2.1, fired.append, "a")
+    wheel.advance(2)
+    assert fired == []
+    wheel.advance(3)
+    assert fired == ["a"]
+
+
+def test_cancelled_timer_never_fires():
+    wheel = make_wheel()
+    fired = []
+    timer = wheel.schedule(3, fired.append, "a")
+    timer.cancel()
+    assert not timer.active
+    assert wheel.advance(10) == 0
+    assert fired == []
+
+
+def test_extend_refiles_instead_of_firing():
+    wheel = make_wheel()
+    fired = []
+    timer = wheel.schedule(5, fired.append, "a")
+    wheel.advance(3)
+    timer.extend(5)
+    wheel.advance(5)
+    assert fired == []
+    assert wheel.refiled == 1
+    wheel.advance(8)
+    assert fired == ["a"]
+
+
+def test_extend_never_moves_deadline_earlier():
+    wheel = make_wheel()
+    timer = wheel.schedule(10, lambda: None)
+    timer.extend(2)
+    assert timer.deadline == 10
+
+
+def test_long_delays_cascade_down_levels():
+    wheel = make_wheel(slots=8, levels=3)
+    fired = []
+    for delay in (7, 8, 9, 63, 64, 100, 300):
+        wheel.schedule(delay, fired.append, delay)
+    for now in range(1, 512):
+        wheel.advance(now)
+        assert all(d <= now for d in fired)
+    assert fired == [7, 8, 9, 63, 64, 100, 300]
+
+
+def test_delay_capped_at_wheel_range():
+    wheel = make_wheel(slots=8, levels=2)
+    fired = []
+    wheel.schedule(1000, fired.append, "a")
+    wheel.advance(63)
+    assert fired == ["a"]
+
+
+def test_callback_may_cancel_timer_in_same_bucket():
+    wheel = make_wheel()
+    fired = []
+    timers = {}
+
+    def fire(name, other):
+        fired.append(name)
+        timers[other].cancel()
+
+    timers["a"] = wheel.schedule(2, fire, "a", "b")
+    timers["b"] = wheel.schedule(2, fire, "b", "a")
+    assert wheel.advance(2) == 1
+    assert len(fired) == 1
+    assert wheel.count == 0
+
+
+def test_idle_wheel_jumps_to_target():
+    wheel = make_wheel()
+    assert wheel.advance(1_000_000) == 0
+    assert wheel.current == 1_000_000
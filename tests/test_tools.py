@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+
+from pydantic import BaseModel
+
+from app.ai import tools
+from app.ai.tools import ToolRegistry, current_tenant
+from app.container import container
+from app.services.tenant_service import TenantRegistry
+
+
+class QueryArgs(BaseModel):
+    query: str
+
+
+def make_registry():
+    registry = ToolRegistry()
+    seen = {}
+
+    @registry.tool("lookup", "Sync lookup", QueryArgs, cache_ttl=60)
+    def lookup(args):
+        seen["thread"] = threading.get_ident()
+        seen["tenant"] = current_tenant.get()
+        return {"answer": args.query.upper()}
+
+    @registry.tool("broken", "Always fails", QueryArgs)
+    def broken(args):
+        raise RuntimeError("backend down")
+
+    @registry.tool("async_lookup", "Async lookup", QueryArgs)
+    async def async_lookup(args):
+        return {"answer": args.query}
+
+    return registry, seen
+
+
+def test_sync_handler_runs_off_the_event_loop_with_context():
+    registry, seen = make_registry()
+
+    async def main():
+        token = current_tenant.set("acme")
+        try:
+            return await registry.execute("lookup", '{"query": "hours"}'), threading.get_ident()
+        finally:
+            current_tenant.reset(token)
+
+    result, loop_thread = asyncio.run(main())
+    assert result == {"answer": "HOURS"}
+    assert seen["thread"] != loop_thread
+    assert seen["tenant"] == "acme"
+
+
+def test_handler_exception_becomes_error_result():
+    registry, _ = make_registry()
+    result = asyncio.run(registry.execute("broken", {"query": "x"}))
+    assert result == {"error": "broken failed: backend down"}
+
+
+def test_invalid_and_unknown_tools():
+    registry, _ = make_registry()
+    assert "Invalid arguments" in asyncio.run(registry.execute("lookup", "{}"))["error"]
+    assert asyncio.run(registry.execute("missing", {}))["error"] == "Unknown tool: missing"
+
+
+def test_results_cached_per_arguments():
+    registry, seen = make_registry()
+    asyncio.run(registry.execute("lookup", {"query": "a"}))
+    seen.clear()
+    assert asyncio.run(registry.execute("lookup", {"query": "a"})) == {"answer": "A"}
+    assert seen == {}
+    asyncio.run(registry.execute("lookup", {"query": "b"}))
+    assert "thread" in seen
+
+
+def test_async_handler():
+    registry, _ = make_registry()
+    assert asyncio.run(registry.execute("async_lookup", {"query": "q"})) == {"answer": "q"}
+
+
+def test_business_hours_are_per_tenant(tmp_path, monkeypatch):
+    for tenant_id, hours in (("acme", "Mon-Sat 8-8"), ("globex", "24/7")):
+        (tmp_path / tenant_id).mkdir()
+        (tmp_path / tenant_id / "tenant.json").write_text(json.dumps({"name": tenant_id.title(), "business_hours": hours}))
+    registry = TenantRegistry(tenants_dir=str(tmp_path), prompts_dir=str(tmp_path))
+    registry.load_all()
+    monkeypatch.setitem(container.__dict__, "tenant_registry", registry)
+    tools.registry.invalidate("get_business_hours")
+
+    async def hours(tenant_id):
+        token = current_tenant.set(tenant_id)
+        try:
+            return await tools.execute_tool("get_business_hours", "{}")
+        finally:
+            current_tenant.reset(token)
+
+    # Cached results are per tenant, so the first tenant's hours never leak to the second
+    assert asyncio.run(hours("acme")) == {"business": "Acme", "hours": "Mon-Sat 8-8"}
+    assert asyncio.run(hours("globex")) == {"business": "Globex", "hours": "24/7"}
+    assert asyncio.run(hours("acme"))["hours"] == "Mon-Sat 8-8"
+    assert asyncio.run(hours(None))["hours"] == tools.DEFAULT_BUSINESS_HOURS
+    tools.registry.invalidate("get_business_hours")
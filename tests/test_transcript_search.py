@@ -0,0 +1,90 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.transcript_search import Segment, TranscriptIndex, _Memtable
+
+WORDS = "billing refund appointment cancel order late delivery password reset account card".split()
+START = datetime(2024, 1, 1, 9)
+
+
+def turns(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "call_id": f"call_{i // 4}",
+            "speaker": "user" if i % 2 else "assistant",
+            "intent": rng.choice(["faq", "complaint", None]),
+            "timestamp": START + timedelta(minutes=i),
+            "message": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        }
+
+
+@pytest.fixture
+def indexes():
+    """The same turns in one memtable and in many flushed, merged segments"""
+    single = TranscriptIndex(flush_docs=10_000)
+    merged = TranscriptIndex(flush_docs=10, merge_factor=3)
+    single.add_many(turns(400))
+    merged.add_many(turns(400))
+    merged.flush()
+    yield single, merged
+    single._merger.shutdown()
+    merged._merger.shutdown()
+
+
+def test_merges_are_tiered(indexes):
+    _, merged = indexes
+    stats = merged.get_stats()
+    assert stats["documents"] == 400
+    assert stats["pending_segments"] == 0
+    assert stats["merges"] > 0
+    # 40 flushed segments with merge factor 3: 27 + 9 + 3 + 1
+    assert stats["segments"] == [270, 90, 30, 10]
+
+
+@pytest.mark.parametrize("query, filters", [
+    ("refund", {}),
+    ("billing card", {}),
+    ('"password reset"', {}),
+    ('"late delivery" order', {}),
+    ("cancel", {"speaker": "user"}),
+    ("account", {"intent": "complaint"}),
+    ("refund", {"since": START + timedelta(hours=2), "until": START + timedelta(hours=4)}),
+    ("appointment", {"call_id": "call_12"})
+])
+def test_segmented_search_matches_single_memtable(indexes, query, filters):
+    single, merged = indexes
+    expected = single.search(query, limit=15, **filters)
+    actual = merged.search(query, limit=15, **filters)
+    assert expected
+    assert [(h.doc_id, h.score) for h in actual] == [(h.doc_id, h.score) for h in expected]
+
+
+def test_merge_rebases_postings():
+    first, second = _Memtable(0), _Memtable(2)
+    first.add("a", 0, 0, 0.0, "refund my order")
+    first.add("a", 0, 0, 0.0, "order order")
+    second.add("b", 0, 0, 0.0, "where is my order")
+    second.add("b", 0, 0, 0.0, "refund")
+    merged = Segment.merge([Segment.from_memtable(first), Segment.from_memtable(second)])
+
+    order = merged.postings["order"]
+    assert order.docs.tolist() == [0, 1, 2]
+    assert np.diff(order.offsets).tolist() == [1, 2, 1]
+    assert order.positions.tolist() == [2, 0, 1, 3]
+    assert merged.postings["refund"].docs.tolist() == [0, 3]
+    assert merged.call_ids == ["a", "a", "b", "b"]
+    assert merged.level == 1
+
+
+def test_phrase_requires_adjacent_terms():
+    index = TranscriptIndex(flush_docs=1)
+    index.add("a", "user", "reset my password")
+    index.add("b", "user", "password reset please")
+    index.flush()
+    assert [h.call_id for h in index.search('"password reset"')] == ["b"]
+    assert {h.call_id for h in index.search("password reset")} == {"a", "b"}
+    index._merger.shutdown()